@@ -0,0 +1,148 @@
+"""
+Pluggable optimizer backends.
+
+AI_BACKEND selects one per worker:
+    rules   the MVP rule-based rewrites in optimizer.py (default, instant)
+    llm     an OpenAI-compatible /v1/chat/completions server (OpenAI, vLLM,
+            llama.cpp, Ollama, or the offline stand-in in mock_llm.py)
+
+Each backend reports a version via current_version(); it is part of the
+result cache key, so switching models or editing prompts (see prompts.py)
+never serves stale rewrites. Backends that can't
+stream yield their whole answer as a single chunk from stream().
+"""
+import json
+import os
+from typing import AsyncIterator, Optional
+import httpx
+
+from . import prompts
+from .optimizer import OptimizationRequest, OptimizationResponse, simple_optimize
+
+# --- CONFIG ---
+AI_BACKEND = os.getenv("AI_BACKEND", "rules")
+AI_LLM_URL = os.getenv("AI_LLM_URL", "https://api.openai.com")
+AI_LLM_MODEL = os.getenv("AI_LLM_MODEL", "gpt-4o-mini")
+AI_LLM_API_KEY = os.getenv("AI_LLM_API_KEY") or os.getenv("OPENAI_API_KEY", "")
+AI_MAX_CONNECTIONS = int(os.getenv("AI_MAX_CONNECTIONS", "20"))
+PROMPT_VERSION = "2" # Bump when the prompt wording in prompts.py changes
+
+class BackendError(Exception):
+    """A failed backend call; `retryable` marks transient failures (timeouts, 429, 5xx)."""
+
+    def __init__(self, message: str, retryable: bool = False):
+        super().__init__(message)
+        self.retryable = retryable
+
+class OptimizerBackend:
+    name = "base"
+    version = "0"
+    streams = False # True if stream() yields text incrementally
+
+    async def current_version(self, request: OptimizationRequest) -> str:
+        return self.version
+
+    async def optimize(self, request: OptimizationRequest) -> OptimizationResponse:
+        raise NotImplementedError
+
+    async def stream(self, request: OptimizationRequest) -> AsyncIterator[str]:
+        """Yield the optimized text in pieces as it is produced."""
+        yield (await self.optimize(request)).optimized_text
+
+    def reasoning(self, request: OptimizationRequest) -> str:
+        # Reasoning for a streamed answer, which only carries text
+        return ""
+
+    async def close(self):
+        pass
+
+class RuleBasedBackend(OptimizerBackend):
+    name = "rules"
+    version = "mvp-1"
+
+    async def optimize(self, request):
+        return simple_optimize(request)
+
+class ChatCompletionsBackend(OptimizerBackend):
+    """Calls POST {base_url}/v1/chat/completions on a pooled AsyncClient."""
+
+    name = "llm"
+    streams = True
+
+    def __init__(self, base_url: str = AI_LLM_URL, model: str = AI_LLM_MODEL, api_key: str = AI_LLM_API_KEY):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.api_key = api_key
+        self.version = f"{model}:prompt-{PROMPT_VERSION}"
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+            # Timeouts are enforced per attempt by the engine; the client only bounds connects
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url, headers=headers, timeout=httpx.Timeout(None, connect=5),
+                limits=httpx.Limits(max_connections=AI_MAX_CONNECTIONS, max_keepalive_connections=AI_MAX_CONNECTIONS),
+            )
+        return self._client
+
+    async def current_version(self, request):
+        # Mode/platform edits change the compiled prompt, and so the cache key
+        return f"{self.version}:{(await prompts.get_registry()).prompt_version(request)}"
+
+    async def messages(self, request: OptimizationRequest) -> list:
+        return (await prompts.get_registry()).messages(request)
+
+    def reasoning(self, request):
+        return f"Rewritten by {self.model} ({request.optimization_type})."
+
+    def check_status(self, response: httpx.Response, body: str = ""):
+        if response.status_code == 429 or response.status_code >= 500:
+            raise BackendError(f"LLM returned {response.status_code}", retryable=True)
+        if response.status_code >= 400:
+            raise BackendError(f"LLM returned {response.status_code}: {body[:200]}")
+
+    async def optimize(self, request):
+        try:
+            response = await self.client.post("/v1/chat/completions", json={"model": self.model, "messages": await self.messages(request)})
+        except httpx.TransportError as e:
+            raise BackendError(f"LLM request failed: {e!r}", retryable=True)
+        self.check_status(response, response.text)
+        try:
+            text = response.json()["choices"][0]["message"]["content"].strip()
+        except (ValueError, KeyError, IndexError) as e:
+            raise BackendError(f"Malformed LLM response: {e!r}")
+        return OptimizationResponse(optimized_text=text, reasoning=self.reasoning(request))
+
+    async def stream(self, request):
+        payload = {"model": self.model, "messages": await self.messages(request), "stream": True}
+        try:
+            # Leaving this block (including cancellation) closes the upstream connection
+            async with self.client.stream("POST", "/v1/chat/completions", json=payload) as response:
+                if response.status_code >= 400:
+                    self.check_status(response, (await response.aread()).decode("utf-8", "replace"))
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        return
+                    try:
+                        delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+                    except (ValueError, KeyError, IndexError) as e:
+                        raise BackendError(f"Malformed LLM stream chunk: {e!r}")
+                    if delta:
+                        yield delta
+        except httpx.TransportError as e:
+            raise BackendError(f"LLM stream failed: {e!r}", retryable=True)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+def backend_from_name(name: str) -> OptimizerBackend:
+    if name == "llm":
+        return ChatCompletionsBackend()
+    return RuleBasedBackend()
@@ -0,0 +1,280 @@
+"""
+AI optimization engine: result cache, request coalescing, retries and metrics
+in front of the configured optimizer backend (see backends.py).
+
+Results are content-addressed: the cache key hashes (text, mode, platform,
+optimization_type, backend version), so an identical request is answered
+from cache.backend and concurrent identical requests share one backend call.
+Backend calls run under a per-worker concurrency limit, each attempt has a
+timeout, and transient failures are retried with exponential backoff.
+
+optimize_stream() relays text from streaming backends as it arrives (served
+as Server-Sent Events); a client disconnect cancels it, which closes the
+upstream request. Cache hits and non-streaming backends answer in one chunk.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import anyio
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from .. import cache
+from .backends import AI_BACKEND, BackendError, OptimizerBackend, backend_from_name
+from .optimizer import OptimizationRequest, OptimizationResponse
+
+# --- CONFIG ---
+AI_TIMEOUT = float(os.getenv("AI_TIMEOUT", "30")) # Seconds per attempt
+AI_MAX_RETRIES = int(os.getenv("AI_MAX_RETRIES", "2"))
+AI_RETRY_BASE_DELAY = float(os.getenv("AI_RETRY_BASE_DELAY", "0.5"))
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "8")) # In-flight backend calls, per worker
+AI_CACHE_TTL = float(os.getenv("AI_CACHE_TTL", str(7 * 86400)))
+AI_MAX_BATCH = 500
+LATENCY_WINDOW = 1000 # Recent samples kept for percentiles
+
+backend: OptimizerBackend = backend_from_name(AI_BACKEND)
+_backend_slots: Optional[asyncio.Semaphore] = None
+_in_flight: Dict[str, asyncio.Future] = {}
+
+# --- METRICS ---
+stats: Dict[str, int] = {"requests": 0, "cache_hits": 0, "coalesced": 0, "backend_calls": 0,
+                         "retries": 0, "timeouts": 0, "errors": 0, "streams": 0, "streams_cancelled": 0}
+latencies: Dict[str, deque] = {kind: deque(maxlen=LATENCY_WINDOW) for kind in ("request", "backend", "first_token")}
+
+def percentile(values, pct: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))], 2)
+
+def metrics() -> dict:
+    return {
+        "backend": backend.name,
+        "version": backend.version,
+        **stats,
+        "cache_hit_rate": round(stats["cache_hits"] / stats["requests"], 4) if stats["requests"] else 0.0,
+        "latency_ms": {
+            kind: {"samples": len(values), "p50": percentile(values, 50), "p95": percentile(values, 95), "p99": percentile(values, 99)}
+            for kind, values in latencies.items()
+        },
+    }
+
+# --- CACHE ---
+
+def cache_key(request: OptimizationRequest, version: Optional[str] = None) -> str:
+    identity = [request.text, request.mode, request.platform, request.optimization_type, backend.name, version or backend.version]
+    return "ai:" + hashlib.sha256(json.dumps(identity, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+# cache.backend is blocking (a Redis round trip with CACHE_URL=redis://), so these run in a worker thread
+
+async def cached_result(key: str) -> Optional[OptimizationResponse]:
+    value = await anyio.to_thread.run_sync(cache.backend.get, key)
+    return OptimizationResponse.model_validate_json(value) if value is not None else None
+
+async def store_result(key: str, result: OptimizationResponse):
+    await anyio.to_thread.run_sync(cache.backend.set, key, result.model_dump_json().encode("utf-8"), AI_CACHE_TTL)
+
+# --- CALLS ---
+
+def backend_slots() -> asyncio.Semaphore:
+    # Created lazily so it binds to the running event loop
+    global _backend_slots
+    if _backend_slots is None:
+        _backend_slots = asyncio.Semaphore(AI_MAX_CONCURRENCY)
+    return _backend_slots
+
+async def call_backend(request: OptimizationRequest) -> OptimizationResponse:
+    """One backend call with per-attempt timeout and retries on transient failures."""
+    for attempt in range(AI_MAX_RETRIES + 1):
+        if attempt:
+            stats["retries"] += 1
+            # Full jitter keeps retries from a failed burst from arriving together
+            await asyncio.sleep(random.uniform(0, AI_RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+        started = time.perf_counter()
+        try:
+            async with backend_slots():
+                stats["backend_calls"] += 1
+                result = await asyncio.wait_for(backend.optimize(request), AI_TIMEOUT)
+            latencies["backend"].append((time.perf_counter() - started) * 1000)
+            return result
+        except asyncio.TimeoutError:
+            stats["timeouts"] += 1
+            error = BackendError(f"Optimizer timed out after {AI_TIMEOUT:g}s", retryable=True)
+        except BackendError as e:
+            error = e
+        if not error.retryable:
+            break
+    raise error
+
+async def optimize(request: OptimizationRequest) -> Tuple[OptimizationResponse, bool]:
+    """Optimized text for request and whether it came from cache (or another caller's in-flight call)."""
+    stats["requests"] += 1
+    started = time.perf_counter()
+    try:
+        key = cache_key(request, await backend.current_version(request))
+        result = await cached_result(key)
+        if result is not None:
+            stats["cache_hits"] += 1
+            return result, True
+
+        pending = _in_flight.get(key)
+        if pending is not None:
+            stats["coalesced"] += 1
+            return await asyncio.shield(pending), True
+
+        future = asyncio.get_running_loop().create_future()
+        _in_flight[key] = future
+        try:
+            result = await call_backend(request)
+            await store_result(key, result)
+            future.set_result(result)
+            return result, False
+        except BaseException as e:
+            future.set_exception(e if isinstance(e, Exception) else BackendError("Optimization cancelled"))
+            future.exception() # Mark retrieved when no one else was waiting
+            raise
+        finally:
+            _in_flight.pop(key, None)
+    except BackendError:
+        stats["errors"] += 1
+        raise
+    finally:
+        latencies["request"].append((time.perf_counter() - started) * 1000)
+
+async def optimize_stream(request: OptimizationRequest) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """Yield ("delta", {"text"}) events as text arrives, then ("done", full result)."""
+    key = cache_key(request, await backend.current_version(request))
+    if not backend.streams or key in _in_flight or await cached_result(key) is not None:
+        # Nothing to stream incrementally: answer in one chunk
+        result, cached = await optimize(request)
+        yield "delta", {"text": result.optimized_text}
+        yield "done", {**result.model_dump(), "cached": cached}
+        return
+
+    stats["requests"] += 1
+    stats["streams"] += 1
+    started = time.perf_counter()
+    parts: List[str] = []
+    try:
+        for attempt in range(AI_MAX_RETRIES + 1):
+            if attempt:
+                stats["retries"] += 1
+                await asyncio.sleep(random.uniform(0, AI_RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+            try:
+                async with backend_slots():
+                    stats["backend_calls"] += 1
+                    chunks = backend.stream(request)
+                    try:
+                        while True:
+                            # AI_TIMEOUT bounds the wait for each chunk, not the whole answer
+                            try:
+                                async with asyncio.timeout(AI_TIMEOUT): # Same task, so cancellation reaches the upstream call
+                                    chunk = await anext(chunks)
+                            except StopAsyncIteration:
+                                break
+                            if not parts:
+                                latencies["first_token"].append((time.perf_counter() - started) * 1000)
+                            parts.append(chunk)
+                            yield "delta", {"text": chunk}
+                    finally:
+                        await chunks.aclose()
+                break
+            except asyncio.TimeoutError:
+                stats["timeouts"] += 1
+                error = BackendError(f"Optimizer timed out after {AI_TIMEOUT:g}s", retryable=True)
+            except BackendError as e:
+                error = e
+            # Text already sent can't be taken back, so only retry before the first chunk
+            if parts or not error.retryable or attempt == AI_MAX_RETRIES:
+                stats["errors"] += 1
+                raise error
+
+        latencies["backend"].append((time.perf_counter() - started) * 1000)
+        result = OptimizationResponse(optimized_text="".join(parts).strip(), reasoning=backend.reasoning(request))
+        await store_result(key, result)
+        yield "done", {**result.model_dump(), "cached": False}
+    except (asyncio.CancelledError, GeneratorExit):
+        stats["streams_cancelled"] += 1
+        raise
+    finally:
+        latencies["request"].append((time.perf_counter() - started) * 1000)
+
+async def sse_events(request: OptimizationRequest) -> AsyncIterator[str]:
+    try:
+        async for event, data in optimize_stream(request):
+            yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+    except BackendError as e:
+        yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+
+def stream_response(request: OptimizationRequest) -> StreamingResponse:
+    # Starlette cancels the generator when the client disconnects, which closes the upstream call
+    return StreamingResponse(sse_events(request), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+async def close():
+    await backend.close()
+
+# --- MODELS ---
+class BatchPost(BaseModel):
+    text: str
+    mode: str
+    post_id: Optional[int] = None
+
+class BatchOptimizationRequest(BaseModel):
+    posts: List[BatchPost]
+    platforms: List[str]
+    optimization_type: str
+    concurrency: int = AI_MAX_CONCURRENCY
+
+class BatchOptimizationResult(BaseModel):
+    index: int
+    post_id: Optional[int] = None
+    platform: str
+    ok: bool
+    optimized_text: Optional[str] = None
+    reasoning: Optional[str] = None
+    cached: bool = False
+    latency_ms: float
+    error: Optional[str] = None
+
+# --- ROUTER ---
+router = APIRouter()
+
+@router.post("/api/ai/optimize/batch", response_model=List[BatchOptimizationResult])
+async def optimize_batch(batch: BatchOptimizationRequest):
+    """Optimize every post for every platform; one result per (post, platform), in that order."""
+    if len(batch.posts) * len(batch.platforms) > AI_MAX_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {AI_MAX_BATCH} post × platform combinations per batch")
+    semaphore = asyncio.Semaphore(max(1, min(batch.concurrency, AI_MAX_CONCURRENCY)))
+
+    async def run(index: int, post: BatchPost, platform: str) -> BatchOptimizationResult:
+        request = OptimizationRequest(text=post.text, mode=post.mode, platform=platform, optimization_type=batch.optimization_type)
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                result, cached = await optimize(request)
+                return BatchOptimizationResult(index=index, post_id=post.post_id, platform=platform, ok=True, cached=cached,
+                                               optimized_text=result.optimized_text, reasoning=result.reasoning,
+                                               latency_ms=round((time.perf_counter() - started) * 1000, 2))
+            except BackendError as e:
+                return BatchOptimizationResult(index=index, post_id=post.post_id, platform=platform, ok=False, error=str(e),
+                                               latency_ms=round((time.perf_counter() - started) * 1000, 2))
+
+    return await asyncio.gather(*(
+        run(index, post, platform) for index, post in enumerate(batch.posts) for platform in batch.platforms
+    ))
+
+@router.post("/api/ai/optimize/stream")
+async def optimize_text_stream(request: OptimizationRequest):
+    """Server-Sent Events: `delta` events with partial text, then `done` (or `error`)."""
+    return stream_response(request)
+
+@router.get("/api/ai/metrics")
+def read_ai_metrics():
+    return metrics()
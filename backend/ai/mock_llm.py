@@ -0,0 +1,90 @@
+"""
+Offline stand-in for an OpenAI-compatible LLM server.
+
+Serves POST /v1/chat/completions with a canned rewrite, one-shot or streamed
+word by word as SSE ("stream": true), with model-like timing: the first token
+after MOCK_LLM_LATENCY, then one every MOCK_LLM_TOKEN_DELAY. It can fail a
+fraction of calls, so the optimizer engine's concurrency, caching, timeouts,
+retries and streaming can be exercised without network access or API keys:
+
+    MOCK_LLM_LATENCY=0.8 MOCK_LLM_FAILURE_RATE=0.1 uvicorn backend.ai.mock_llm:app --port 8090
+    AI_BACKEND=llm AI_LLM_URL=http://127.0.0.1:8090 uvicorn backend.main:app --port 8001
+"""
+import asyncio
+import json
+import os
+import random
+import time
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from typing import List
+
+MOCK_LLM_LATENCY = float(os.getenv("MOCK_LLM_LATENCY", "0.5")) # Seconds to the first token
+MOCK_LLM_TOKEN_DELAY = float(os.getenv("MOCK_LLM_TOKEN_DELAY", "0.02")) # Seconds per further token
+MOCK_LLM_FAILURE_RATE = float(os.getenv("MOCK_LLM_FAILURE_RATE", "0")) # Fraction of calls answered with 503
+
+app = FastAPI()
+stats = {"completions": 0, "failures": 0, "streams": 0, "streams_cancelled": 0}
+
+class Message(BaseModel):
+    role: str
+    content: str
+
+class ChatRequest(BaseModel):
+    model: str
+    messages: List[Message]
+    stream: bool = False
+
+def rewrite(messages: List[Message]) -> str:
+    # Deterministic so cached and fresh answers can be compared
+    text = next((m.content for m in reversed(messages) if m.role == "user"), "")
+    instruction = next((m.content for m in messages if m.role == "system"), "")
+    if "Shorten" in instruction:
+        return " ".join(text.split()[:12])
+    if "call to action" in instruction:
+        return f"{text}\n\nJoin us today 👉"
+    return f"✨ {text}"
+
+def tokens(text: str) -> List[str]:
+    words = text.split(" ")
+    return [word if i == 0 else " " + word for i, word in enumerate(words)]
+
+async def stream_completion(request: ChatRequest, text: str):
+    stats["streams"] += 1
+    finished = False
+    try:
+        for i, token in enumerate(tokens(text)):
+            if i:
+                await asyncio.sleep(MOCK_LLM_TOKEN_DELAY)
+            chunk = {"object": "chat.completion.chunk", "model": request.model,
+                     "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}
+            yield f"data: {json.dumps(chunk)}\n\n"
+        yield "data: [DONE]\n\n"
+        finished = True
+    finally:
+        if not finished:
+            stats["streams_cancelled"] += 1 # Client went away mid-answer
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: ChatRequest):
+    await asyncio.sleep(MOCK_LLM_LATENCY)
+    if random.random() < MOCK_LLM_FAILURE_RATE:
+        stats["failures"] += 1
+        raise HTTPException(status_code=503, detail="Mock overload")
+    stats["completions"] += 1
+    text = rewrite(request.messages)
+    if request.stream:
+        return StreamingResponse(stream_completion(request, text), media_type="text/event-stream")
+    await asyncio.sleep(MOCK_LLM_TOKEN_DELAY * (len(tokens(text)) - 1)) # Same total time as streaming
+    return {
+        "id": f"mock-{stats['completions']}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+    }
+
+@app.get("/stats")
+def read_stats():
+    return stats
@@ -0,0 +1,213 @@
+"""
+Mode- and platform-aware prompt assembly for the optimizer backends.
+
+Modes (tone, structure, examples, preferred platforms), platforms (char limit,
+recommendations, hashtags, suffix) and the hook style / tone / closing hook
+hints in schemas/mode_definitions.json (or MODE_DEFINITIONS_PATH) are loaded
+once into a PromptRegistry, with the JSON columns parsed at compile time. Each (mode, platform,
+optimization_type) system prompt is built on first use and then reused, so
+a request does no DB queries or JSON parsing.
+
+The registry is tied to the "modes" and "platforms" generations in
+cache.py: mode/platform writes already call cache.invalidate(), and the next
+prompt request after that (on any worker sharing the cache backend) reloads
+and recompiles. Each prompt's digest is part of the AI result cache key, so
+editing a mode or platform never serves rewrites built from its old prompt
+(and leaves other modes' cached rewrites alone).
+"""
+import hashlib
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+import anyio
+from fastapi import APIRouter
+from sqlmodel import Session, select
+
+from .. import cache
+from ..database import engine
+from ..models import Mode, Platform
+from .optimizer import OptimizationRequest
+
+# schemas/ at the repo root; the Docker image copies it to the same place relative to backend/
+MODE_DEFINITIONS_PATH = os.getenv(
+    "MODE_DEFINITIONS_PATH", os.path.join(os.path.dirname(__file__), "..", "..", "schemas", "mode_definitions.json")
+)
+PLACEHOLDER = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+INSTRUCTIONS = {
+    "shorten": "Shorten the post while keeping its meaning and hook.",
+    "professional": "Rewrite the post in a professional, credible tone.",
+    "provocative": "Rewrite the post with a provocative, scroll-stopping hook.",
+    "cta": "Rewrite the post so it ends with a clear call to action.",
+}
+MAX_EXAMPLES = 3
+
+# --- COMPILED TEMPLATES ---
+
+@dataclass(frozen=True)
+class ModeTemplate:
+    slug: str
+    name: str
+    tone: str = ""
+    structure: str = ""
+    hook_style: str = ""
+    closing_hook: str = ""
+    optimal_length: str = ""
+    examples: Tuple[str, ...] = ()
+    preferred_platforms: Tuple[str, ...] = ()
+
+@dataclass(frozen=True)
+class PlatformTemplate:
+    slug: str
+    name: str
+    char_limit: int = 280
+    recommendations: str = ""
+    hashtags: str = ""
+    suffix: str = ""
+
+def parse_json_list(value: Optional[str]) -> Tuple[str, ...]:
+    # Mode stores lists as JSON strings; tolerate hand-edited or empty values
+    try:
+        items = json.loads(value or "[]")
+    except ValueError:
+        return ()
+    return tuple(str(item) for item in items) if isinstance(items, list) else ()
+
+def load_mode_definitions(path: str = MODE_DEFINITIONS_PATH) -> Dict[str, dict]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f).get("modes", {})
+    except (OSError, ValueError) as e:
+        if "MODE_DEFINITIONS_PATH" in os.environ:
+            # Explicitly configured (deployments): fail at startup rather than silently drop the hints
+            raise RuntimeError(f"MODE_DEFINITIONS_PATH: could not read mode definitions ({e})")
+        print(f"⚠️  Could not read mode definitions ({e}); prompts will use DB modes only")
+        return {}
+
+def closing_hook_hint(template: str) -> str:
+    """The closing hook template as a prompt line, its {{field}} placeholders described instead of pasted raw."""
+    fields = [name.replace("_", " ") for name in PLACEHOLDER.findall(template)]
+    pattern = PLACEHOLDER.sub(lambda m: f"[{m.group(1).replace('_', ' ')}]", template)
+    if not fields:
+        return pattern
+    blanks = " and ".join(f"[{name}]" for name in fields)
+    return f'"{pattern}" (fill {blanks} from the post, or leave the closing line out if it has none)'
+
+def compile_mode(mode: Mode, definition: dict) -> ModeTemplate:
+    hints = definition.get("ai_prompts", {})
+    tone = "; ".join(part.strip().rstrip(".") for part in (mode.tone_guidelines, hints.get("tone", "")) if part)
+    return ModeTemplate(
+        slug=mode.slug, name=mode.name, tone=tone, structure=mode.structure_template or "",
+        hook_style=hints.get("hook_style", ""), closing_hook=closing_hook_hint(hints.get("closing_hook_template", "")),
+        optimal_length=mode.optimal_length_range or "", examples=parse_json_list(mode.example_prompts)[:MAX_EXAMPLES],
+        preferred_platforms=parse_json_list(mode.preferred_platforms),
+    )
+
+def compile_platform(platform: Platform) -> PlatformTemplate:
+    return PlatformTemplate(
+        slug=platform.slug, name=platform.name, char_limit=platform.char_limit,
+        recommendations=platform.content_recommendations or "", hashtags=platform.default_hashtags or "",
+        suffix=platform.post_suffix or "",
+    )
+
+def system_prompt(mode: ModeTemplate, platform: PlatformTemplate, optimization_type: str) -> str:
+    lines = [f'You edit {platform.name} posts for a "{mode.name}" campaign.']
+    if mode.tone:
+        lines.append(f"Tone: {mode.tone}.")
+    if mode.hook_style:
+        lines.append(f"Hook style: {mode.hook_style}.")
+    if mode.structure:
+        lines.append(f"Structure: {mode.structure}.")
+    if mode.optimal_length:
+        lines.append(f"Target length: {mode.optimal_length}.")
+    lines.append(f"Hard limit: {platform.char_limit} characters.")
+    if platform.recommendations:
+        lines.append(f"What works on {platform.name}: {platform.recommendations}")
+    if mode.preferred_platforms and platform.slug not in mode.preferred_platforms:
+        lines.append(f"{platform.name} is a secondary channel for this campaign; keep it brief.")
+    if mode.closing_hook:
+        lines.append(f"Closing line pattern: {mode.closing_hook}")
+    if platform.suffix:
+        lines.append(f"End with: {platform.suffix}")
+    if platform.hashtags:
+        lines.append(f"Use these hashtags where natural: {platform.hashtags}")
+    if mode.examples:
+        lines.append("Examples of strong posts:\n" + "\n".join(f"- {example}" for example in mode.examples))
+    lines.append(f"{INSTRUCTIONS.get(optimization_type, 'Improve the post.')} Reply with the rewritten post only.")
+    return "\n".join(lines)
+
+@dataclass
+class PromptRegistry:
+    modes: Dict[str, ModeTemplate]
+    platforms: Dict[str, PlatformTemplate]
+    generation: Tuple[str, str] = ("", "")
+    version: str = ""
+    _prompts: Dict[Tuple[str, str, str], Tuple[str, str]] = field(default_factory=dict)
+
+    def __post_init__(self):
+        content = json.dumps([sorted(self.modes.items()), sorted(self.platforms.items())], default=repr)
+        self.version = hashlib.sha1(content.encode("utf-8")).hexdigest()[:12]
+
+    def mode(self, slug: str) -> ModeTemplate:
+        return self.modes.get(slug) or ModeTemplate(slug=slug, name=slug)
+
+    def platform(self, slug: str) -> PlatformTemplate:
+        return self.platforms.get(slug) or PlatformTemplate(slug=slug, name=slug)
+
+    def compiled(self, mode: str, platform: str, optimization_type: str) -> Tuple[str, str]:
+        """(system prompt, digest), built once per known combination."""
+        key = (mode, platform, optimization_type)
+        entry = self._prompts.get(key)
+        if entry is None:
+            prompt = system_prompt(self.mode(mode), self.platform(platform), optimization_type)
+            entry = (prompt, hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:12])
+            # The strings come from the client: only memoize slugs the registry knows,
+            # so the memo stays bounded by modes x platforms x INSTRUCTIONS
+            if mode in self.modes and platform in self.platforms and optimization_type in INSTRUCTIONS:
+                self._prompts[key] = entry
+        return entry
+
+    def system_prompt(self, mode: str, platform: str, optimization_type: str) -> str:
+        return self.compiled(mode, platform, optimization_type)[0]
+
+    def prompt_version(self, request: OptimizationRequest) -> str:
+        return self.compiled(request.mode, request.platform, request.optimization_type)[1]
+
+    def messages(self, request: OptimizationRequest) -> List[dict]:
+        return [
+            {"role": "system", "content": self.system_prompt(request.mode, request.platform, request.optimization_type)},
+            {"role": "user", "content": request.text},
+        ]
+
+# --- LOADING ---
+_definitions: Dict[str, dict] = load_mode_definitions()
+_registry: Optional[PromptRegistry] = None
+
+def current_generation() -> Tuple[str, str]:
+    return cache.generation("modes"), cache.generation("platforms")
+
+def load_registry(generation: Tuple[str, str]) -> PromptRegistry:
+    with Session(engine) as session:
+        modes = {m.slug: compile_mode(m, _definitions.get(m.slug, {})) for m in session.exec(select(Mode)).all()}
+        platforms = {p.slug: compile_platform(p) for p in session.exec(select(Platform)).all()}
+    return PromptRegistry(modes=modes, platforms=platforms, generation=generation)
+
+async def get_registry() -> PromptRegistry:
+    """The compiled registry, reloaded (off the event loop) after a mode or platform edit."""
+    global _registry
+    generation = await anyio.to_thread.run_sync(current_generation) # Two cache round trips
+    if _registry is None or _registry.generation != generation:
+        _registry = await anyio.to_thread.run_sync(load_registry, generation)
+    return _registry
+
+# --- ROUTER ---
+router = APIRouter()
+
+@router.get("/api/ai/prompt")
+async def read_prompt(mode: str, platform: str, optimization_type: str = "professional"):
+    """The system prompt an LLM backend would receive for this mode and platform."""
+    registry = await get_registry()
+    prompt, digest = registry.compiled(mode, platform, optimization_type)
+    return {"version": digest, "registry_version": registry.version, "system": prompt}
@@ -1,6 +1,14 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+import anyio
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
 from passlib.context import CryptContext
@@ -9,6 +17,8 @@ from pydantic import BaseModel
 
 from .database import get_session
 from .models import User
+from .responses import dumps
+from . import cache
 
 # --- CONFIG ---
 # In production, these should be in .env
@@ -16,8 +26,17 @@ SECRET_KEY = "supersecretkey_change_me_in_prod"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 3000 # Long expiry for dev convenience
 
+# bcrypt cost; hashes made with a different cost are upgraded on the next successful login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Hashing runs in its own small pool so login bursts can't take the event loop or the route threadpool
+AUTH_HASH_WORKERS = int(os.getenv("AUTH_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+AUTH_HASH_MAX_PENDING = int(os.getenv("AUTH_HASH_MAX_PENDING", str(AUTH_HASH_WORKERS * 16)))
+LOGIN_RATE_WINDOW = int(os.getenv("LOGIN_RATE_WINDOW", "60")) # Seconds
+LOGIN_MAX_PER_IP = int(os.getenv("LOGIN_MAX_PER_IP", "30"))
+LOGIN_MAX_PER_ACCOUNT = int(os.getenv("LOGIN_MAX_PER_ACCOUNT", "10"))
+
 # --- SECURITY UTILS ---
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 def verify_password(plain_password, hashed_password):
@@ -26,6 +45,35 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+_hash_pool = ThreadPoolExecutor(max_workers=AUTH_HASH_WORKERS, thread_name_prefix="bcrypt")
+_hash_slots = threading.BoundedSemaphore(AUTH_HASH_MAX_PENDING)
+
+def submit_hash_job(fn, *args) -> Future:
+    """Queue a bcrypt call on the hashing pool, shedding load with a 503 once it is full."""
+    if not _hash_slots.acquire(blocking=False):
+        stats["hash_rejected"] += 1
+        raise HTTPException(status_code=503, detail="Server busy, please retry", headers={"Retry-After": "1"})
+    future = _hash_pool.submit(fn, *args)
+    future.add_done_callback(lambda _: _hash_slots.release())
+    return future
+
+async def run_hash_job(fn, *args):
+    return await asyncio.wrap_future(submit_hash_job(fn, *args))
+
+def login_rate_keys(ip: str, username: str):
+    window = int(time.time() // LOGIN_RATE_WINDOW)
+    return f"auth:login:ip:{ip}:{window}", f"auth:login:user:{username.lower()}:{window}"
+
+def check_login_rate(ip: str, username: str):
+    # Fixed windows counted in the shared cache, checked before any bcrypt work is queued
+    ip_key, account_key = login_rate_keys(ip, username)
+    for key, limit in ((ip_key, LOGIN_MAX_PER_IP), (account_key, LOGIN_MAX_PER_ACCOUNT)):
+        if cache.backend.incr(key, LOGIN_RATE_WINDOW) > limit:
+            stats["login_rate_limited"] += 1
+            retry_after = LOGIN_RATE_WINDOW - int(time.time()) % LOGIN_RATE_WINDOW
+            raise HTTPException(status_code=429, detail="Too many login attempts, try again later",
+                                headers={"Retry-After": str(retry_after)})
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -36,6 +84,68 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+# --- AUTH CACHE ---
+# Verified tokens and users are kept in the shared cache backend (cache.py), so with
+# CACHE_URL=redis://... every uvicorn worker shares them and sees invalidations.
+AUTH_USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL", "60"))
+USER_CACHE_FIELDS = ("id", "email", "full_name", "is_active", "is_superuser", "created_at") # Never the password hash
+
+stats = {"token_hits": 0, "token_misses": 0, "user_hits": 0, "user_misses": 0, "user_invalidations": 0,
+         "login_rate_limited": 0, "hash_rejected": 0, "rehashed": 0} # Per worker
+
+def token_cache_key(token: str) -> str:
+    return "auth:token:" + hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+def user_cache_key(email: str) -> str:
+    return f"auth:user:{email}"
+
+def verify_token(token: str) -> Optional[str]:
+    """Return the token's subject (email), or None if the token is invalid or expired."""
+    key = token_cache_key(token)
+    cached = cache.backend.get(key)
+    if cached is not None:
+        stats["token_hits"] += 1
+        return cached.decode("utf-8")
+
+    stats["token_misses"] += 1
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    email = payload.get("sub")
+    if email is None:
+        return None
+    # Cache exactly until the token expires; jose has already rejected expired tokens
+    ttl = payload.get("exp", 0) - time.time()
+    if ttl > 0:
+        cache.backend.set(key, email.encode("utf-8"), ttl)
+    return email
+
+def get_user_by_email(session: Session, email: str) -> Optional[User]:
+    """User lookup through a short-TTL cache.
+
+    Cache hits return a detached, read-only User without its password hash.
+    """
+    cached = cache.backend.get(user_cache_key(email))
+    if cached is not None:
+        stats["user_hits"] += 1
+        return User.model_validate({**json.loads(cached), "hashed_password": ""})
+
+    stats["user_misses"] += 1
+    user = session.exec(select(User).where(User.email == email)).first()
+    if user is not None:
+        data = {field: getattr(user, field) for field in USER_CACHE_FIELDS}
+        cache.backend.set(user_cache_key(email), dumps(data), AUTH_USER_CACHE_TTL)
+    return user
+
+def invalidate_user(email: str):
+    # Call after any change to a user's password or active/superuser flags
+    cache.backend.delete(user_cache_key(email))
+    stats["user_invalidations"] += 1
+
+def hit_rate(hits: int, misses: int) -> Optional[float]:
+    return round(hits / (hits + misses), 4) if hits + misses else None
+
 # --- MODELS ---
 class Token(BaseModel):
     access_token: str
@@ -53,21 +163,18 @@ class UserRead(BaseModel):
     is_active: bool
 
 # --- DEPENDENCIES ---
-async def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)):
+# Plain def: token and user lookups hit the cache and the database, so FastAPI runs this in its threadpool
+def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-    except JWTError:
+    email = verify_token(token)
+    if email is None:
         raise credentials_exception
-        
-    user = session.exec(select(User).where(User.email == email)).first()
+
+    user = get_user_by_email(session, email)
     if user is None:
         raise credentials_exception
     return user
@@ -81,14 +188,29 @@ async def get_current_active_user(current_user: User = Depends(get_current_user)
 router = APIRouter()
 
 @router.post("/token", response_model=Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), session: Session = Depends(get_session)):
-    user = session.exec(select(User).where(User.email == form_data.username)).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+async def login_for_access_token(request: Request, form_data: OAuth2PasswordRequestForm = Depends(), session: Session = Depends(get_session)):
+    ip = request.client.host if request.client else "unknown"
+    # The counters live in the cache backend (a Redis round trip): keep them off the event loop too
+    await anyio.to_thread.run_sync(check_login_rate, ip, form_data.username)
+
+    user = await anyio.to_thread.run_sync(lambda: session.exec(select(User).where(User.email == form_data.username)).first())
+    valid, new_hash = False, None
+    if user:
+        valid, new_hash = await run_hash_job(pwd_context.verify_and_update, form_data.password, user.hashed_password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+    if new_hash:
+        # Hash was made with an older cost; upgrade it while we have the plaintext
+        user.hashed_password = new_hash
+        await anyio.to_thread.run_sync(lambda: (session.add(user), session.commit()))
+        stats["rehashed"] += 1
+    await anyio.to_thread.run_sync(cache.backend.delete, login_rate_keys(ip, form_data.username)[1])
+
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user.email}, expires_delta=access_token_expires
@@ -101,7 +223,7 @@ def register_user(user_in: UserCreate, session: Session = Depends(get_session)):
     if user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    hashed_password = get_password_hash(user_in.password)
+    hashed_password = submit_hash_job(get_password_hash, user_in.password).result()
     
     # Auto-Admin for specific email
     is_admin = (user_in.email.lower() == "fkurka@gmail.com")
@@ -121,6 +243,28 @@ def register_user(user_in: UserCreate, session: Session = Depends(get_session)):
 async def read_users_me(current_user: User = Depends(get_current_active_user)):
     return current_user
 
+@router.post("/users/{user_id}/deactivate", response_model=UserRead)
+def deactivate_user(user_id: int, current_user: User = Depends(get_current_active_user), session: Session = Depends(get_session)):
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    user = session.get(User, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    user.is_active = False
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    invalidate_user(user.email)
+    return user
+
+@router.get("/api/auth/cache-stats")
+def read_auth_cache_stats():
+    return {
+        **stats,
+        "token_hit_rate": hit_rate(stats["token_hits"], stats["token_misses"]),
+        "user_hit_rate": hit_rate(stats["user_hits"], stats["user_misses"]),
+    }
+
 # --- PASSWORD RESET ---
 class ForgotPasswordRequest(BaseModel):
     email: str
@@ -165,8 +309,9 @@ def reset_password(request: ResetPasswordRequest, session: Session = Depends(get
         raise HTTPException(status_code=404, detail="User not found")
         
     # Update password
-    user.hashed_password = get_password_hash(request.new_password)
+    user.hashed_password = submit_hash_job(get_password_hash, request.new_password).result()
     session.add(user)
     session.commit()
+    invalidate_user(user.email)
     
     return {"message": "Password updated successfully"}
@@ -0,0 +1,236 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from sqlmodel import Session, select
+from sqlalchemy import bindparam, insert, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from .database import get_session, async_db
+from .models import CampaignPost, Campaign, Mode
+from .enums import PostStatus, ModeSlug
+from . import campaign_stats, dedup
+
+# --- CAMPAIGN AUTO-LINKING ---
+
+def resolve_campaign_ids(session: Session, keys: List[Tuple[str, str]]) -> Dict[Tuple[str, str], int]:
+    """Map each distinct (mode, category_primary) to a campaign id, creating missing campaigns.
+
+    Runs one query for modes and one for campaigns regardless of how many keys are passed.
+    Keys whose mode does not exist are left out (the post stays unlinked).
+    """
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return {}
+
+    mode_slugs = {mode for mode, _ in keys}
+    modes = session.exec(select(Mode).where(Mode.slug.in_(mode_slugs))).all()
+    mode_ids = {m.slug: m.id for m in modes}
+
+    names = {category for _, category in keys}
+    campaigns = {}
+    for campaign in session.exec(select(Campaign).where(Campaign.name.in_(names)).order_by(Campaign.id)).all():
+        campaigns.setdefault(campaign.name, campaign) # First match wins, like .first()
+
+    resolved = {}
+    for mode_slug, name in keys:
+        if mode_slug not in mode_ids:
+            continue
+        if name not in campaigns:
+            campaigns[name] = Campaign(name=name, mode_id=mode_ids[mode_slug])
+            session.add(campaigns[name])
+        resolved[(mode_slug, name)] = campaigns[name]
+
+    session.flush() # Assign ids to new campaigns
+    return {key: campaign.id for key, campaign in resolved.items()}
+
+def campaign_key(post: Dict[str, Any]) -> Tuple[str, str]:
+    # Same defaults create_post has always used
+    return (post.get("mode") or ModeSlug.EBEG.value, post.get("category_primary") or "General")
+
+# --- MODELS ---
+
+class BulkCreateRequest(BaseModel):
+    posts: List[Dict[str, Any]]
+
+class BulkUpdateRequest(BaseModel):
+    updates: List[Dict[str, Any]] # Each item: {"id": ..., <fields to change>}
+
+class BulkStatusRequest(BaseModel):
+    ids: List[int]
+    status: PostStatus
+    posted_date: Optional[str] = None # Defaults to now when moving to Posted
+
+class BulkItemResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    ok: bool
+    error: Optional[str] = None
+
+class BulkResponse(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[BulkItemResult]
+
+# --- HELPERS ---
+
+post_table = CampaignPost.__table__
+UPDATABLE_FIELDS = {name for name in CampaignPost.model_fields if name not in ("id", "updated_at")}
+_field_adapters: Dict[str, TypeAdapter] = {}
+
+def validate_field(name: str, value: Any) -> Any:
+    # Validate a single column value against the model annotation and return its DB form
+    adapter = _field_adapters.get(name)
+    if adapter is None:
+        adapter = _field_adapters[name] = TypeAdapter(CampaignPost.model_fields[name].annotation)
+    return adapter.dump_python(adapter.validate_python(value), mode="json")
+
+def error_message(e: ValidationError, field: Optional[str] = None) -> str:
+    messages = []
+    for err in e.errors():
+        loc = ".".join(str(p) for p in ((field,) if field else ()) + tuple(err["loc"]))
+        messages.append(f"{loc}: {err['msg']}" if loc else err["msg"])
+    return "; ".join(messages)
+
+def build_response(results: List[BulkItemResult]) -> BulkResponse:
+    results.sort(key=lambda r: r.index)
+    succeeded = sum(1 for r in results if r.ok)
+    return BulkResponse(succeeded=succeeded, failed=len(results) - succeeded, results=results)
+
+def commit_or_400(session: Session):
+    try:
+        session.commit()
+    except SQLAlchemyError as e:
+        session.rollback()
+        raise HTTPException(status_code=400, detail=f"Bulk operation rolled back: {e.__class__.__name__}: {e}")
+
+# --- ROUTER ---
+router = APIRouter(prefix="/api/posts/bulk")
+
+@router.post("", response_model=BulkResponse)
+@async_db
+def bulk_create_posts(request: BulkCreateRequest, session: Session = Depends(get_session)):
+    results: List[BulkItemResult] = []
+    rows: List[Dict[str, Any]] = []
+    row_indexes: List[int] = []
+
+    for index, item in enumerate(request.posts):
+        try:
+            data = CampaignPost.model_validate(item).model_dump(mode="json", exclude={"updated_at"}) # Database default
+        except ValidationError as e:
+            results.append(BulkItemResult(index=index, ok=False, error=error_message(e)))
+            continue
+        if data.get("id") is None:
+            data.pop("id", None)
+        rows.append(data)
+        row_indexes.append(index)
+
+    # Auto-link: one lookup per distinct (mode, category_primary) in the batch
+    unlinked = [row for row in rows if not row.get("campaign_id")]
+    campaign_ids = resolve_campaign_ids(session, [campaign_key(row) for row in unlinked])
+    for row in unlinked:
+        row["campaign_id"] = campaign_ids.get(campaign_key(row))
+
+    if rows:
+        # Rows with and without explicit ids need separate parameter sets
+        by_columns: Dict[Tuple[str, ...], List[int]] = {}
+        for position, row in enumerate(rows):
+            by_columns.setdefault(tuple(sorted(row)), []).append(position)
+        for positions in by_columns.values():
+            stmt = insert(post_table).returning(post_table.c.id, sort_by_parameter_order=True)
+            new_ids = session.execute(stmt, [rows[p] for p in positions]).scalars().all()
+            for position, new_id in zip(positions, new_ids):
+                rows[position]["id"] = new_id
+                results.append(BulkItemResult(index=row_indexes[position], id=new_id, ok=True))
+        campaign_stats.apply_changes(session, after=rows)
+        dedup.index_on_write(session, rows)
+
+    commit_or_400(session)
+    return build_response(results)
+
+@router.patch("", response_model=BulkResponse)
+@async_db
+def bulk_update_posts(request: BulkUpdateRequest, session: Session = Depends(get_session)):
+    results: List[BulkItemResult] = []
+    requested_ids = [item.get("id") for item in request.updates if isinstance(item.get("id"), int)]
+    existing_ids = set(session.exec(select(CampaignPost.id).where(CampaignPost.id.in_(requested_ids))).all()) if requested_ids else set()
+
+    # Group updates by the set of columns they touch so each group is one executemany
+    groups: Dict[Tuple[str, ...], List[Tuple[int, Dict[str, Any]]]] = {}
+    seen_ids = set()
+    for index, item in enumerate(request.updates):
+        post_id = item.get("id")
+        if not isinstance(post_id, int):
+            results.append(BulkItemResult(index=index, ok=False, error="Missing or invalid 'id'"))
+            continue
+        if post_id not in existing_ids:
+            results.append(BulkItemResult(index=index, id=post_id, ok=False, error="Post not found"))
+            continue
+        if post_id in seen_ids:
+            results.append(BulkItemResult(index=index, id=post_id, ok=False, error="Duplicate id in batch"))
+            continue
+        changes = {k: v for k, v in item.items() if k != "id"}
+        unknown = [k for k in changes if k not in UPDATABLE_FIELDS]
+        if unknown:
+            results.append(BulkItemResult(index=index, id=post_id, ok=False, error=f"Unknown fields: {', '.join(unknown)}"))
+            continue
+        if not changes:
+            results.append(BulkItemResult(index=index, id=post_id, ok=False, error="No fields to update"))
+            continue
+        values, errors = {}, []
+        for k, v in changes.items():
+            try:
+                values[k] = validate_field(k, v)
+            except ValidationError as e:
+                errors.append(error_message(e, field=k))
+        if errors:
+            results.append(BulkItemResult(index=index, id=post_id, ok=False, error="; ".join(errors)))
+            continue
+        seen_ids.add(post_id)
+        groups.setdefault(tuple(sorted(values)), []).append((index, {"b_id": post_id, **values}))
+
+    # Counter deltas need the pre-update values of posts whose counted columns change
+    counted_ids = [params["b_id"] for columns, items in groups.items() if set(columns) & set(campaign_stats.COUNTED_FIELDS)
+                   for _, params in items]
+    before = campaign_stats.load_counted(session, counted_ids) if campaign_stats.CAMPAIGN_COUNTERS else []
+
+    for columns, items in groups.items():
+        stmt = (
+            update(post_table)
+            .where(post_table.c.id == bindparam("b_id"))
+            .values({c: bindparam(c) for c in columns})
+        )
+        session.connection().execute(stmt, [params for _, params in items])
+        results.extend(BulkItemResult(index=index, id=params["b_id"], ok=True) for index, params in items)
+
+    changes = {params["b_id"]: params for items in groups.values() for _, params in items}
+    campaign_stats.apply_changes(session, before=before, after=[{**row, **changes[row["id"]]} for row in before])
+    dedup.reindex_on_write(session, [params["b_id"] for columns, items in groups.items()
+                                     if set(columns) & set(dedup.INDEXED_FIELDS) for _, params in items])
+    commit_or_400(session)
+    return build_response(results)
+
+@router.post("/status", response_model=BulkResponse)
+@async_db
+def bulk_update_status(request: BulkStatusRequest, session: Session = Depends(get_session)):
+    ids = list(dict.fromkeys(request.ids))
+    existing_ids = set(session.exec(select(CampaignPost.id).where(CampaignPost.id.in_(ids))).all()) if ids else set()
+
+    values = {"status": request.status.value}
+    if request.status == PostStatus.POSTED:
+        values["posted_date"] = request.posted_date or datetime.utcnow().isoformat()
+    elif request.posted_date is not None:
+        values["posted_date"] = request.posted_date
+
+    found = [post_id for post_id in ids if post_id in existing_ids]
+    if found:
+        before = campaign_stats.load_counted(session, found) if campaign_stats.CAMPAIGN_COUNTERS else []
+        session.execute(update(post_table).where(post_table.c.id.in_(found)).values(values))
+        campaign_stats.apply_changes(session, before=before, after=[{**row, **values} for row in before])
+
+    results = [
+        BulkItemResult(index=index, id=post_id, ok=post_id in existing_ids, error=None if post_id in existing_ids else "Post not found")
+        for index, post_id in enumerate(request.ids)
+    ]
+    commit_or_400(session)
+    return build_response(results)
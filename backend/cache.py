@@ -0,0 +1,197 @@
+"""
+Read-through cache for rarely-changing API data (platforms, modes, settings).
+
+Backends are pluggable via CACHE_URL:
+    (unset) / memory://   in-process LRU (default, per worker)
+    redis://host:6379/0   shared Redis (needs the `redis` package)
+    fakeredis://          in-process Redis stand-in, for tests and local runs
+
+Entries are keyed by a per-namespace generation counter stored in the backend,
+so invalidate() is a single INCR and every worker sharing the backend sees it.
+"""
+import hashlib
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+from fastapi import Request, Response
+
+from .responses import dumps
+
+CACHE_URL = os.getenv("CACHE_URL", "memory://")
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "300"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+
+# --- BACKENDS ---
+
+class CacheBackend:
+    """Minimal key/value interface; values are bytes, ttl is in seconds."""
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def incr(self, key: str, ttl: Optional[float] = None) -> int:
+        """Increment a counter; ttl (if given) applies when the counter is created."""
+        raise NotImplementedError
+
+class MemoryBackend(CacheBackend):
+    """Thread-safe LRU with per-entry expiry. Only shared within one process."""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[bytes, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl if ttl else None)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key, ttl=None):
+        with self._lock:
+            value, expires_at = self._data.get(key, (b"0", None))
+            if expires_at is not None and expires_at <= time.monotonic():
+                value, expires_at = b"0", None
+            if value == b"0" and ttl:
+                expires_at = time.monotonic() + ttl
+            value = int(value) + 1
+            self._data[key] = (str(value).encode(), expires_at)
+            return value
+
+class RedisBackend(CacheBackend):
+    """Adapter for any redis-py compatible client (redis.Redis, FakeRedis)."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(key, value, px=int(ttl * 1000) if ttl else None)
+
+    def delete(self, key):
+        self.client.delete(key)
+
+    def incr(self, key, ttl=None):
+        value = self.client.incr(key)
+        if ttl and value == 1:
+            self.client.expire(key, math.ceil(ttl))
+        return value
+
+class FakeRedis:
+    """In-process stand-in for the subset of redis.Redis used by RedisBackend."""
+
+    def __init__(self):
+        self._store = MemoryBackend(max_entries=1 << 30)
+
+    def get(self, name):
+        return self._store.get(name)
+
+    def set(self, name, value, ex=None, px=None):
+        ttl = ex if ex is not None else (px / 1000 if px is not None else None)
+        self._store.set(name, value if isinstance(value, bytes) else str(value).encode(), ttl)
+        return True
+
+    def delete(self, *names):
+        for name in names:
+            self._store.delete(name)
+        return len(names)
+
+    def incr(self, name):
+        return self._store.incr(name) # Keeps an existing expiry, like INCR
+
+    def expire(self, name, seconds):
+        value = self._store.get(name)
+        if value is None:
+            return False
+        self._store.set(name, value, seconds)
+        return True
+
+def backend_from_url(url: str) -> CacheBackend:
+    if url.startswith("redis://") or url.startswith("rediss://"):
+        import redis # Optional dependency, only needed for a shared cache
+        return RedisBackend(redis.Redis.from_url(url))
+    if url.startswith("fakeredis://"):
+        return RedisBackend(FakeRedis())
+    return MemoryBackend()
+
+backend: CacheBackend = backend_from_url(CACHE_URL)
+
+# --- READ-THROUGH JSON CACHE ---
+
+stats: Dict[str, int] = {"hits": 0, "misses": 0, "invalidations": 0}
+
+def _generation(namespace: str) -> bytes:
+    return backend.get(f"gen:{namespace}") or b"0"
+
+def generation(namespace: str) -> str:
+    """Current generation of a namespace; changes on every invalidate()."""
+    return _generation(namespace).decode()
+
+def invalidate(*namespaces: str):
+    for namespace in namespaces:
+        backend.incr(f"gen:{namespace}")
+        stats["invalidations"] += 1
+
+def etag_for(body: bytes) -> str:
+    return '"' + hashlib.sha1(body).hexdigest() + '"'
+
+def serialize(data: Any) -> bytes:
+    return dumps(data)
+
+def cached_json(namespace: str, loader: Callable[[], Any], ttl: float = CACHE_TTL_SECONDS) -> Tuple[str, bytes]:
+    """Return (etag, body) for the namespace, calling loader() only on a miss."""
+    key = f"data:{namespace}:{_generation(namespace).decode()}"
+    entry = backend.get(key)
+    if entry is not None:
+        stats["hits"] += 1
+        etag, body = entry.split(b"\n", 1)
+        return etag.decode(), body
+
+    stats["misses"] += 1
+    body = serialize(loader())
+    etag = etag_for(body)
+    backend.set(key, etag.encode() + b"\n" + body, ttl)
+    return etag, body
+
+def not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in [tag.strip().removeprefix("W/") for tag in header.split(",")]
+
+def cached_json_response(request: Request, namespace: str, loader: Callable[[], Any], ttl: float = CACHE_TTL_SECONDS) -> Response:
+    """JSON response served from cache, or 304 when the client already has this version."""
+    etag, body = cached_json(namespace, loader, ttl)
+    # no-cache: browsers keep the body but revalidate with If-None-Match every time
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
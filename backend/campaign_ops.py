@@ -0,0 +1,141 @@
+"""
+Whole-campaign operations done as set-based SQL: cloning a campaign and moving
+it to another mode.
+
+A clone is one INSERT ... SELECT over the source campaign's posts, with the
+copies reset to unpublished posts (Pending, no posted_date, platform_post_ids
+or performance_metrics), so copying 20k posts is one statement instead of 20k
+ORM objects. The copies inherit their
+originals' near-duplicate index rows (same text) and the new campaign's
+counters are recounted in the same transaction.
+
+A move updates Campaign.mode_id and every post's denormalized `mode` string
+with one UPDATE ... WHERE campaign_id.
+
+    POST /api/campaigns/3/clone {"name": "Spring Drive (copy)"}
+    POST /api/campaigns/3/move {"mode_slug": "awareness"}
+"""
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel
+from sqlmodel import Session, select
+from sqlalchemy import case, func, insert, literal, or_, update
+
+from .database import async_db, get_session
+from .enums import CampaignStatus, PostStatus
+from .models import Campaign, CampaignPost, Mode
+from . import campaign_stats, dedup
+
+post_table = CampaignPost.__table__
+
+# Copies take these values instead of the original's
+RESET_COLUMNS = {
+    "status": PostStatus.PENDING.value,
+    "platform_post_ids": [],
+    "performance_metrics": {},
+    "posted_date": "", # The model default: not posted yet
+}
+
+# --- MODELS ---
+class CloneRequest(BaseModel):
+    name: Optional[str] = None # Defaults to "Copy of <name>"
+    description: Optional[str] = None
+    mode_slug: Optional[str] = None # Clone into another mode; defaults to the source's
+
+class MoveRequest(BaseModel):
+    mode_slug: str
+
+class CampaignOpResult(BaseModel):
+    campaign_id: int
+    name: str
+    mode_id: Optional[int] = None
+    posts: int # Posts copied (clone) or re-moded (move)
+
+# --- HELPERS ---
+
+def load_campaign(session: Session, campaign_id: int) -> Campaign:
+    campaign = session.get(Campaign, campaign_id)
+    if not campaign:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    return campaign
+
+def load_mode(session: Session, slug: str) -> Mode:
+    mode = session.exec(select(Mode).where(Mode.slug == slug)).first()
+    if not mode:
+        raise HTTPException(status_code=404, detail=f"Mode '{slug}' not found")
+    return mode
+
+def copy_posts(session: Session, source_id: int, target_id: int, mode_slug: Optional[str] = None) -> int:
+    """INSERT ... SELECT the source campaign's posts into the target as fresh copies. Returns rows copied."""
+    overrides = {
+        **RESET_COLUMNS,
+        "campaign_id": target_id,
+        "updated_at": datetime.utcnow(), # Python-side defaults don't apply to INSERT ... SELECT
+    }
+    if mode_slug is not None:
+        overrides["mode"] = mode_slug
+    columns = [c for c in post_table.columns if c.name != "id"]
+    source = (
+        select(*[literal(overrides[c.name], c.type) if c.name in overrides else c for c in columns])
+        .where(post_table.c.campaign_id == source_id)
+        .order_by(post_table.c.id)
+    )
+    return session.execute(insert(post_table).from_select([c.name for c in columns], source)).rowcount
+
+def copied_pairs(source_id: int, target_id: int):
+    """(old_id, new_id) for a fresh clone: each copy with an original of the same text."""
+    # Index rows depend only on title + hook_text, so any original with the same text will
+    # do; matching on content doesn't rely on the order the database hands out new ids.
+    # A window over both campaigns is one sort, where a join on the (unindexed) text
+    # columns would be a nested loop on SQLite
+    original = case((post_table.c.campaign_id == source_id, post_table.c.id))
+    grouped = select(
+        post_table.c.id,
+        post_table.c.campaign_id,
+        func.min(original).over(partition_by=(post_table.c.title, post_table.c.hook_text)).label("old_id"),
+    ).where(post_table.c.campaign_id.in_([source_id, target_id])).subquery()
+    return select(grouped.c.old_id, grouped.c.id.label("new_id")).where(
+        grouped.c.campaign_id == target_id, grouped.c.old_id.is_not(None)
+    )
+
+# --- ROUTER ---
+router = APIRouter()
+
+@router.post("/api/campaigns/{campaign_id}/clone", response_model=CampaignOpResult)
+@async_db
+def clone_campaign(campaign_id: int, request: CloneRequest = CloneRequest(), session: Session = Depends(get_session)):
+    source = load_campaign(session, campaign_id)
+    mode = load_mode(session, request.mode_slug) if request.mode_slug else None
+    clone = Campaign(
+        name=request.name or f"Copy of {source.name}",
+        description=source.description if request.description is None else request.description,
+        status=CampaignStatus.ACTIVE,
+        mode_id=mode.id if mode else source.mode_id,
+    )
+    session.add(clone)
+    session.flush()
+
+    copied = copy_posts(session, source.id, clone.id, mode.slug if mode else None)
+    dedup.copy_on_write(session, copied_pairs(source.id, clone.id))
+    campaign_stats.recount_on_write(session, [clone.id])
+    session.commit()
+    return CampaignOpResult(campaign_id=clone.id, name=clone.name, mode_id=clone.mode_id, posts=copied)
+
+@router.post("/api/campaigns/{campaign_id}/move", response_model=CampaignOpResult)
+@async_db
+def move_campaign(campaign_id: int, request: MoveRequest, session: Session = Depends(get_session)):
+    campaign = load_campaign(session, campaign_id)
+    mode = load_mode(session, request.mode_slug)
+    campaign.mode_id = mode.id
+    session.add(campaign)
+    # Posts already in the mode are left alone (and keep their updated_at)
+    moved = session.execute(
+        update(post_table)
+        .where(post_table.c.campaign_id == campaign_id)
+        .where(or_(post_table.c.mode.is_(None), post_table.c.mode != mode.slug))
+        .values(mode=mode.slug)
+    ).rowcount
+    # Mode isn't a counted field and the text is unchanged: counters and dedup index stay valid
+    session.commit()
+    return CampaignOpResult(campaign_id=campaign.id, name=campaign.name, mode_id=mode.id, posts=moved)
@@ -0,0 +1,229 @@
+"""
+Per-campaign aggregates: post totals by status, target platform and category.
+
+By default the stats endpoints run GROUP BY queries over campaignpost. With
+CAMPAIGN_COUNTERS=1 they read the campaigncounter table instead, which every
+write path (create/update post, bulk endpoints, importer) keeps current by
+applying deltas in the same transaction, so a dashboard load touches
+O(campaigns) rows instead of every post. rebuild_campaign_counters()
+recomputes the table from the GROUP BY queries, e.g. after enabling it on an
+existing database or editing posts with raw SQL:
+
+    python -m backend.campaign_stats --rebuild
+"""
+import argparse
+import os
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel
+from sqlmodel import Session, select
+from sqlalchemy import cast, delete, distinct, func, true
+from sqlalchemy.dialects.postgresql import JSONB, insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from .database import IS_SQLITE, async_db, engine, get_session
+from .enums import PostStatus
+from .models import Campaign, CampaignCounter, CampaignPost
+
+CAMPAIGN_COUNTERS = os.getenv("CAMPAIGN_COUNTERS", "0").lower() in ("1", "true", "yes")
+
+# Post columns that feed the counters; write paths compare these before/after
+COUNTED_FIELDS = ("campaign_id", "status", "category_primary", "target_platforms")
+DIMENSIONS = {"status": "by_status", "platform": "by_platform", "category": "by_category"}
+
+counter_table = CampaignCounter.__table__
+
+# --- MODELS ---
+class CampaignStats(BaseModel):
+    campaign_id: int
+    total: int = 0
+    by_status: Dict[str, int] = {}
+    by_platform: Dict[str, int] = {}
+    by_category: Dict[str, int] = {}
+
+def empty_stats(campaign_id: int) -> CampaignStats:
+    return CampaignStats(campaign_id=campaign_id, by_status={status.value: 0 for status in PostStatus})
+
+# --- GROUP BY AGGREGATION ---
+
+def platform_elements():
+    # target_platforms is a JSON array; expand it to one row per slug
+    if IS_SQLITE:
+        return func.json_each(CampaignPost.target_platforms).table_valued("value").alias("platform")
+    return func.jsonb_array_elements_text(cast(CampaignPost.target_platforms, JSONB)).table_valued("value").alias("platform")
+
+def aggregate_counts(session: Session, campaign_ids: Optional[List[int]] = None) -> Counter:
+    """(campaign_id, dimension, value) -> count, straight from campaignpost."""
+    def scoped(query):
+        query = query.where(CampaignPost.campaign_id.is_not(None))
+        return query.where(CampaignPost.campaign_id.in_(campaign_ids)) if campaign_ids is not None else query
+
+    counts = Counter()
+    for dimension, column in (("status", CampaignPost.status), ("category", CampaignPost.category_primary)):
+        query = scoped(select(CampaignPost.campaign_id, column, func.count()).group_by(CampaignPost.campaign_id, column))
+        for campaign_id, value, count in session.execute(query).all():
+            counts[(campaign_id, dimension, value or "")] += count
+            if dimension == "status":
+                counts[(campaign_id, "total", "")] += count
+
+    platforms = platform_elements()
+    query = scoped(
+        select(CampaignPost.campaign_id, platforms.c.value, func.count(distinct(CampaignPost.id)))
+        .select_from(CampaignPost)
+        .join(platforms, true())
+        .group_by(CampaignPost.campaign_id, platforms.c.value)
+    )
+    for campaign_id, slug, count in session.execute(query).all():
+        counts[(campaign_id, "platform", slug)] = count
+    return counts
+
+# --- MATERIALIZED COUNTERS ---
+
+def counted_values(post: Any) -> Dict[str, Any]:
+    if isinstance(post, dict):
+        return {field: post.get(field) for field in COUNTED_FIELDS}
+    return {field: getattr(post, field) for field in COUNTED_FIELDS}
+
+def contributions(post: Dict[str, Any]) -> Counter:
+    """Counter rows one post adds to its campaign (nothing if unlinked)."""
+    campaign_id = post.get("campaign_id")
+    if campaign_id is None:
+        return Counter()
+    status = post.get("status") or PostStatus.PENDING
+    counts = Counter({
+        (campaign_id, "total", ""): 1,
+        (campaign_id, "status", getattr(status, "value", status)): 1,
+        (campaign_id, "category", post.get("category_primary") or ""): 1,
+    })
+    for slug in set(post.get("target_platforms") or []):
+        counts[(campaign_id, "platform", slug)] += 1
+    return counts
+
+def upsert_counts(session: Session, deltas: Counter):
+    rows = [
+        {"campaign_id": campaign_id, "dimension": dimension, "value": value, "count": count}
+        for (campaign_id, dimension, value), count in deltas.items() if count
+    ]
+    if not rows:
+        return
+    stmt = (sqlite_insert if IS_SQLITE else pg_insert)(counter_table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["campaign_id", "dimension", "value"],
+        set_={"count": counter_table.c.count + stmt.excluded["count"]},
+    )
+    session.execute(stmt, rows)
+
+def apply_changes(session: Session, before: Iterable[Dict[str, Any]] = (), after: Iterable[Dict[str, Any]] = ()):
+    """Move counters from the `before` versions of some posts to their `after` versions.
+
+    Creates pass only `after`, deletes only `before`. Call inside the write's
+    transaction so counters commit (or roll back) with the posts.
+    """
+    if not CAMPAIGN_COUNTERS:
+        return
+    deltas = Counter()
+    for post in after:
+        deltas.update(contributions(counted_values(post)))
+    for post in before:
+        deltas.subtract(contributions(counted_values(post)))
+    upsert_counts(session, deltas)
+
+def load_counted(session: Session, post_ids: List[int]) -> List[Dict[str, Any]]:
+    """Current counted columns for some posts, for computing bulk update deltas."""
+    if not post_ids:
+        return []
+    columns = [getattr(CampaignPost, field) for field in COUNTED_FIELDS]
+    rows = session.execute(select(CampaignPost.id, *columns).where(CampaignPost.id.in_(post_ids))).all()
+    return [dict(zip(("id",) + COUNTED_FIELDS, row)) for row in rows]
+
+def replace_counts(session: Session, campaign_ids: Optional[List[int]] = None) -> int:
+    query = delete(counter_table)
+    if campaign_ids is not None:
+        query = query.where(counter_table.c.campaign_id.in_(campaign_ids))
+    session.execute(query)
+    counts = aggregate_counts(session, campaign_ids)
+    upsert_counts(session, counts)
+    return len(counts)
+
+def rebuild_campaign_counters(session: Session, campaign_ids: Optional[List[int]] = None) -> int:
+    """Recompute counters from campaignpost (all campaigns, or just campaign_ids). Commits."""
+    rows = replace_counts(session, campaign_ids)
+    session.commit()
+    return rows
+
+def recount_on_write(session: Session, campaign_ids: List[int]):
+    # For set-based writes (INSERT ... SELECT) that never load the posts: recount
+    # the campaigns from campaignpost, in the write's transaction
+    if CAMPAIGN_COUNTERS and campaign_ids:
+        replace_counts(session, campaign_ids)
+
+def ensure_counters():
+    # First start with counters enabled: seed the table from existing posts
+    if not CAMPAIGN_COUNTERS:
+        return
+    with Session(engine) as session:
+        if session.exec(select(CampaignCounter.campaign_id).limit(1)).first() is None:
+            rows = rebuild_campaign_counters(session)
+            print(f"✅ Campaign counters built ({rows} rows)")
+
+def counter_counts(session: Session, campaign_ids: Optional[List[int]] = None) -> Counter:
+    query = select(CampaignCounter.campaign_id, CampaignCounter.dimension, CampaignCounter.value, CampaignCounter.count)
+    query = query.where(CampaignCounter.count != 0)
+    if campaign_ids is not None:
+        query = query.where(CampaignCounter.campaign_id.in_(campaign_ids))
+    return Counter({(campaign_id, dimension, value): count for campaign_id, dimension, value, count in session.execute(query).all()})
+
+def build_stats(campaign_ids: List[int], counts: Counter) -> List[CampaignStats]:
+    stats = {campaign_id: empty_stats(campaign_id) for campaign_id in campaign_ids}
+    for (campaign_id, dimension, value), count in counts.items():
+        if campaign_id not in stats:
+            continue
+        if dimension == "total":
+            stats[campaign_id].total = count
+        else:
+            getattr(stats[campaign_id], DIMENSIONS[dimension])[value] = count
+    return list(stats.values())
+
+def campaign_stats(session: Session, campaign_ids: Optional[List[int]] = None) -> List[CampaignStats]:
+    if campaign_ids is None:
+        campaign_ids = list(session.exec(select(Campaign.id).order_by(Campaign.id)).all())
+        scope = None # Whole table: skip the IN (...) filter
+    else:
+        scope = campaign_ids
+    counts = counter_counts(session, scope) if CAMPAIGN_COUNTERS else aggregate_counts(session, scope)
+    return build_stats(campaign_ids, counts)
+
+# --- ROUTER ---
+router = APIRouter()
+
+@router.get("/api/campaigns/stats", response_model=List[CampaignStats])
+@async_db
+def read_all_campaign_stats(session: Session = Depends(get_session)):
+    return campaign_stats(session)
+
+@router.get("/api/campaigns/{campaign_id}/stats", response_model=CampaignStats)
+@async_db
+def read_campaign_stats(campaign_id: int, session: Session = Depends(get_session)):
+    if not session.get(Campaign, campaign_id):
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    return campaign_stats(session, [campaign_id])[0]
+
+@router.post("/api/campaigns/stats/rebuild")
+@async_db
+def rebuild_counters(session: Session = Depends(get_session)):
+    if not CAMPAIGN_COUNTERS:
+        raise HTTPException(status_code=400, detail="Campaign counters are disabled (CAMPAIGN_COUNTERS=0)")
+    return {"rows": rebuild_campaign_counters(session)}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Campaign counter maintenance.")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute campaigncounter from campaignpost")
+    args = parser.parse_args()
+    if args.rebuild:
+        from .database import create_db_and_tables
+        create_db_and_tables()
+        with Session(engine) as session:
+            print(f"✅ Rebuilt campaign counters ({rebuild_campaign_counters(session)} rows)")
+    else:
+        parser.print_help()
@@ -0,0 +1,72 @@
+"""
+Response compression: brotli when the client and server support it, else gzip.
+
+Bodies under COMPRESSION_MIN_SIZE bytes, already-encoded responses, SSE
+streams and already-compressed media types are passed through untouched.
+Built on Starlette's GZip responders so streaming responses are compressed
+chunk by chunk.
+"""
+import os
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipResponder, IdentityResponder
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .static_media import accepted_encodings
+
+try:
+    import brotli # Optional dependency; gzip is used without it
+except ImportError:
+    brotli = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6")) # 9 costs a lot of CPU for ~1% smaller JSON
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4")) # Dynamic content; 11 is for static assets
+
+# Images, video and archives are already compressed
+INCOMPRESSIBLE_TYPES = ("image/", "video/", "audio/", "application/zip", "application/gzip", "font/woff")
+
+class SkipIncompressible:
+    async def send_with_compression(self, message: Message) -> None:
+        await super().send_with_compression(message)
+        if message["type"] == "http.response.start":
+            content_type = Headers(raw=message["headers"]).get("content-type", "")
+            if content_type.startswith(INCOMPRESSIBLE_TYPES) and "svg" not in content_type:
+                self.content_type_is_excluded = True
+
+class PlainResponder(SkipIncompressible, IdentityResponder):
+    pass
+
+class GzipResponder(SkipIncompressible, GZipResponder):
+    pass
+
+class BrotliResponder(SkipIncompressible, IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int = BROTLI_QUALITY) -> None:
+        super().__init__(app, minimum_size)
+        self.compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=quality)
+
+    def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        # flush() per chunk so streamed responses reach the client incrementally
+        data = self.compressor.process(body)
+        return data + (self.compressor.flush() if more_body else self.compressor.finish())
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESSION_MIN_SIZE, gzip_level: int = GZIP_LEVEL) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accepted = accepted_encodings(Headers(scope=scope))
+        if brotli is not None and "br" in accepted:
+            responder = BrotliResponder(self.app, self.minimum_size)
+        elif "gzip" in accepted:
+            responder = GzipResponder(self.app, self.minimum_size, compresslevel=self.gzip_level)
+        else:
+            responder = PlainResponder(self.app, self.minimum_size)
+        await responder(scope, receive, send)
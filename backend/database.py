@@ -1,5 +1,11 @@
+import functools
+import inspect
 import os
+from fastapi import Depends
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -8,13 +14,55 @@ load_dotenv()
 # Get DB URL from env, or default to SQLite for local dev fallback
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///database.db")
 
-# Check if we are using SQLite (for connect_args)
-if "sqlite" in DATABASE_URL:
+# Check if we are using SQLite (for connect_args and dialect-specific SQL)
+IS_SQLITE = "sqlite" in DATABASE_URL
+
+# SQL logging is for local development only; SQL_ECHO overrides either way
+IS_DEV = "dev" in os.getenv("ENV", "dev")
+SQL_ECHO = os.getenv("SQL_ECHO", "1" if IS_DEV else "0").lower() in ("1", "true", "yes")
+
+# Connection pool (Postgres). Defaults are sized above SQLAlchemy's 5+10 so a
+# single worker can serve concurrent requests without queueing on the pool.
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30")) # Seconds to wait for a free connection
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800")) # Recycle before Supabase/PgBouncer drops idle connections
+
+# Opt-in async engine (asyncpg / aiosqlite) for the post, campaign, platform and mode routes
+ASYNC_DB = os.getenv("ASYNC_DB", "0").lower() in ("1", "true", "yes")
+
+def pool_kwargs():
+    if IS_SQLITE:
+        return {}
+    return {
+        "pool_size": POOL_SIZE,
+        "max_overflow": MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_recycle": POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
+if IS_SQLITE:
     connect_args = {"check_same_thread": False}
-    engine = create_engine(DATABASE_URL, echo=True, connect_args=connect_args)
+    engine = create_engine(DATABASE_URL, echo=SQL_ECHO, connect_args=connect_args)
 else:
     # PostgreSQL (Supabase) doesn't need check_same_thread
-    engine = create_engine(DATABASE_URL, echo=True)
+    engine = create_engine(DATABASE_URL, echo=SQL_ECHO, **pool_kwargs())
+
+def async_database_url(url: str):
+    # Swap the sync driver for its asyncio counterpart
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    # asyncpg takes ssl=... rather than libpq's sslmode=...
+    query = dict(url.query)
+    if "sslmode" in query:
+        query["ssl"] = query.pop("sslmode")
+    return url.set(drivername="postgresql+asyncpg", query=query)
+
+async_engine = None
+if ASYNC_DB:
+    async_engine = create_async_engine(async_database_url(DATABASE_URL), echo=SQL_ECHO, **pool_kwargs())
 
 def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
@@ -22,3 +70,32 @@ def create_db_and_tables():
 def get_session():
     with Session(engine) as session:
         yield session
+
+async def get_async_session():
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+def async_db(endpoint):
+    """Serve a sync route on the event loop through AsyncSession when ASYNC_DB is on.
+
+    The route body runs unchanged inside AsyncSession.run_sync, so its queries
+    go through the async driver instead of blocking a threadpool worker.
+    With ASYNC_DB off the route is returned as-is.
+    """
+    if not ASYNC_DB:
+        return endpoint
+
+    signature = inspect.signature(endpoint)
+    parameters = [
+        p.replace(annotation=AsyncSession, default=Depends(get_async_session)) if p.name == "session" else p
+        for p in signature.parameters.values()
+    ]
+
+    async def wrapper(*args, session: AsyncSession, **kwargs):
+        return await session.run_sync(lambda sync_session: endpoint(*args, session=sync_session, **kwargs))
+
+    # Copy metadata without __wrapped__: FastAPI unwraps it to decide sync vs async
+    functools.update_wrapper(wrapper, endpoint, updated=())
+    del wrapper.__wrapped__
+    wrapper.__signature__ = signature.replace(parameters=parameters)
+    return wrapper
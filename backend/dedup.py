@@ -0,0 +1,377 @@
+"""
+Near-duplicate post detection with MinHash + locality-sensitive hashing.
+
+Each post's title + hook_text is normalized, cut into character shingles and
+reduced to a NUM_PERM-value MinHash signature (postsignature). The signature
+is split into BANDS bands whose hashes are stored in postlshbucket; two posts
+are candidates only if they share a bucket, so lookups touch a handful of
+rows instead of comparing against every post. Candidates are then scored by
+signature agreement, which estimates the Jaccard similarity of the shingles.
+
+With 16 bands of 4 rows, pairs at 0.7 similarity are found ~98% of the time
+and pairs below 0.3 rarely become candidates.
+
+Usage:
+    python -m backend.dedup sync                 # index new/changed posts
+    python -m backend.dedup report [--threshold 0.8]
+"""
+import argparse
+import hashlib
+import os
+import re
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from sqlmodel import Session, select
+from sqlalchemy import delete, insert, tuple_
+
+from .database import async_db, engine, get_session
+from .models import CampaignPost, PostLshBucket, PostSignature
+
+# --- CONFIG ---
+DEDUP_ON_WRITE = os.getenv("DEDUP_ON_WRITE", "1").lower() in ("1", "true", "yes")
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.7"))
+SHINGLE_SIZE = 5
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+MAX_BUCKET_SIZE = 500 # Larger buckets are boilerplate (e.g. identical templates); skipped in reports
+SYNC_BATCH_SIZE = 2000
+INDEXED_FIELDS = ("title", "hook_text")
+
+# Fixed permutations so signatures stay comparable across processes and restarts
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, (1 << 61) - 1, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, (1 << 61) - 1, size=NUM_PERM, dtype=np.uint64)
+
+signature_table = PostSignature.__table__
+bucket_table = PostLshBucket.__table__
+
+# --- SIGNATURES ---
+
+def normalize(title: Optional[str], hook_text: Optional[str]) -> str:
+    return " ".join(re.findall(r"\w+", f"{title or ''} {hook_text or ''}".lower()))
+
+def content_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+def minhash(text: str) -> Optional[np.ndarray]:
+    """NUM_PERM uint32 MinHash values, or None if the text is too short to shingle."""
+    if len(text) < SHINGLE_SIZE:
+        return None
+    shingles = {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+    # (a*x + b) mod p for every shingle x and permutation (a, b); uint64 wrap-around is part of the hash
+    permuted = (np.outer(hashes, _PERM_A) + _PERM_B) % _MERSENNE_PRIME
+    return (permuted.min(axis=0) & np.uint64(0xFFFFFFFF)).astype("<u4")
+
+def band_keys(signature: np.ndarray) -> List[str]:
+    return [hashlib.blake2b(signature[b * ROWS:(b + 1) * ROWS].tobytes(), digest_size=8).hexdigest() for b in range(BANDS)]
+
+def encode(signature: np.ndarray) -> str:
+    return signature.tobytes().hex()
+
+def decode(value: str) -> np.ndarray:
+    return np.frombuffer(bytes.fromhex(value), dtype="<u4")
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.mean(a == b))
+
+# --- INDEX MAINTENANCE ---
+
+def index_posts(session: Session, posts: Iterable[Any]) -> int:
+    """(Re)index posts given as objects or dicts with id, title and hook_text. Returns rows re-hashed.
+
+    Posts whose normalized text is unchanged are skipped. Does not commit.
+    """
+    by_id = {}
+    for post in posts:
+        get = post.get if isinstance(post, dict) else lambda field: getattr(post, field)
+        if get("id") is not None:
+            by_id[get("id")] = normalize(get("title"), get("hook_text"))
+    if not by_id:
+        return 0
+
+    known = dict(session.execute(
+        select(PostSignature.post_id, PostSignature.content_hash).where(PostSignature.post_id.in_(list(by_id)))
+    ).all())
+    signatures, buckets, stale = [], [], []
+    for post_id, text in by_id.items():
+        digest = content_hash(text)
+        if known.get(post_id) == digest:
+            continue
+        if post_id in known:
+            stale.append(post_id)
+        signature = minhash(text)
+        if signature is None:
+            continue # Too short to compare meaningfully
+        signatures.append({"post_id": post_id, "content_hash": digest, "signature": encode(signature)})
+        buckets.extend({"band": band, "bucket": key, "post_id": post_id} for band, key in enumerate(band_keys(signature)))
+
+    if stale:
+        session.execute(delete(bucket_table).where(bucket_table.c.post_id.in_(stale)))
+        session.execute(delete(signature_table).where(signature_table.c.post_id.in_(stale)))
+    if signatures:
+        session.execute(insert(signature_table), signatures)
+        session.execute(insert(bucket_table), buckets)
+    return len(signatures)
+
+def index_on_write(session: Session, posts: Iterable[Any]):
+    # Hook for write paths; a no-op when DEDUP_ON_WRITE is off (run `sync` instead)
+    if DEDUP_ON_WRITE:
+        index_posts(session, posts)
+
+def reindex_on_write(session: Session, post_ids: List[int]):
+    # For bulk updates that only know ids: re-read the text and re-index
+    if DEDUP_ON_WRITE and post_ids:
+        rows = session.execute(
+            select(CampaignPost.id, CampaignPost.title, CampaignPost.hook_text).where(CampaignPost.id.in_(post_ids))
+        ).all()
+        index_posts(session, [{"id": i, "title": t, "hook_text": h} for i, t, h in rows])
+
+def copy_on_write(session: Session, pairs: Any):
+    """For set-based copies (INSERT ... SELECT): give each copy its original's index rows.
+
+    `pairs` selects (old_id, new_id). The text is identical, so nothing is re-hashed. Does not commit.
+    """
+    if not DEDUP_ON_WRITE:
+        return
+    pairs = pairs.subquery()
+    session.execute(insert(signature_table).from_select(
+        ["post_id", "content_hash", "signature"],
+        select(pairs.c.new_id, PostSignature.content_hash, PostSignature.signature)
+        .join(pairs, pairs.c.old_id == PostSignature.post_id),
+    ))
+    session.execute(insert(bucket_table).from_select(
+        ["band", "bucket", "post_id"],
+        select(PostLshBucket.band, PostLshBucket.bucket, pairs.c.new_id).join(pairs, pairs.c.old_id == PostLshBucket.post_id),
+    ))
+
+def sync_index(session: Session, batch_size: int = SYNC_BATCH_SIZE) -> int:
+    """Bring the index up to date with every post (new, edited and deleted). Commits per batch."""
+    # Posts deleted outside the ORM leave orphans behind
+    orphaned = select(PostSignature.post_id).where(PostSignature.post_id.not_in(select(CampaignPost.id)))
+    session.execute(delete(bucket_table).where(bucket_table.c.post_id.in_(orphaned)))
+    session.execute(delete(signature_table).where(signature_table.c.post_id.in_(orphaned)))
+    session.commit()
+
+    indexed, last_id = 0, 0
+    while True:
+        # Keyset batches keep memory flat and don't hold one long read open
+        rows = session.execute(
+            select(CampaignPost.id, CampaignPost.title, CampaignPost.hook_text)
+            .where(CampaignPost.id > last_id).order_by(CampaignPost.id).limit(batch_size)
+        ).all()
+        if not rows:
+            return indexed
+        indexed += index_posts(session, [{"id": i, "title": t, "hook_text": h} for i, t, h in rows])
+        session.commit()
+        last_id = rows[-1][0]
+
+# --- LOOKUP ---
+
+def candidate_ids(session: Session, keys: Sequence[Tuple[int, str]]) -> Dict[Tuple[int, str], List[int]]:
+    """(band, bucket) -> post ids sharing it, for all keys in one query."""
+    result: Dict[Tuple[int, str], List[int]] = {}
+    keys = list(dict.fromkeys(keys))
+    for start in range(0, len(keys), 500): # Stay under bind-parameter limits
+        chunk = keys[start:start + 500]
+        rows = session.execute(
+            select(PostLshBucket.band, PostLshBucket.bucket, PostLshBucket.post_id)
+            .where(tuple_(PostLshBucket.band, PostLshBucket.bucket).in_(chunk))
+        ).all()
+        for band, bucket, post_id in rows:
+            result.setdefault((band, bucket), []).append(post_id)
+    return result
+
+def load_signatures(session: Session, post_ids: Iterable[int]) -> Dict[int, np.ndarray]:
+    post_ids = list(set(post_ids))
+    signatures = {}
+    for start in range(0, len(post_ids), 500):
+        rows = session.execute(
+            select(PostSignature.post_id, PostSignature.signature).where(PostSignature.post_id.in_(post_ids[start:start + 500]))
+        ).all()
+        signatures.update((post_id, decode(value)) for post_id, value in rows)
+    return signatures
+
+def find_similar(session: Session, texts: Sequence[Tuple[Optional[str], Optional[str]]], threshold: float = DEDUP_THRESHOLD,
+                 exclude: Sequence[Optional[int]] = ()) -> List[List[Tuple[int, float]]]:
+    """For each (title, hook_text), indexed posts at or above threshold as (post_id, similarity), best first.
+
+    exclude[i] (if given) is a post id to leave out of text i's matches, e.g. the post itself.
+    """
+    signatures = [minhash(normalize(title, hook)) for title, hook in texts]
+    keys = [list(enumerate(band_keys(sig))) if sig is not None else [] for sig in signatures]
+    buckets = candidate_ids(session, [key for item_keys in keys for key in item_keys])
+    candidates = [{pid for key in item_keys for pid in buckets.get(key, [])} for item_keys in keys]
+    stored = load_signatures(session, set().union(*candidates) if candidates else set())
+
+    results = []
+    for i, sig in enumerate(signatures):
+        own_id = exclude[i] if i < len(exclude) else None
+        ids = [post_id for post_id in candidates[i] if post_id != own_id and post_id in stored]
+        if not ids:
+            results.append([])
+            continue
+        # Score all candidates at once; boilerplate-heavy buckets can hold thousands
+        scores = (np.stack([stored[post_id] for post_id in ids]) == sig).mean(axis=1)
+        matches = sorted(((post_id, float(score)) for post_id, score in zip(ids, scores) if score >= threshold),
+                         key=lambda m: (-m[1], m[0]))
+        results.append(matches)
+    return results
+
+class BatchDeduplicator:
+    """Near-duplicate filter for a stream of new posts (e.g. an import).
+
+    Checks each chunk against the stored index in one pass, and against the
+    posts already accepted from the same stream through an in-memory LSH.
+    """
+
+    def __init__(self, session: Session, threshold: float = DEDUP_THRESHOLD):
+        self.session = session
+        self.threshold = threshold
+        self._buckets: Dict[Tuple[int, str], List[int]] = {}
+        self._accepted: List[np.ndarray] = []
+
+    def filter(self, rows: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+        """Return (rows to keep, number dropped as near-duplicates)."""
+        existing = find_similar(self.session, [(r.get("title"), r.get("hook_text")) for r in rows], self.threshold)
+        kept = []
+        for row, matches in zip(rows, existing):
+            if matches:
+                continue
+            signature = minhash(normalize(row.get("title"), row.get("hook_text")))
+            if signature is not None:
+                keys = list(enumerate(band_keys(signature)))
+                seen = {i for key in keys for i in self._buckets.get(key, [])}
+                if any(similarity(signature, self._accepted[i]) >= self.threshold for i in seen):
+                    continue
+                for key in keys:
+                    self._buckets.setdefault(key, []).append(len(self._accepted))
+                self._accepted.append(signature)
+            kept.append(row)
+        return kept, len(rows) - len(kept)
+
+def duplicate_clusters(session: Session, threshold: float = DEDUP_THRESHOLD) -> List[List[Tuple[int, int, float]]]:
+    """Groups of near-duplicate posts across the whole index, as lists of (post_id, root_id, similarity)."""
+    # Stream buckets in key order; only buckets with 2+ posts hold candidates.
+    # Near-identical posts share most bands, so identical member sets are scored once.
+    groups = set()
+    current, members = None, []
+    query = select(PostLshBucket.band, PostLshBucket.bucket, PostLshBucket.post_id).order_by(PostLshBucket.band, PostLshBucket.bucket)
+    for band, bucket, post_id in session.execute(query.execution_options(yield_per=SYNC_BATCH_SIZE)):
+        if (band, bucket) != current:
+            if 1 < len(members) <= MAX_BUCKET_SIZE:
+                groups.add(tuple(sorted(members)))
+            current, members = (band, bucket), []
+        members.append(post_id)
+    if 1 < len(members) <= MAX_BUCKET_SIZE:
+        groups.add(tuple(sorted(members)))
+
+    signatures = load_signatures(session, {post_id for group in groups for post_id in group})
+    parent: Dict[int, int] = {}
+
+    def root(x: int) -> int:
+        while parent.get(x, x) != x:
+            parent[x] = parent.get(parent[x], parent[x])
+            x = parent[x]
+        return x
+
+    scores: Dict[int, float] = {}
+    for group in groups:
+        # All pairs in the bucket at once: (n, n) agreement matrix
+        matrix = np.stack([signatures[post_id] for post_id in group])
+        agreement = (matrix[:, None, :] == matrix[None, :, :]).mean(axis=2)
+        for i, j in zip(*np.nonzero(np.triu(agreement >= threshold, k=1))):
+            a, b = group[i], group[j]
+            ra, rb = root(a), root(b)
+            if ra != rb:
+                parent[max(ra, rb)] = min(ra, rb)
+            scores[b] = max(scores.get(b, 0.0), float(agreement[i, j]))
+
+    clusters: Dict[int, List[Tuple[int, int, float]]] = {}
+    for post_id in set(parent) | set(parent.values()):
+        r = root(post_id)
+        clusters.setdefault(r, []).append((post_id, r, scores.get(post_id, 1.0)))
+    return [sorted(members) for _, members in sorted(clusters.items()) if len(members) > 1]
+
+# --- MODELS ---
+class SimilarPost(BaseModel):
+    id: int
+    title: str
+    hook_text: str
+    campaign_id: Optional[int] = None
+    status: str
+    similarity: float
+
+class DuplicateCheckItem(BaseModel):
+    title: str
+    hook_text: str = ""
+
+class DuplicateCheckRequest(BaseModel):
+    posts: List[DuplicateCheckItem]
+    threshold: float = DEDUP_THRESHOLD
+
+def similar_posts(session: Session, matches: List[Tuple[int, float]], limit: int) -> List[SimilarPost]:
+    matches = matches[:limit]
+    posts = {p.id: p for p in session.exec(select(CampaignPost).where(CampaignPost.id.in_([m[0] for m in matches]))).all()} if matches else {}
+    return [
+        SimilarPost(id=post_id, title=posts[post_id].title, hook_text=posts[post_id].hook_text,
+                    campaign_id=posts[post_id].campaign_id, status=posts[post_id].status, similarity=round(score, 4))
+        for post_id, score in matches if post_id in posts
+    ]
+
+# --- ROUTER ---
+router = APIRouter()
+
+@router.post("/api/posts/similar/check", response_model=List[List[SimilarPost]])
+@async_db
+def check_duplicates(request: DuplicateCheckRequest, session: Session = Depends(get_session)):
+    if len(request.posts) > 1000:
+        raise HTTPException(status_code=400, detail="At most 1000 posts per check")
+    matches = find_similar(session, [(p.title, p.hook_text) for p in request.posts], request.threshold)
+    return [similar_posts(session, item, limit=10) for item in matches]
+
+@router.get("/api/posts/{post_id}/similar", response_model=List[SimilarPost])
+@async_db
+def read_similar_posts(post_id: int, threshold: float = Query(DEDUP_THRESHOLD, ge=0.0, le=1.0),
+                       limit: int = Query(20, ge=1, le=200), session: Session = Depends(get_session)):
+    post = session.get(CampaignPost, post_id)
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+    matches = find_similar(session, [(post.title, post.hook_text)], threshold, exclude=[post_id])[0]
+    return similar_posts(session, matches, limit)
+
+# --- CLI ---
+
+def print_report(threshold: float):
+    with Session(engine) as session:
+        indexed = sync_index(session)
+        print(f"📦 Index synced ({indexed} posts hashed)")
+        clusters = duplicate_clusters(session, threshold)
+        titles = dict(session.execute(select(CampaignPost.id, CampaignPost.title).where(
+            CampaignPost.id.in_([post_id for cluster in clusters for post_id, _, _ in cluster])
+        )).all()) if clusters else {}
+    print(f"🔎 {len(clusters)} near-duplicate groups at similarity ≥ {threshold}")
+    for cluster in clusters:
+        print(f"\n— {len(cluster)} posts")
+        for post_id, root_id, score in cluster:
+            marker = "  " if post_id == root_id else f"~{score:.2f}"
+            print(f"   {marker} #{post_id}: {titles.get(post_id, '')}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Near-duplicate post detection.")
+    parser.add_argument("command", choices=["sync", "report"])
+    parser.add_argument("--threshold", type=float, default=DEDUP_THRESHOLD)
+    args = parser.parse_args()
+
+    from .database import create_db_and_tables
+    create_db_and_tables()
+    if args.command == "sync":
+        with Session(engine) as session:
+            print(f"✅ Indexed {sync_index(session)} new or changed posts")
+    else:
+        print_report(args.threshold)
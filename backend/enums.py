@@ -16,3 +16,10 @@ class ModeSlug(str, Enum):
     POLITICAL = "political"
     EDUCATION = "education"
     AWARENESS = "awareness"
+
+class PublishStatus(str, Enum):
+    QUEUED = "Queued"
+    RUNNING = "Running"
+    PUBLISHED = "Published"
+    FAILED = "Failed"
+    CANCELLED = "Cancelled"
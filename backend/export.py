@@ -0,0 +1,411 @@
+"""
+Columnar analytics export: posts, campaigns, platforms and metrics as Parquet
+or Arrow IPC (stream format), for analysts instead of scraping /api/posts.
+
+Rows are read with yield_per and written one row group (EXPORT_ROW_GROUP rows)
+at a time, and each group's bytes are handed to the client before the next is
+read, so memory stays bounded by one group whatever the table size. JSON
+columns become typed columns: target_platforms is a list<string> plus one
+target_<slug> boolean per platform, platform_post_ids a list of structs, and
+the performance_metrics snapshot (see metrics.py) metric_total_<name> totals,
+metric_<slug>__<name> per-platform values and metrics_as_of.
+
+Exports are incremental given a watermark: posts, campaigns and platforms by
+updated_at, metric points by received_at (their ingest time). Each export
+reads the current high-water mark before streaming, exports rows above
+`since` and up to it, and returns it (X-Export-Watermark header, or the CLI's
+state file) to pass as `since` next time. Both timestamps are taken before
+commit, so marks trail the clock by EXPORT_WATERMARK_LAG: rows written by a
+transaction that hasn't committed yet aren't skipped, and recent changes show
+up in the following export. Metric rollups change in place and are always
+exported whole; deleted rows aren't reported.
+
+    GET /api/export/analytics/posts?format=parquet&since=2026-10-01T00:00:00
+    python -m backend.export analytics --out exports/ [--format arrow] [--incremental]
+
+Needs pyarrow (optional: without it these endpoints answer 501).
+
+Campaign export (backups and hand-offs) streams one campaign's posts as
+NDJSON or CSV in the importer's format, gzipped on the fly by default, so a
+file from /api/campaigns/{id}/export goes straight back in through
+`python -m backend.import_engine archive|restore <file>`:
+
+    GET /api/campaigns/3/export?format=csv
+    python -m backend.export campaign 3 --out campaign-3.ndjson.gz
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import re
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session, select
+from sqlalchemy import Boolean, DateTime, Float, Integer, JSON, false, func, or_
+
+from .database import async_db, engine, get_session
+from .import_engine import JSON_COLUMNS
+from .models import Campaign, CampaignPost, MetricDaily, MetricLatest, MetricPoint, Platform
+from .responses import dumps
+
+try:
+    import pyarrow as pa # Optional dependency, only needed for exports
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# --- CONFIG ---
+EXPORT_ROW_GROUP = int(os.getenv("EXPORT_ROW_GROUP", "50000")) # Rows per row group / record batch
+EXPORT_PARQUET_COMPRESSION = os.getenv("EXPORT_PARQUET_COMPRESSION", "zstd")
+EXPORT_WATERMARK_LAG = float(os.getenv("EXPORT_WATERMARK_LAG", "300")) # Seconds; longer than any write transaction
+EXPORT_FETCH_SIZE = int(os.getenv("EXPORT_FETCH_SIZE", "1000")) # Campaign export rows per fetch (and per gzip flush)
+
+FORMATS = {
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+def require_pyarrow():
+    if pa is None:
+        raise HTTPException(status_code=501, detail="Analytics export needs pyarrow (pip install pyarrow)")
+
+def column_name(*parts: str, separator: str = "_") -> str:
+    # Platform slugs and metric names become identifiers analysts can type. Parts never
+    # contain "__", so a "__" separator keeps multi-part names apart ("x", "a_b" vs "x_a", "b")
+    return separator.join(re.sub(r"[^a-z0-9]+", "_", part.lower()).strip("_") for part in parts)
+
+def check_unique(name: str, columns: "Columns"):
+    # Distinct slugs/metrics can still normalize to one identifier ("Likes" and "likes")
+    seen, clashes = set(), set()
+    for column, _, _ in columns:
+        (clashes if column in seen else seen).add(column)
+    if clashes:
+        raise HTTPException(status_code=409, detail=f"Export of {name} has clashing column names: {', '.join(sorted(clashes))}")
+
+def arrow_type(column):
+    if isinstance(column.type, Boolean):
+        return pa.bool_()
+    if isinstance(column.type, Integer):
+        return pa.int64()
+    if isinstance(column.type, Float):
+        return pa.float64()
+    if isinstance(column.type, DateTime):
+        return pa.timestamp("us")
+    return pa.string() # String, AutoString and the enum columns stored as strings
+
+# --- DATASETS ---
+
+Columns = List[Tuple[str, Any, Callable[[List[Any]], List[Any]]]] # (name, arrow type, rows -> values)
+
+class Dataset:
+    """One exportable table: its scalar columns; subclasses add typed columns derived from JSON ones."""
+
+    def __init__(self, model, watermark: Optional[str]):
+        self.table = model.__table__
+        self.watermark = self.table.c[watermark] if watermark else None
+        self.scalars = [c for c in self.table.columns if not isinstance(c.type, JSON)]
+        self.json = [c for c in self.table.columns if isinstance(c.type, JSON)] # Selected after the scalars
+
+    def columns(self, session: Session) -> Columns:
+        return [(c.name, arrow_type(c), lambda rows, i=i: [row[i] for row in rows]) for i, c in enumerate(self.scalars)]
+
+    def high_water_mark(self, session: Session):
+        if self.watermark is None:
+            return None
+        latest = session.execute(select(func.max(self.watermark))).scalar()
+        if latest is not None and isinstance(self.watermark.type, DateTime):
+            # Stamped before commit, so a slow transaction can commit a row stamped
+            # below the latest committed one; hold the mark back until it must be visible
+            latest = min(latest, datetime.utcnow() - timedelta(seconds=EXPORT_WATERMARK_LAG))
+        return latest
+
+    def parse_watermark(self, value: str):
+        if isinstance(self.watermark.type, DateTime):
+            return datetime.fromisoformat(value).replace(tzinfo=None)
+        return int(value)
+
+    def query(self, since, upper):
+        query = select(*self.scalars, *self.json)
+        if self.watermark is not None:
+            if upper is None:
+                return query.where(false()) # Empty table
+            if since is not None:
+                query = query.where(self.watermark > since, self.watermark <= upper)
+            else:
+                query = query.where(or_(self.watermark <= upper, self.watermark.is_(None))) # Pre-migration rows have no timestamp
+        return query.order_by(*self.table.primary_key.columns)
+
+class PostDataset(Dataset):
+    def columns(self, session: Session) -> Columns:
+        columns = super().columns(session)
+        position = {c.name: len(self.scalars) + i for i, c in enumerate(self.json)}
+        targets, post_ids, metrics = position["target_platforms"], position["platform_post_ids"], position["performance_metrics"]
+
+        slugs = sorted(session.exec(select(Platform.slug)).all())
+        series = session.execute(select(MetricLatest.platform_slug, MetricLatest.metric).distinct()).all()
+        names = sorted({metric for _, metric in series})
+
+        columns.append(("target_platforms", pa.list_(pa.string()), lambda rows: [list(row[targets] or []) for row in rows]))
+        for slug in slugs:
+            columns.append((column_name("target", slug), pa.bool_(), lambda rows, slug=slug: [slug in (row[targets] or ()) for row in rows]))
+        entry = pa.struct([("platform", pa.string()), ("id", pa.string()), ("url", pa.string()), ("posted_at", pa.string())])
+        columns.append(("platform_post_ids", pa.list_(entry), lambda rows: [
+            [{key: None if item.get(key) is None else str(item[key]) for key in ("platform", "id", "url", "posted_at")}
+             for item in row[post_ids] or [] if isinstance(item, dict)]
+            for row in rows
+        ]))
+
+        columns.append(("metrics_as_of", pa.timestamp("us"), lambda rows: [snapshot_as_of(row[metrics]) for row in rows]))
+        for name in names:
+            columns.append((column_name("metric_total", name), pa.float64(), lambda rows, name=name: [snapshot_total(row[metrics], name) for row in rows]))
+        for slug, name in sorted(series):
+            columns.append((column_name(f"metric_{slug}", name, separator="__"), pa.float64(),
+                            lambda rows, slug=slug, name=name: [snapshot_value(row[metrics], slug, name) for row in rows]))
+        return columns
+
+def snapshot_total(snapshot: Optional[dict], name: str) -> Optional[float]:
+    if not snapshot:
+        return None
+    # Snapshots written by metrics.py nest totals; older free-form dicts were flat
+    value = snapshot.get("totals", {}).get(name) if isinstance(snapshot.get("totals"), dict) else snapshot.get(name)
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+def snapshot_value(snapshot: Optional[dict], slug: str, name: str) -> Optional[float]:
+    platforms = (snapshot or {}).get("platforms")
+    value = platforms.get(slug, {}).get(name) if isinstance(platforms, dict) else None
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+def snapshot_as_of(snapshot: Optional[dict]) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat((snapshot or {}).get("as_of"))
+    except (TypeError, ValueError):
+        return None
+
+DATASETS: Dict[str, Dataset] = {
+    "posts": PostDataset(CampaignPost, "updated_at"),
+    "campaigns": Dataset(Campaign, "updated_at"),
+    "platforms": Dataset(Platform, "updated_at"),
+    "metric_points": Dataset(MetricPoint, "received_at"), # Not id: ids are handed out before commit
+    "metric_daily": Dataset(MetricDaily, None),
+}
+
+# --- ENCODING ---
+
+class ByteSink:
+    """Write-only file object that hands out what has been written so far."""
+
+    closed = False
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+def encode(dataset: Dataset, columns: Columns, fmt: str, since=None, upper=None, stats: Optional[dict] = None) -> Iterator[bytes]:
+    """Export bytes, one row group at a time. Opens its own session (runs after the request's is closed)."""
+    schema = pa.schema([(name, arrow_type) for name, arrow_type, _ in columns])
+    sink = ByteSink()
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(sink, schema, compression=EXPORT_PARQUET_COMPRESSION)
+        write = writer.write_table
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+        write = writer.write
+    rows_written = 0
+    with Session(engine) as session:
+        result = session.execute(dataset.query(since, upper).execution_options(yield_per=EXPORT_ROW_GROUP))
+        for rows in result.partitions():
+            arrays = [pa.array(values(rows), type=arrow_type) for _, arrow_type, values in columns]
+            write(pa.Table.from_arrays(arrays, schema=schema))
+            rows_written += len(rows)
+            yield sink.drain()
+    writer.close()
+    if stats is not None:
+        stats["rows"] = rows_written
+    yield sink.drain()
+
+def prepare(session: Session, name: str, since: Optional[str]) -> Tuple[Dataset, Columns, Any, Any]:
+    """(dataset, columns, parsed since, high-water mark) for an export of `name`."""
+    dataset = DATASETS[name]
+    parsed = None
+    if since and dataset.watermark is not None:
+        try:
+            parsed = dataset.parse_watermark(since)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid watermark for {name}: {since!r}")
+    columns = dataset.columns(session)
+    check_unique(name, columns)
+    upper = dataset.high_water_mark(session)
+    if parsed is not None and upper is not None and upper < parsed:
+        upper = parsed # Nothing newer; keep the client's watermark
+    return dataset, columns, parsed, upper
+
+def format_watermark(value) -> str:
+    return "" if value is None else value.isoformat() if isinstance(value, datetime) else str(value)
+
+# --- CAMPAIGN EXPORT (NDJSON / CSV) ---
+
+# Every post field the importer reads back; updated_at is the database's own
+CAMPAIGN_COLUMNS = [c for c in CampaignPost.__table__.columns if c.name != "updated_at"]
+CAMPAIGN_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+def campaign_lines(rows: List[Any], fmt: str, header: bool) -> bytes:
+    names = [c.name for c in CAMPAIGN_COLUMNS]
+    if fmt == "ndjson":
+        return b"".join(dumps(dict(zip(names, row))) + b"\n" for row in rows)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(names)
+    for row in rows:
+        writer.writerow(["" if value is None else json.dumps(value, ensure_ascii=False) if name in JSON_COLUMNS else value
+                         for name, value in zip(names, row)])
+    return buffer.getvalue().encode("utf-8")
+
+def encode_campaign(campaign_id: int, fmt: str, compress: bool = True) -> Iterator[bytes]:
+    """A campaign's posts in id order, fetched EXPORT_FETCH_SIZE rows at a time from a server-side cursor."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None # wbits 31: gzip container
+    query = select(*CAMPAIGN_COLUMNS).where(CampaignPost.campaign_id == campaign_id).order_by(CampaignPost.id)
+    with Session(engine) as session:
+        # yield_per implies stream_results: a named cursor on Postgres instead of buffering the result
+        result = session.execute(query.execution_options(yield_per=EXPORT_FETCH_SIZE))
+        header = True
+        for rows in result.partitions():
+            data = campaign_lines(rows, fmt, header)
+            header = False
+            # A sync flush per batch, so the client receives rows as they are fetched
+            yield compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH) if compressor else data
+        if header and fmt == "csv":
+            yield compressor.compress(campaign_lines([], fmt, True)) if compressor else campaign_lines([], fmt, True)
+    if compressor:
+        yield compressor.flush()
+
+# --- ROUTER ---
+router = APIRouter()
+
+@router.get("/api/export/analytics/{dataset}")
+@async_db
+def export_analytics(
+    dataset: str,
+    format: str = Query("parquet", pattern="^(parquet|arrow)$"),
+    since: Optional[str] = Query(None, description="Watermark from a previous export's X-Export-Watermark header"),
+    session: Session = Depends(get_session),
+):
+    """Stream one dataset as Parquet or an Arrow IPC stream."""
+    require_pyarrow()
+    if dataset not in DATASETS:
+        raise HTTPException(status_code=404, detail=f"Unknown dataset (expected one of: {', '.join(DATASETS)})")
+    table, columns, parsed, upper = prepare(session, dataset, since)
+    media_type, extension = FORMATS[format]
+    headers = {
+        "Content-Disposition": f'attachment; filename="{dataset}.{extension}"',
+        "X-Export-Watermark": format_watermark(upper),
+    }
+    return StreamingResponse(encode(table, columns, format, parsed, upper), media_type=media_type, headers=headers)
+
+@router.get("/api/campaigns/{campaign_id}/export")
+@async_db
+def export_campaign(
+    campaign_id: int,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    compress: bool = Query(True, description="gzip the file (.gz); otherwise it is sent as-is"),
+    session: Session = Depends(get_session),
+):
+    """Stream a campaign's posts in the importer's format."""
+    if not session.get(Campaign, campaign_id):
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    filename = f"campaign-{campaign_id}.{format}" + (".gz" if compress else "")
+    return StreamingResponse(
+        encode_campaign(campaign_id, format, compress),
+        media_type="application/gzip" if compress else CAMPAIGN_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+# --- CLI ---
+
+def export_to_directory(out: str, fmt: str = "parquet", names: Optional[List[str]] = None, incremental: bool = False) -> Dict[str, int]:
+    """Write each dataset to out/<dataset>.<ext> (or a timestamped file when incremental); returns rows per dataset.
+
+    Incremental runs read and update out/watermarks.json.
+    """
+    os.makedirs(out, exist_ok=True)
+    state_path = os.path.join(out, "watermarks.json")
+    state = {}
+    if incremental and os.path.exists(state_path):
+        with open(state_path) as f:
+            state = json.load(f)
+    extension = FORMATS[fmt][1]
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+    counts = {}
+    for name in names or list(DATASETS):
+        with Session(engine) as session:
+            dataset, columns, parsed, upper = prepare(session, name, state.get(name) if incremental else None)
+        path = os.path.join(out, f"{name}-{stamp}.{extension}" if incremental and dataset.watermark is not None else f"{name}.{extension}")
+        stats = {}
+        with open(path + ".tmp", "wb") as f:
+            for chunk in encode(dataset, columns, fmt, parsed, upper, stats):
+                f.write(chunk)
+        if incremental and not stats["rows"] and dataset.watermark is not None:
+            os.remove(path + ".tmp") # Nothing changed since the last run
+        else:
+            os.replace(path + ".tmp", path)
+        counts[name] = stats["rows"]
+        if dataset.watermark is not None:
+            state[name] = format_watermark(upper)
+    with open(state_path, "w") as f:
+        json.dump(state, f, indent=2)
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description="Export data for analysis.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    analytics = sub.add_parser("analytics", help="Posts, campaigns, platforms and metrics as Parquet/Arrow")
+    analytics.add_argument("--out", required=True, help="Output directory")
+    analytics.add_argument("--format", choices=list(FORMATS), default="parquet")
+    analytics.add_argument("--datasets", help=f"Comma-separated subset of: {', '.join(DATASETS)}")
+    analytics.add_argument("--incremental", action="store_true", help="Only rows changed since the watermarks in <out>/watermarks.json")
+    campaign = sub.add_parser("campaign", help="One campaign's posts as NDJSON/CSV the importer can read back")
+    campaign.add_argument("campaign_id", type=int)
+    campaign.add_argument("--out", required=True, help="Output file; .csv picks CSV, .gz compresses")
+    args = parser.parse_args()
+
+    if args.command == "campaign":
+        fmt = "csv" if args.out.removesuffix(".gz").endswith(".csv") else "ndjson"
+        with Session(engine) as session:
+            if not session.get(Campaign, args.campaign_id):
+                parser.error(f"Campaign {args.campaign_id} not found")
+        with open(args.out, "wb") as f:
+            for chunk in encode_campaign(args.campaign_id, fmt, compress=args.out.endswith(".gz")):
+                f.write(chunk)
+        print(f"✅ Campaign {args.campaign_id} exported to {args.out}")
+        return
+
+    if pa is None:
+        parser.error("Analytics export needs pyarrow (pip install pyarrow)")
+    names = [n.strip() for n in args.datasets.split(",") if n.strip()] if args.datasets else None
+    unknown = set(names or ()) - set(DATASETS)
+    if unknown:
+        parser.error(f"Unknown datasets: {', '.join(sorted(unknown))}")
+    for name, rows in export_to_directory(args.out, args.format, names, args.incremental).items():
+        print(f"✅ {name}: {rows} rows")
+
+if __name__ == "__main__":
+    main()
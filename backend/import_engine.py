@@ -0,0 +1,381 @@
+"""
+Streaming bulk import engine shared by importer.py and restore_campaign.py.
+
+Reads JSON arrays, JSONL or CSV (optionally gzipped, e.g. campaign exports
+from /api/campaigns/{id}/export) incrementally, prefetches existing
+ids/titles and campaigns in one query each, and writes posts in chunks (COPY
+on Postgres, executemany on SQLite). With --skip-near-duplicates, rows whose
+title + hook_text nearly match an existing post (or an earlier row of the
+same import) are dropped; see dedup.py.
+
+Usage:
+    python -m backend.import_engine archive titles_and_hooks.json [--dry-run]
+    python -m backend.import_engine restore titles_and_hooks.json --campaign "Original Donation Drive"
+    python -m backend.import_engine restore titles_and_hooks.json --skip-near-duplicates 0.8
+    python -m backend.import_engine restore campaign-3.ndjson.gz --campaign "Copy of Spring Drive"
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from pydantic import ValidationError
+from sqlmodel import Session, select
+from sqlalchemy import Integer, insert, text
+
+from .database import engine, IS_SQLITE
+from .models import CampaignPost, Campaign, Mode
+from .enums import PostStatus, ModeSlug
+from . import campaign_stats, dedup
+
+DEFAULT_CHUNK_SIZE = 2000
+READ_CHUNK_CHARS = 1 << 16
+
+post_table = CampaignPost.__table__
+JSON_COLUMNS = {"target_platforms", "platform_post_ids", "performance_metrics"}
+# CSV cells are text; these are read back as ints so ids compare like JSON input
+INTEGER_COLUMNS = {c.name for c in post_table.columns if isinstance(c.type, Integer)}
+
+# --- INPUT STREAMING ---
+
+def open_text(path: str):
+    # Exports are often gzipped (/api/campaigns/{id}/export); read them as-is
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+def iter_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield post dicts from a JSON array, JSONL or CSV file (optionally .gz) without loading it whole."""
+    if path.removesuffix(".gz").endswith(".csv"):
+        yield from _iter_csv(path)
+        return
+    with open_text(path) as f:
+        head = f.read(READ_CHUNK_CHARS)
+        stripped = head.lstrip()
+        if stripped.startswith("["):
+            yield from _iter_json_array(f, stripped[1:])
+            return
+
+        # JSONL / NDJSON: one object per line
+        f.seek(0)
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{line_number}: invalid JSON ({e.msg})")
+
+def _iter_csv(path: str) -> Iterator[Dict[str, Any]]:
+    # Header row of post fields; JSON columns hold JSON text, empty cells fall back to defaults
+    with open_text(path) as f:
+        for line_number, row in enumerate(csv.DictReader(f), start=2):
+            item = {key: value for key, value in row.items() if key and value != ""}
+            try:
+                for key in JSON_COLUMNS & item.keys():
+                    item[key] = json.loads(item[key])
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{line_number}: invalid JSON in {key} ({e.msg})")
+            try:
+                for key in INTEGER_COLUMNS & item.keys():
+                    item[key] = int(item[key])
+            except ValueError:
+                raise ValueError(f"{path}:{line_number}: invalid integer in {key} ({item[key]!r})")
+            yield item
+
+def _iter_json_array(f, buf: str) -> Iterator[Any]:
+    decoder = json.JSONDecoder()
+    pos = 0
+    while True:
+        # Skip separators between items
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+        if pos < len(buf) and buf[pos] == "]":
+            return
+        if pos < len(buf):
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+                yield item
+                pos = end
+                continue
+            except json.JSONDecodeError:
+                pass # Item spans the buffer boundary; read more below
+
+        more = f.read(READ_CHUNK_CHARS)
+        if not more:
+            raise ValueError("Unexpected end of JSON array")
+        buf = buf[pos:] + more
+        pos = 0
+
+# --- ENGINE ---
+
+@dataclass
+class ImportStats:
+    read: int = 0
+    imported: int = 0
+    skipped: int = 0
+    invalid: int = 0
+    campaigns_created: int = 0
+    near_duplicates: int = 0
+
+    def summary(self) -> str:
+        return (f"{self.read} read · {self.imported} imported · {self.skipped} skipped · "
+                f"{self.near_duplicates} near-duplicates · {self.invalid} invalid · "
+                f"{self.campaigns_created} campaigns created")
+
+class BulkImporter:
+    """Buffers validated post rows and writes them in chunks.
+
+    Prefetch helpers load existing ids, titles and campaigns once so per-row
+    duplicate checks are in-memory set lookups.
+    """
+
+    def __init__(self, session: Session, chunk_size: int = DEFAULT_CHUNK_SIZE, dry_run: bool = False,
+                 progress: Optional[Callable[[ImportStats], None]] = None,
+                 near_duplicate_threshold: Optional[float] = None):
+        self.session = session
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+        self.progress = progress or (lambda stats: print(f"📦 {stats.summary()}"))
+        self.stats = ImportStats()
+        self.campaigns: Dict[str, int] = {}
+        self._pending: List[Dict[str, Any]] = []
+        self._explicit_ids = False
+        self._next_placeholder_id = -1
+        # Checked per chunk, so one query batch covers chunk_size rows
+        self.deduplicator = dedup.BatchDeduplicator(session, near_duplicate_threshold) if near_duplicate_threshold else None
+
+    # A. Prefetch (one query each)
+    def existing_ids(self) -> set:
+        return set(self.session.exec(select(CampaignPost.id)).all())
+
+    def existing_titles(self, campaign_id: int) -> set:
+        return set(self.session.exec(select(CampaignPost.title).where(CampaignPost.campaign_id == campaign_id)).all())
+
+    def load_campaigns(self):
+        for campaign_id, name in self.session.exec(select(Campaign.id, Campaign.name).order_by(Campaign.id.desc())).all():
+            self.campaigns[name] = campaign_id # Lowest id wins, like .first()
+
+    def get_or_create_mode(self, name: str, slug: str, description: str) -> Mode:
+        mode = self.session.exec(select(Mode).where(Mode.slug == slug)).first()
+        if not mode:
+            print(f"✨ Creating Mode: {name}")
+            mode = Mode(name=name, slug=slug, description=description)
+            if self.dry_run:
+                mode.id = self._placeholder_id()
+            else:
+                self.session.add(mode)
+                self.session.commit()
+                self.session.refresh(mode)
+        return mode
+
+    def campaign_id_for(self, name: str, mode_id: int, description: str = "") -> int:
+        if name not in self.campaigns:
+            print(f"✨ Creating Campaign: {name}")
+            if self.dry_run:
+                self.campaigns[name] = self._placeholder_id()
+            else:
+                campaign = Campaign(name=name, mode_id=mode_id, description=description)
+                self.session.add(campaign)
+                self.session.flush()
+                self.campaigns[name] = campaign.id
+            self.stats.campaigns_created += 1
+        return self.campaigns[name]
+
+    def _placeholder_id(self) -> int:
+        # Dry runs never write, so hand out ids that cannot collide with real rows
+        self._next_placeholder_id -= 1
+        return self._next_placeholder_id
+
+    # B. Buffering
+    def validate(self, data: Dict[str, Any], **overrides) -> Optional[Dict[str, Any]]:
+        # Overrides are trusted values applied after validation (e.g. legacy mode slugs like "promo")
+        try:
+            row = CampaignPost.model_validate(data).model_dump(mode="json", exclude={"updated_at"}) # Database default
+            row.update(overrides)
+        except ValidationError as e:
+            self.stats.invalid += 1
+            print(f"⚠️  Invalid record #{self.stats.read}: {e.errors()[0]['loc']} {e.errors()[0]['msg']}")
+            return None
+        if row.get("id") is None:
+            row.pop("id", None)
+        else:
+            self._explicit_ids = True
+        return row
+
+    def add(self, row: Dict[str, Any]):
+        self._pending.append(row)
+        self.stats.imported += 1
+        if len(self._pending) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self._pending and self.deduplicator:
+            self._pending, dropped = self.deduplicator.filter(self._pending)
+            self.stats.imported -= dropped
+            self.stats.near_duplicates += dropped
+        if self._pending and not self.dry_run:
+            if IS_SQLITE:
+                self._write_executemany(self._pending)
+            else:
+                self._write_copy(self._pending)
+            campaign_stats.apply_changes(self.session, after=self._pending)
+            self.session.commit()
+        self._pending = []
+        self.progress(self.stats)
+
+    def finish(self) -> ImportStats:
+        self.flush()
+        if self._explicit_ids and not self.dry_run:
+            self.fix_sequence()
+        if self.stats.imported and not self.dry_run and dedup.DEDUP_ON_WRITE:
+            # Bulk writes don't return ids; pick up the new posts in one pass
+            dedup.sync_index(self.session)
+        return self.stats
+
+    # C. Writers
+    def _write_executemany(self, rows: List[Dict[str, Any]]):
+        # Rows with and without explicit ids have different column sets
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for row in rows:
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+        for group in groups.values():
+            self.session.execute(insert(post_table), group)
+
+    def _write_copy(self, rows: List[Dict[str, Any]]):
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for row in rows:
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+
+        raw = self.session.connection().connection
+        for columns, group in groups.items():
+            buffer = io.StringIO()
+            # QUOTE_NONNUMERIC writes None unquoted (NULL) and strings quoted ("" stays an empty string)
+            writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC)
+            for row in group:
+                writer.writerow([json.dumps(row[c]) if c in JSON_COLUMNS else row[c] for c in columns])
+            buffer.seek(0)
+            with raw.cursor() as cursor:
+                cursor.copy_expert(f"COPY campaignpost ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+    def fix_sequence(self):
+        # Explicit ids leave the Postgres sequence behind; fast-forward it to max(id)
+        if IS_SQLITE:
+            return
+        self.session.exec(text("SELECT setval(pg_get_serial_sequence('campaignpost', 'id'), coalesce(max(id), 0)+1, false) FROM campaignpost"))
+        self.session.commit()
+
+# --- IMPORT POLICIES ---
+
+def mode_for_category(category: str, modes: Dict[str, Mode]) -> Mode:
+    # Simple Heuristic for Mode Mapping
+    if "Humor" in category or "Meme" in category:
+        return modes["content"]
+    if "Promotion" in category:
+        return modes["promo"]
+    if "Political" in category:
+        return modes["political"]
+    return modes["ebeg"] # Default to Donation
+
+def import_archive(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE, dry_run: bool = False,
+                   near_duplicate_threshold: Optional[float] = None) -> ImportStats:
+    """Import posts keeping their ids; ids already in the DB are skipped, campaigns come from categories."""
+    print(f"🚀 Starting Import from {path}{' (dry run)' if dry_run else ''}...")
+    with Session(engine) as session:
+        importer = BulkImporter(session, chunk_size=chunk_size, dry_run=dry_run, near_duplicate_threshold=near_duplicate_threshold)
+        modes = {
+            "ebeg": importer.get_or_create_mode("Donation", "ebeg", "Asking for support/funds."),
+            "content": importer.get_or_create_mode("Content Leadership", "content", "Thought leadership and humor."),
+            "promo": importer.get_or_create_mode("Promotion Sales", "promo", "Selling products/services."),
+            "political": importer.get_or_create_mode("Political", "political", "Political commentary."),
+        }
+        importer.load_campaigns()
+        existing_ids = importer.existing_ids()
+        print(f"📊 Current DB Count: {len(existing_ids)}")
+
+        for item in iter_records(path):
+            importer.stats.read += 1
+            if item.get("id") is not None and item["id"] in existing_ids:
+                importer.stats.skipped += 1
+                continue
+
+            category = item.get("category_primary", "General")
+            row = importer.validate({**item, "category_primary": category, "mode": ModeSlug.EBEG})
+            if row is None:
+                continue
+            target_mode = mode_for_category(category, modes)
+            row["mode"] = target_mode.slug # Keep the string for legacy UI compatibility
+            row["campaign_id"] = importer.campaign_id_for(category, target_mode.id)
+            if row.get("id") is not None: # Id-less records get fresh ids and can't collide
+                existing_ids.add(row["id"])
+            importer.add(row)
+
+        stats = importer.finish()
+    print(f"✅ Import complete: {stats.summary()}")
+    return stats
+
+def restore_campaign(path: str, campaign_name: str = "Original Donation Drive", chunk_size: int = DEFAULT_CHUNK_SIZE,
+                     dry_run: bool = False, near_duplicate_threshold: Optional[float] = None) -> Optional[ImportStats]:
+    """Copy posts into one campaign as fresh Pending posts, skipping titles already in it."""
+    print(f"🚀 Starting Restoration into '{campaign_name}'{' (dry run)' if dry_run else ''}...")
+    with Session(engine) as session:
+        importer = BulkImporter(session, chunk_size=chunk_size, dry_run=dry_run, near_duplicate_threshold=near_duplicate_threshold)
+        if not dry_run:
+            # Earlier imports inserted explicit ids, so the sequence may lag behind
+            importer.fix_sequence()
+
+        mode = session.exec(select(Mode).where(Mode.slug == ModeSlug.EBEG)).first()
+        if not mode:
+            print("❌ Error: 'ebeg' mode not found. Please run the main importer first.")
+            return None
+
+        importer.load_campaigns()
+        campaign_id = importer.campaign_id_for(campaign_name, mode.id, description="Restored original dataset")
+        existing_titles = importer.existing_titles(campaign_id)
+
+        for item in iter_records(path):
+            importer.stats.read += 1
+            if item.get("title") in existing_titles:
+                importer.stats.skipped += 1
+                continue
+
+            # New copy: no original id, fresh status and no platform history
+            data = {k: v for k, v in item.items() if k != "id"}
+            row = importer.validate(
+                {**data, "category_primary": item.get("category_primary", "General"), "mode": ModeSlug.EBEG},
+                status=PostStatus.PENDING.value,
+                mode=mode.slug,
+                campaign_id=campaign_id,
+                posted_date="",
+                platform_post_ids=[],
+                performance_metrics={},
+            )
+            if row is None:
+                continue
+            existing_titles.add(row["title"])
+            importer.add(row)
+
+        stats = importer.finish()
+    print(f"✅ Restoration complete: {stats.summary()}")
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream posts from JSON/JSONL into the database.")
+    parser.add_argument("policy", choices=["archive", "restore"])
+    parser.add_argument("path", nargs="?", default="titles_and_hooks.json")
+    parser.add_argument("--campaign", default="Original Donation Drive", help="Target campaign for 'restore'")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="Parse and dedupe without writing")
+    parser.add_argument("--skip-near-duplicates", type=float, nargs="?", const=dedup.DEDUP_THRESHOLD, metavar="THRESHOLD",
+                        help=f"Drop posts this similar to an existing one (default {dedup.DEDUP_THRESHOLD})")
+    args = parser.parse_args()
+
+    if args.policy == "archive":
+        import_archive(args.path, chunk_size=args.chunk_size, dry_run=args.dry_run,
+                       near_duplicate_threshold=args.skip_near_duplicates)
+    else:
+        restore_campaign(args.path, campaign_name=args.campaign, chunk_size=args.chunk_size, dry_run=args.dry_run,
+                         near_duplicate_threshold=args.skip_near_duplicates)
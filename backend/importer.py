@@ -1,107 +1,20 @@
-import json
-from sqlmodel import Session, select
-from database import get_session, engine
-from models import CampaignPost, Campaign, Mode
+import argparse
+from typing import Optional
+from backend.dedup import DEDUP_THRESHOLD
+from backend.import_engine import import_archive, DEFAULT_CHUNK_SIZE
 
-def get_or_create_mode(session: Session, name: str, slug: str, description: str):
-    mode = session.exec(select(Mode).where(Mode.slug == slug)).first()
-    if not mode:
-        print(f"✨ Creating Mode: {name}")
-        mode = Mode(name=name, slug=slug, description=description)
-        session.add(mode)
-        session.commit()
-        session.refresh(mode)
-    return mode
+# Streams titles_and_hooks.json (JSON array or JSONL) through the bulk import engine.
+# Run from the project root: python -m backend.importer [path] [--dry-run]
 
-def get_or_create_campaign(session: Session, name: str, mode_id: int):
-    campaign = session.exec(select(Campaign).where(Campaign.name == name)).first()
-    if not campaign:
-        print(f"✨ Creating Campaign: {name}")
-        campaign = Campaign(name=name, mode_id=mode_id)
-        session.add(campaign)
-        session.commit()
-        session.refresh(campaign)
-    return campaign
-
-def import_posts():
-    print("🚀 Starting Import from titles_and_hooks.json...")
-    
-    # 1. Load JSON Data
-    with open("titles_and_hooks.json", "r", encoding="utf-8") as f:
-        posts_data = json.load(f)
-        
-    print(f"📦 Found {len(posts_data)} posts in file.")
-    
-    # 2. Connect to DB
-    with Session(engine) as session:
-        # A. Ensure Modes Exist
-        donation_mode = get_or_create_mode(session, "Donation", "ebeg", "Asking for support/funds.")
-        content_mode = get_or_create_mode(session, "Content Leadership", "content", "Thought leadership and humor.")
-        promo_mode = get_or_create_mode(session, "Promotion Sales", "promo", "Selling products/services.")
-        political_mode = get_or_create_mode(session, "Political", "political", "Political commentary.")
-        
-        # Check existing count
-        existing_count = session.exec(select(CampaignPost)).all()
-        print(f"📊 Current DB Count: {len(existing_count)}")
-        
-        imported_count = 0
-        for item in posts_data:
-            # Check if ID exists to avoid duplicates
-            existing = session.get(CampaignPost, item["id"])
-            if existing:
-                # Optional: Update existing post with new campaign logic if needed
-                # For now, we skip to avoid overwriting user edits
-                print(f"⚠️  Skipping ID {item['id']} (Already exists)")
-                continue
-                
-            # B. Determine Mode & Campaign
-            category = item.get("category_primary", "General")
-            
-            # Simple Heuristic for Mode Mapping
-            if "Humor" in category or "Meme" in category:
-                target_mode = content_mode
-            elif "Promotion" in category:
-                target_mode = promo_mode
-            elif "Political" in category:
-                target_mode = political_mode
-            else:
-                target_mode = donation_mode # Default to Donation
-            
-            # C. Get/Create Campaign
-            # We use the Category Name as the Campaign Name
-            campaign = get_or_create_campaign(session, category, target_mode.id)
-
-            # Create Model
-            post = CampaignPost(
-                id=item["id"],
-                title=item["title"],
-                hook_text=item["hook_text"],
-                category_primary=category,
-                category_secondary=item.get("category_secondary", ""),
-                category_tertiary=item.get("category_tertiary", ""),
-                status=item.get("status", "Pending"),
-                posted_date=item.get("posted_date", ""),
-                mode=target_mode.slug, # Keep the string for legacy UI compatibility
-                campaign_id=campaign.id, # Link to the new Campaign entity
-                
-                meme_detail_expl=item.get("meme_detail_expl", ""),
-                source_url=item.get("source_url", ""),
-                media_image_url=item.get("media_image_url", ""),
-                media_video_url=item.get("media_video_url", ""),
-                closing_hook=item.get("closing_hook", ""),
-                kc_approval=item.get("kc_approval", ""),
-                target_platforms=item.get("target_platforms", []),
-                platform_post_ids=item.get("platform_post_ids", []),
-                performance_metrics=item.get("performance_metrics", {}),
-                image_prompt=item.get("image_prompt", ""),
-                video_prompt=item.get("video_prompt", "")
-            )
-            
-            session.add(post)
-            imported_count += 1
-            
-        session.commit()
-        print(f"✅ Successfully imported {imported_count} new posts!")
+def import_posts(path: str = "titles_and_hooks.json", dry_run: bool = False, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 near_duplicate_threshold: Optional[float] = None):
+    return import_archive(path, chunk_size=chunk_size, dry_run=dry_run, near_duplicate_threshold=near_duplicate_threshold)
 
 if __name__ == "__main__":
-    import_posts()
+    parser = argparse.ArgumentParser(description="Import posts, keeping ids and skipping ones already in the DB.")
+    parser.add_argument("path", nargs="?", default="titles_and_hooks.json")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--skip-near-duplicates", type=float, nargs="?", const=DEDUP_THRESHOLD, metavar="THRESHOLD")
+    args = parser.parse_args()
+    import_posts(args.path, dry_run=args.dry_run, chunk_size=args.chunk_size, near_duplicate_threshold=args.skip_near_duplicates)
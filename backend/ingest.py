@@ -0,0 +1,165 @@
+import asyncio
+import hashlib
+import os
+from datetime import datetime, timedelta
+from typing import List, Optional
+import anyio
+import httpx
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+from sqlmodel import Session, select
+from sqlalchemy.exc import IntegrityError
+
+from .database import engine
+from .models import IngestedUrl
+from . import media, storage
+
+# --- CONFIG ---
+INGEST_CONNECT_TIMEOUT = float(os.getenv("INGEST_CONNECT_TIMEOUT", "5"))
+INGEST_READ_TIMEOUT = float(os.getenv("INGEST_READ_TIMEOUT", "20"))
+INGEST_MAX_BYTES = int(os.getenv("INGEST_MAX_BYTES", str(storage.MAX_UPLOAD_BYTES)))
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", "8")) # Per batch request
+INGEST_MAX_CONNECTIONS = int(os.getenv("INGEST_MAX_CONNECTIONS", "50")) # Shared pool, per worker
+INGEST_FRESH_SECONDS = int(os.getenv("INGEST_FRESH_SECONDS", "86400")) # Reuse without validators for this long
+INGEST_MAX_BATCH = 100
+
+# --- HTTP CLIENT ---
+# One AsyncClient per worker so connections (and TLS sessions) are pooled across requests
+_client: Optional[httpx.AsyncClient] = None
+
+def get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(INGEST_READ_TIMEOUT, connect=INGEST_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=INGEST_MAX_CONNECTIONS, max_keepalive_connections=INGEST_MAX_CONNECTIONS // 2),
+            follow_redirects=True,
+        )
+    return _client
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+# --- URL MEMORY ---
+
+def url_hash(url: str) -> str:
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+def load_record(url: str) -> Optional[IngestedUrl]:
+    with Session(engine) as session:
+        return session.exec(select(IngestedUrl).where(IngestedUrl.url_hash == url_hash(url))).first()
+
+def save_record(url: str, **values):
+    with Session(engine) as session:
+        record = session.exec(select(IngestedUrl).where(IngestedUrl.url_hash == url_hash(url))).first()
+        if not record:
+            record = IngestedUrl(url_hash=url_hash(url), source_url=url, **values)
+        for key, value in values.items():
+            setattr(record, key, value)
+        record.fetched_at = datetime.utcnow()
+        session.add(record)
+        try:
+            session.commit()
+        except IntegrityError:
+            session.rollback() # Another worker ingested the same URL concurrently
+
+def extension_for(content_type: str) -> str:
+    file_ext = "png" # Default fallback
+    if "jpeg" in content_type: file_ext = "jpg"
+    if "png" in content_type: file_ext = "png"
+    if "webp" in content_type: file_ext = "webp"
+    if "gif" in content_type: file_ext = "gif"
+    return file_ext
+
+# --- INGESTION ---
+
+async def ingest_one(url: str) -> dict:
+    """Download url into storage, or reuse the stored copy if the remote hasn't changed."""
+    record = await anyio.to_thread.run_sync(load_record, url)
+    headers = {}
+    if record and await anyio.to_thread.run_sync(storage.storage.exists, record.storage_key):
+        if record.etag:
+            headers["If-None-Match"] = record.etag
+        if record.last_modified:
+            headers["If-Modified-Since"] = record.last_modified
+        if not headers and datetime.utcnow() - record.fetched_at < timedelta(seconds=INGEST_FRESH_SECONDS):
+            return {"url": record.stored_url, "cached": True, "revalidated": False}
+    else:
+        record = None
+
+    async with get_client().stream("GET", url, headers=headers) as response:
+        if response.status_code == 304 and record:
+            await anyio.to_thread.run_sync(lambda: save_record(url, etag=record.etag, last_modified=record.last_modified))
+            return {"url": record.stored_url, "cached": True, "revalidated": True}
+        response.raise_for_status()
+
+        content_length = response.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > INGEST_MAX_BYTES:
+            raise HTTPException(status_code=413, detail=f"Remote file exceeds the {INGEST_MAX_BYTES} byte limit")
+
+        content_type = response.headers.get("content-type", "")
+        stored = await storage.store_stream(response.aiter_bytes(storage.CHUNK_SIZE), extension_for(content_type), INGEST_MAX_BYTES)
+        etag = response.headers.get("etag")
+        last_modified = response.headers.get("last-modified")
+
+    media.schedule_derivatives(stored["key"])
+    await anyio.to_thread.run_sync(lambda: save_record(
+        url,
+        storage_key=stored["key"],
+        stored_url=stored["url"],
+        content_type=content_type,
+        etag=etag,
+        last_modified=last_modified,
+    ))
+    return {"url": stored["url"], "cached": False, "revalidated": False, "deduplicated": stored["deduplicated"]}
+
+# --- MODELS ---
+class ImageUrl(BaseModel):
+    url: str
+
+class ImageUrlBatch(BaseModel):
+    urls: List[str]
+
+class IngestResult(BaseModel):
+    source_url: str
+    ok: bool
+    url: Optional[str] = None
+    cached: bool = False
+    error: Optional[str] = None
+
+# --- ROUTER ---
+router = APIRouter()
+
+@router.post("/api/ingest-url")
+async def ingest_url(image: ImageUrl):
+    try:
+        return await ingest_one(image.url)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Failed to ingest URL: {str(e)}")
+
+@router.post("/api/ingest-url/batch", response_model=List[IngestResult])
+async def ingest_url_batch(batch: ImageUrlBatch):
+    if len(batch.urls) > INGEST_MAX_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {INGEST_MAX_BATCH} URLs per batch")
+
+    semaphore = asyncio.Semaphore(INGEST_CONCURRENCY)
+
+    async def run(url: str) -> IngestResult:
+        async with semaphore:
+            try:
+                result = await ingest_one(url)
+                return IngestResult(source_url=url, ok=True, url=result["url"], cached=result["cached"])
+            except HTTPException as e:
+                return IngestResult(source_url=url, ok=False, error=str(e.detail))
+            except Exception as e:
+                return IngestResult(source_url=url, ok=False, error=f"Failed to ingest URL: {str(e)}")
+
+    # Each distinct URL is fetched once even if the batch repeats it
+    unique = list(dict.fromkeys(batch.urls))
+    results = dict(zip(unique, await asyncio.gather(*(run(url) for url in unique))))
+    return [results[url] for url in batch.urls]
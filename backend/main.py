@@ -1,23 +1,69 @@
-from typing import List
+from typing import List, Optional
 import os
-from fastapi import FastAPI, Depends, HTTPException, File, UploadFile
+from fastapi import FastAPI, Depends, HTTPException, File, UploadFile, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from sqlmodel import Session, select
-import uuid
-import shutil
-from pydantic import BaseModel
+from sqlalchemy import bindparam, cast, exists, text
+from sqlalchemy.dialects.postgresql import JSONB, array
+import anyio
 
-from .database import create_db_and_tables, get_session
+from .database import create_db_and_tables, get_session, async_db, IS_SQLITE
 from .models import CampaignPost, Platform, WorkspaceSettings, Mode, Campaign
 from .enums import PostStatus, CampaignStatus, ModeSlug
-from . import auth
+from .static_media import MediaFiles
+from .compression import CompressionMiddleware
+from .responses import FAST_JSON, FastJSONResponse, orm_response
+from . import auth, bulk, cache, campaign_ops, campaign_stats, dedup, export, metrics, platform_fit, render, search, storage, ingest, media
+from .ai import engine as ai_engine, prompts as ai_prompts
+from .publishing import scheduler as publish_scheduler
 
 app = FastAPI()
 
 # Include Auth Router
 app.include_router(auth.router)
 
+# Include Bulk Post Router
+app.include_router(bulk.router)
+
+# Include Campaign Stats Router
+app.include_router(campaign_stats.router)
+
+# Include Campaign Clone / Move Router (set-based copies and re-moding)
+app.include_router(campaign_ops.router)
+
+# Include Platform Fit Validation Router
+app.include_router(platform_fit.router)
+
+# Include Post Render Router (per-platform final text, memoized)
+app.include_router(render.router)
+
+# Include Post Search Router (before /api/posts/{post_id} so "search" isn't read as an id)
+app.include_router(search.router)
+
+# Include Near-Duplicate Detection Router (also before /api/posts/{post_id})
+app.include_router(dedup.router)
+
+# Include AI Optimization Router (batch + metrics)
+app.include_router(ai_engine.router)
+
+# Include AI Prompt Preview Router
+app.include_router(ai_prompts.router)
+
+# Include URL Ingestion Router
+app.include_router(ingest.router)
+
+# Include Media Derivatives Router
+app.include_router(media.router)
+
+# Include Publishing Scheduler Router
+app.include_router(publish_scheduler.router)
+
+# Include Performance Metrics Router (time series + rollups)
+app.include_router(metrics.router)
+
+# Include Analytics Export Router (Parquet / Arrow)
+app.include_router(export.router)
+
 # Allow Frontend to talk to Backend
 # Get allowed origins from environment variable, default to "*" for dev convenience if not set
 # In production, this MUST be set to the frontend domain (e.g. https://campaign-studio.vercel.app)
@@ -30,8 +76,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Reject oversized uploads before the multipart parser spools them (MAX_UPLOAD_BYTES)
+app.add_middleware(storage.UploadLimitMiddleware)
+
+# Compress JSON list payloads (brotli if installed, else gzip); small bodies are sent as-is
+if os.getenv("COMPRESSION", "1").lower() in ("1", "true", "yes"):
+    app.add_middleware(CompressionMiddleware)
+
 # SEED DATA
 INITIAL_PLATFORMS = [
     {"name": "X (Twitter)", "slug": "x", "base_url": "https://twitter.com/compose/tweet", "icon": "Twitter", "char_limit": 280},
@@ -106,6 +160,7 @@ def seed_platforms():
                 session.add(platform)
             session.commit()
             print("✅ Platforms Seeded!")
+            cache.invalidate("platforms")
 
 def seed_modes():
     with Session(get_session().__next__().bind) as session:
@@ -117,6 +172,7 @@ def seed_modes():
                 session.add(mode)
             session.commit()
             print("✅ Modes Seeded!")
+            cache.invalidate("modes")
 
 def seed_settings():
     with Session(get_session().__next__().bind) as session:
@@ -127,13 +183,31 @@ def seed_settings():
             session.add(settings)
             session.commit()
             print("✅ Settings Seeded!")
+            cache.invalidate("settings")
+
+# Worker threads for sync routes (Starlette's default is 40)
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "40"))
 
 @app.on_event("startup")
 def on_startup():
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
     create_db_and_tables()
+    search.ensure_search_index()
     seed_platforms()
     seed_modes()
     seed_settings()
+    campaign_stats.ensure_counters()
+
+@app.on_event("startup")
+async def start_scheduler():
+    publish_scheduler.start() # No-op unless PUBLISH_SCHEDULER is set
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await publish_scheduler.stop()
+    await ingest.close_client()
+    await ai_engine.close()
+    media.shutdown_pool()
 
 @app.get("/")
 def read_root():
@@ -166,14 +240,17 @@ def get_system_info():
 
 # --- SETTINGS ROUTES ---
 
-@app.get("/api/settings", response_model=WorkspaceSettings)
-def read_settings(session: Session = Depends(get_session)):
+def load_settings(session: Session) -> WorkspaceSettings:
     settings = session.exec(select(WorkspaceSettings)).first()
     if not settings:
         # Fallback if seed failed for some reason
         return WorkspaceSettings(id=1)
     return settings
 
+@app.get("/api/settings", response_model=WorkspaceSettings)
+def read_settings(request: Request, session: Session = Depends(get_session)):
+    return cache.cached_json_response(request, "settings", lambda: load_settings(session))
+
 @app.put("/api/settings", response_model=WorkspaceSettings)
 def update_settings(settings_data: WorkspaceSettings, session: Session = Depends(get_session)):
     settings = session.exec(select(WorkspaceSettings)).first()
@@ -189,21 +266,24 @@ def update_settings(settings_data: WorkspaceSettings, session: Session = Depends
     session.add(settings)
     session.commit()
     session.refresh(settings)
+    cache.invalidate("settings")
     return settings
 
 # --- PLATFORM ROUTES ---
 
 @app.get("/api/platforms", response_model=List[Platform])
-def read_platforms(session: Session = Depends(get_session)):
-    return session.exec(select(Platform)).all()
+@async_db
+def read_platforms(request: Request, session: Session = Depends(get_session)):
+    return cache.cached_json_response(request, "platforms", lambda: session.exec(select(Platform)).all())
 
 @app.put("/api/platforms/{platform_id}", response_model=Platform)
+@async_db
 def update_platform(platform_id: int, platform_data: Platform, session: Session = Depends(get_session)):
     platform = session.get(Platform, platform_id)
     if not platform:
         raise HTTPException(status_code=404, detail="Platform not found")
     
-    p_dict = platform_data.dict(exclude_unset=True)
+    p_dict = platform_data.dict(exclude_unset=True, exclude={"updated_at"})
     for key, value in p_dict.items():
         setattr(platform, key, value)
         
@@ -211,32 +291,39 @@ def update_platform(platform_id: int, platform_data: Platform, session: Session
     session.commit()
     session.refresh(platform)
     session.refresh(platform)
+    cache.invalidate("platforms")
     return platform
 
 # --- MODE ROUTES ---
 
 @app.get("/api/modes", response_model=List[Mode])
-def read_modes(session: Session = Depends(get_session)):
-    return session.exec(select(Mode)).all()
+@async_db
+def read_modes(request: Request, session: Session = Depends(get_session)):
+    return cache.cached_json_response(request, "modes", lambda: session.exec(select(Mode)).all())
 
 @app.post("/api/modes", response_model=Mode)
+@async_db
 def create_mode(mode: Mode, session: Session = Depends(get_session)):
     session.add(mode)
     session.commit()
     session.refresh(mode)
+    cache.invalidate("modes")
     return mode
 
 # --- CAMPAIGN ROUTES ---
 
 @app.get("/api/campaigns", response_model=List[Campaign])
+@async_db
 def read_campaigns(mode_slug: str = None, session: Session = Depends(get_session)):
     query = select(Campaign)
     if mode_slug:
         # Join with Mode to filter by slug
         query = query.join(Mode).where(Mode.slug == mode_slug)
-    return session.exec(query).all()
+    campaigns = session.exec(query).all()
+    return orm_response(campaigns) if FAST_JSON else campaigns
 
 @app.post("/api/campaigns", response_model=Campaign)
+@async_db
 def create_campaign(campaign: Campaign, session: Session = Depends(get_session)):
     session.add(campaign)
     session.commit()
@@ -245,15 +332,90 @@ def create_campaign(campaign: Campaign, session: Session = Depends(get_session))
 
 # ... (Existing Upload Routes) ...
 
+# Keyset pagination: clients pass back the X-Next-Cursor header as ?cursor=
+POSTS_PAGE_SIZE = int(os.getenv("POSTS_PAGE_SIZE", "500"))
+POSTS_MAX_PAGE_SIZE = 5000
+POST_COLUMNS = list(CampaignPost.model_fields.keys())
+POST_FIELDS = set(POST_COLUMNS)
+
+def split_csv(values: Optional[List[str]]) -> List[str]:
+    # Accept both ?x=a&x=b and ?x=a,b
+    if not values:
+        return []
+    return [v.strip() for value in values for v in value.split(",") if v.strip()]
+
+def target_platforms_filter(platforms: List[str]):
+    # target_platforms is a JSON array; match posts targeting ANY of the given slugs
+    if IS_SQLITE:
+        return exists(
+            select(text("1"))
+            .select_from(text("json_each(campaignpost.target_platforms)"))
+            .where(text("json_each.value IN :slugs").bindparams(bindparam("slugs", value=platforms, expanding=True)))
+        )
+    return cast(CampaignPost.target_platforms, JSONB).has_any(array(platforms))
+
 @app.get("/api/posts", response_model=List[CampaignPost])
-def read_posts(mode: str = None, session: Session = Depends(get_session)):
-    query = select(CampaignPost)
+@async_db
+def read_posts(
+    response: Response,
+    mode: str = None,
+    campaign_id: Optional[int] = None,
+    status: Optional[str] = None,
+    category_primary: Optional[str] = None,
+    target_platforms: Optional[List[str]] = Query(None),
+    fields: Optional[str] = None,
+    cursor: Optional[int] = None,
+    limit: int = Query(POSTS_PAGE_SIZE, ge=1, le=POSTS_MAX_PAGE_SIZE),
+    session: Session = Depends(get_session),
+):
+    # Projection: only select (and serialize) the requested columns
+    selected = None
+    if fields:
+        selected = split_csv([fields])
+        unknown = [f for f in selected if f not in POST_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        if "id" not in selected:
+            selected.insert(0, "id") # Needed for the cursor
+    elif FAST_JSON:
+        # Trusted rows: read plain column tuples, skipping ORM hydration and re-validation
+        selected = POST_COLUMNS
+    query = select(*[getattr(CampaignPost, f) for f in selected]) if selected else select(CampaignPost)
+
     if mode:
         query = query.where(CampaignPost.mode == mode)
-    posts = session.exec(query).all()
-    return posts
+    if campaign_id is not None:
+        query = query.where(CampaignPost.campaign_id == campaign_id)
+    if status:
+        query = query.where(CampaignPost.status == status)
+    if category_primary:
+        query = query.where(CampaignPost.category_primary == category_primary)
+    platforms = split_csv(target_platforms)
+    if platforms:
+        query = query.where(target_platforms_filter(platforms))
+    if cursor is not None:
+        query = query.where(CampaignPost.id > cursor)
+
+    # Fetch one extra row to know whether another page exists
+    query = query.order_by(CampaignPost.id).limit(limit + 1)
+    rows = session.exec(query).all() if selected is None else session.execute(query).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more:
+        next_cursor = str(rows[-1].id)
+        response.headers["X-Next-Cursor"] = next_cursor
+
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    if selected is None:
+        return rows
+
+    # Projected rows skip response_model validation (partial or trusted posts)
+    return FastJSONResponse([dict(zip(selected, row)) for row in rows], headers=headers)
 
 @app.get("/api/posts/{post_id}", response_model=CampaignPost)
+@async_db
 def read_post(post_id: int, session: Session = Depends(get_session)):
     post = session.get(CampaignPost, post_id)
     if not post:
@@ -261,110 +423,68 @@ def read_post(post_id: int, session: Session = Depends(get_session)):
     return post
 
 @app.post("/api/posts", response_model=CampaignPost)
+@async_db
 def create_post(post: CampaignPost, session: Session = Depends(get_session)):
-    # Auto-link to Campaign if missing
+    # Auto-link to Campaign if missing (Find Mode -> Find/Create Campaign)
     if not post.campaign_id:
-        # 1. Find Mode
-        mode_slug = post.mode or ModeSlug.EBEG
-        mode = session.exec(select(Mode).where(Mode.slug == mode_slug)).first()
-        if mode:
-            # 2. Find/Create Campaign
-            campaign_name = post.category_primary or "General"
-            campaign = session.exec(select(Campaign).where(Campaign.name == campaign_name)).first()
-            if not campaign:
-                campaign = Campaign(name=campaign_name, mode_id=mode.id)
-                session.add(campaign)
-                session.commit()
-                session.refresh(campaign)
-            
-            post.campaign_id = campaign.id
+        key = bulk.campaign_key({"mode": post.mode, "category_primary": post.category_primary})
+        post.campaign_id = bulk.resolve_campaign_ids(session, [key]).get(key)
             
     session.add(post)
+    campaign_stats.apply_changes(session, after=[post])
+    session.flush() # Assigns post.id for the duplicate index
+    dedup.index_on_write(session, [post])
     session.commit()
     session.refresh(post)
     return post
 
 @app.put("/api/posts/{post_id}", response_model=CampaignPost)
+@async_db
 def update_post(post_id: int, post_data: CampaignPost, session: Session = Depends(get_session)):
     post = session.get(CampaignPost, post_id)
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
     
     # Update fields
-    post_dict = post_data.dict(exclude_unset=True)
+    before = campaign_stats.counted_values(post)
+    post_dict = post_data.dict(exclude_unset=True, exclude={"updated_at"}) # Set by the database on update
     for key, value in post_dict.items():
         setattr(post, key, value)
         
     session.add(post)
+    campaign_stats.apply_changes(session, before=[before], after=[post])
+    dedup.index_on_write(session, [post])
     session.commit()
     session.refresh(post)
     return post
 
 # --- AI ROUTES ---
-from .ai.optimizer import OptimizationRequest, OptimizationResponse, simple_optimize
+from .ai.optimizer import OptimizationRequest, OptimizationResponse
+from .ai.backends import BackendError
 
 @app.post("/api/ai/optimize", response_model=OptimizationResponse)
-def optimize_text(request: OptimizationRequest, session: Session = Depends(get_session)):
-    # In the future, we can use 'session' to look up Mode details
-    return simple_optimize(request)
+async def optimize_text(request: OptimizationRequest, response: Response, http_request: Request):
+    # Cached, coalesced and retried by the engine; see /api/ai/optimize/batch for many posts at once
+    if "text/event-stream" in http_request.headers.get("accept", ""):
+        return ai_engine.stream_response(request) # Same as /api/ai/optimize/stream
+    try:
+        result, cached = await ai_engine.optimize(request)
+    except BackendError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    response.headers["X-AI-Cache"] = "HIT" if cached else "MISS"
+    return result
 
 # --- FILE UPLOAD ---
 
-# Ensure directory exists
-UPLOAD_DIR = "backend/static/uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-
 # Mount Static Files so they are accessible via URL
-app.mount("/static", StaticFiles(directory="backend/static"), name="static")
-
-# Helper to get base URL
-def get_base_url():
-    # In production, this should be set to the backend URL (e.g. https://api.campaignstudio.com)
-    # If not set, it falls back to localhost for development
-    return os.getenv("API_BASE_URL", "http://localhost:8001")
+# (immutable cache headers, strong ETags, byte ranges, precompressed sidecars)
+app.mount("/static", MediaFiles(directory="backend/static"), name="static")
 
 @app.post("/api/upload")
 async def upload_image(file: UploadFile = File(...)):
-    # Generate unique filename
-    file_ext = file.filename.split(".")[-1]
-    unique_filename = f"{uuid.uuid4()}.{file_ext}"
-    file_path = os.path.join(UPLOAD_DIR, unique_filename)
-    
-    # Save to disk
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-        
-    base_url = get_base_url()
-    return {"url": f"{base_url}/static/uploads/{unique_filename}"}
-        
-
-class ImageUrl(BaseModel):
-    url: str
-
-@app.post("/api/ingest-url")
-async def ingest_url(image: ImageUrl):
-    try:
-        # 1. Download the image
-        import requests
-        response = requests.get(image.url, stream=True)
-        response.raise_for_status()
-        
-        # 2. Generate Filename
-        file_ext = ".png" # Default fallback
-        if "jpeg" in response.headers.get("content-type", ""): file_ext = ".jpg"
-        if "png" in response.headers.get("content-type", ""): file_ext = ".png"
-        if "webp" in response.headers.get("content-type", ""): file_ext = ".webp"
-        
-        unique_filename = f"{uuid.uuid4()}{file_ext}"
-        file_path = os.path.join(UPLOAD_DIR, unique_filename)
-        
-        # 3. Save to Disk
-        with open(file_path, "wb") as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-                
-        base_url = get_base_url()
-        return {"url": f"{base_url}/static/uploads/{unique_filename}"}
-        
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to ingest URL: {str(e)}")
+    # Stream to storage in chunks; identical bytes map to the same content-addressed file
+    file_ext = storage.clean_extension(file.filename.rsplit(".", 1)[-1] if "." in (file.filename or "") else "")
+    result = await storage.store_stream(storage.iter_upload(file), file_ext)
+    # Thumbnails and per-platform sizes are rendered in the background process pool
+    media.schedule_derivatives(result["key"])
+    return result
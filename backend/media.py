@@ -0,0 +1,249 @@
+"""
+Background image derivatives: thumbnails and per-platform sizes in WebP/JPEG.
+
+After an upload or ingest, schedule_derivatives() hands the original to a
+process pool (Pillow encoding is CPU-bound and would otherwise stall API
+workers), stores each rendition next to the original and records it as a
+MediaVariant. /api/media/variant redirects to the smallest rendition that
+satisfies the requested width.
+"""
+import asyncio
+import importlib.util
+import os
+import uuid
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import anyio
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import RedirectResponse
+from sqlmodel import Session, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from .database import IS_SQLITE, engine, get_session
+from .models import CampaignPost, MediaVariant, Platform
+from . import storage
+
+# --- CONFIG ---
+MEDIA_DERIVATIVES = os.getenv("MEDIA_DERIVATIVES", "1").lower() in ("1", "true", "yes")
+MEDIA_WORKERS = int(os.getenv("MEDIA_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+PILLOW_AVAILABLE = importlib.util.find_spec("PIL") is not None
+
+IMAGE_EXTENSIONS = {"png", "jpg", "jpeg", "webp", "gif", "bmp", "tiff"}
+THUMBNAIL_SIZE = (320, 320)
+WEBP_QUALITY = 80
+JPEG_QUALITY = 85
+
+# Target frame per platform slug: (width, height, mode). "cover" crops to the exact
+# frame, "contain" only scales down.
+PLATFORM_SIZES: Dict[str, Tuple[int, int, str]] = {
+    "instagram": (1080, 1080, "cover"),
+    "x": (1600, 900, "cover"),
+    "linkedin": (1200, 627, "cover"),
+    "facebook": (1200, 630, "cover"),
+    "threads": (1080, 1350, "cover"),
+    "bluesky": (1200, 675, "cover"),
+    "mastodon": (1280, 720, "cover"),
+    "pinterest": (1000, 1500, "cover"),
+    "tiktok": (1080, 1920, "cover"),
+    "youtube": (1280, 720, "cover"),
+    "reddit": (1200, 628, "cover"),
+    "telegram": (1280, 1280, "contain"),
+    "discord": (1280, 1280, "contain"),
+}
+
+# --- WORKER (runs in a child process; must stay importable and picklable) ---
+
+def render_variants(source_path: str, out_dir: str, specs: List[Tuple[str, Optional[str], int, int, str]]) -> List[dict]:
+    """Render each (name, platform_slug, width, height, fit) spec as WebP and JPEG.
+
+    Returns one dict per written file; non-images yield an empty list.
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    try:
+        original = Image.open(source_path)
+        original.load()
+    except (UnidentifiedImageError, OSError):
+        return []
+
+    original = ImageOps.exif_transpose(original)
+    results = []
+    for name, platform_slug, width, height, fit in specs:
+        if fit == "cover":
+            image = ImageOps.fit(original, (width, height), Image.LANCZOS)
+        else:
+            image = original.copy()
+            image.thumbnail((width, height), Image.LANCZOS)
+
+        for fmt, ext in (("WEBP", "webp"), ("JPEG", "jpg")):
+            rendered = image
+            if fmt == "JPEG" and rendered.mode not in ("RGB", "L"):
+                rendered = rendered.convert("RGB")
+            elif fmt == "WEBP" and rendered.mode not in ("RGB", "RGBA"):
+                rendered = rendered.convert("RGBA" if "A" in rendered.getbands() else "RGB")
+            path = os.path.join(out_dir, f"{uuid.uuid4()}.{ext}")
+            options = {"quality": WEBP_QUALITY, "method": 4} if fmt == "WEBP" else {"quality": JPEG_QUALITY, "optimize": True, "progressive": True}
+            rendered.save(path, fmt, **options)
+            results.append({
+                "name": name,
+                "platform_slug": platform_slug,
+                "format": fmt.lower(),
+                "ext": ext,
+                "width": rendered.width,
+                "height": rendered.height,
+                "size": os.path.getsize(path),
+                "path": path,
+            })
+    return results
+
+# --- SCHEDULING ---
+
+_pool: Optional[ProcessPoolExecutor] = None
+_tasks: set = set() # Keep references so background tasks aren't garbage collected
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=MEDIA_WORKERS)
+    return _pool
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+def build_specs() -> List[Tuple[str, Optional[str], int, int, str]]:
+    specs = [("thumb", None, THUMBNAIL_SIZE[0], THUMBNAIL_SIZE[1], "contain")]
+    with Session(engine) as session:
+        active = session.exec(select(Platform.slug).where(Platform.is_active == True)).all()
+    for slug in active:
+        if slug in PLATFORM_SIZES:
+            width, height, fit = PLATFORM_SIZES[slug]
+            specs.append((slug, slug, width, height, fit))
+    return specs
+
+def has_variants(source_key: str) -> bool:
+    with Session(engine) as session:
+        return session.exec(select(MediaVariant.id).where(MediaVariant.source_key == source_key)).first() is not None
+
+def save_variants(source_key: str, rendered: List[dict]):
+    stem = source_key.rsplit(".", 1)[0]
+    rows = []
+    for item in rendered:
+        key = f"{stem}-{item['name']}.{item['ext']}"
+        if storage.storage.exists(key):
+            os.remove(item["path"])
+        else:
+            storage.storage.put_file(item["path"], key)
+        rows.append({
+            "source_key": source_key,
+            "name": item["name"],
+            "platform_slug": item["platform_slug"],
+            "format": item["format"],
+            "width": item["width"],
+            "height": item["height"],
+            "size": item["size"],
+            "storage_key": key,
+            "url": storage.storage.url_for(key),
+            "created_at": datetime.utcnow(),
+        })
+    if not rows:
+        return
+    # Concurrent identical uploads both get past has_variants(): the first rows win
+    stmt = (sqlite_insert if IS_SQLITE else pg_insert)(MediaVariant.__table__)
+    stmt = stmt.on_conflict_do_nothing(index_elements=["source_key", "name", "format"])
+    with Session(engine) as session:
+        session.execute(stmt, rows)
+        session.commit()
+
+async def generate_derivatives(source_key: str):
+    if await anyio.to_thread.run_sync(has_variants, source_key):
+        return
+    specs = await anyio.to_thread.run_sync(build_specs)
+    source_path, is_temp = await anyio.to_thread.run_sync(storage.storage.local_copy, source_key)
+    try:
+        loop = asyncio.get_running_loop()
+        rendered = await loop.run_in_executor(get_pool(), render_variants, source_path, storage.TMP_DIR, specs)
+    finally:
+        if is_temp and os.path.exists(source_path):
+            os.remove(source_path)
+    if rendered:
+        await anyio.to_thread.run_sync(save_variants, source_key, rendered)
+
+def schedule_derivatives(source_key: str):
+    """Fire-and-forget derivative generation for a stored image (no-op for other files)."""
+    ext = source_key.rsplit(".", 1)[-1].lower()
+    if not MEDIA_DERIVATIVES or not PILLOW_AVAILABLE or ext not in IMAGE_EXTENSIONS:
+        return
+    task = asyncio.get_running_loop().create_task(_run_logged(source_key))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+async def _run_logged(source_key: str):
+    try:
+        await generate_derivatives(source_key)
+    except Exception as e:
+        print(f"⚠️  Derivative generation failed for {source_key}: {e}")
+
+# --- LOOKUP ---
+
+def key_from_url(url: str) -> str:
+    # Storage keys are the last path segment of the stored URL
+    return url.split("?", 1)[0].rstrip("/").rsplit("/", 1)[-1]
+
+def pick_variant(variants: List[MediaVariant], width: Optional[int], platform: Optional[str], accepts_webp: bool,
+                 format: Optional[str] = None) -> Optional[MediaVariant]:
+    """Smallest variant at least `width` wide (or the largest one if none is wide enough)."""
+    wanted_format = format or ("webp" if accepts_webp else "jpeg")
+    candidates = [v for v in variants if v.format == wanted_format]
+    if platform:
+        candidates = [v for v in candidates if v.platform_slug == platform]
+    if not candidates:
+        return None
+    candidates.sort(key=lambda v: (v.width, v.size))
+    if width:
+        wide_enough = [v for v in candidates if v.width >= width]
+        return wide_enough[0] if wide_enough else candidates[-1]
+    return candidates[0]
+
+# --- ROUTER ---
+router = APIRouter()
+
+@router.get("/api/media/variants", response_model=List[MediaVariant])
+def read_variants(url: str, session: Session = Depends(get_session)):
+    return session.exec(select(MediaVariant).where(MediaVariant.source_key == key_from_url(url))).all()
+
+@router.get("/api/posts/{post_id}/media", response_model=List[MediaVariant])
+def read_post_media(post_id: int, session: Session = Depends(get_session)):
+    post = session.get(CampaignPost, post_id)
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+    if not post.media_image_url:
+        return []
+    return session.exec(select(MediaVariant).where(MediaVariant.source_key == key_from_url(post.media_image_url))).all()
+
+@router.get("/api/media/variant")
+def redirect_to_variant(request: Request, url: str, width: Optional[int] = None, platform: Optional[str] = None,
+                        format: Optional[str] = None, session: Session = Depends(get_session)):
+    source_key = key_from_url(url)
+    variants = session.exec(select(MediaVariant).where(MediaVariant.source_key == source_key)).all()
+    accepts_webp = "image/webp" in request.headers.get("accept", "")
+    variant = pick_variant(variants, width, platform, accepts_webp, format)
+    if variant:
+        return RedirectResponse(variant.url, status_code=307)
+    # Fall back to the original until derivatives exist, but only to our own storage:
+    # redirecting to the caller's url as given would be an open redirect
+    if not storage.is_storage_key(source_key) or not storage.storage.exists(source_key):
+        raise HTTPException(status_code=404, detail="Media not found")
+    return RedirectResponse(storage.storage.url_for(source_key), status_code=307)
+
+@router.post("/api/media/derivatives")
+async def ensure_derivatives(url: str):
+    source_key = key_from_url(url)
+    if not await anyio.to_thread.run_sync(storage.storage.exists, source_key):
+        raise HTTPException(status_code=404, detail="Media not found")
+    schedule_derivatives(source_key)
+    return {"scheduled": source_key}
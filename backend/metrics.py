@@ -0,0 +1,401 @@
+"""
+Time-series store for post performance metrics.
+
+Platforms report running totals ("likes" = 120 at 10:05). Every observation
+is appended to metricpoint, and ingestion turns it into a delta against the
+newest earlier observation of the same (post, platform, metric), kept in
+metriclatest. Deltas are summed into metrichourly and metricdaily per
+campaign, platform, metric and bucket with one upsert per table, so series
+queries read a few hundred rollup rows however many raw points exist, and
+the running total at any bucket is the sum of the deltas before it.
+
+An observation older than the newest one already stored for its series
+("late") is kept in metricpoint but not rolled up; rebuild_rollups()
+recomputes the rollups, metriclatest and the snapshots from metricpoint in
+SQL (after late backfills, or after moving posts between campaigns):
+
+    python -m backend.metrics --rebuild
+
+CampaignPost.performance_metrics stays as a cached view of the newest values:
+{"totals": {metric: sum over platforms}, "platforms": {slug: {metric: value}},
+"as_of": newest observation}.
+"""
+import argparse
+import csv
+import io
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel, Field as PydanticField
+from sqlmodel import Session, select
+from sqlalchemy import bindparam, delete, func, insert, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from .database import IS_SQLITE, async_db, engine, get_session
+from .models import Campaign, CampaignPost, MetricDaily, MetricHourly, MetricLatest, MetricPoint
+
+# --- CONFIG ---
+METRICS_MAX_BATCH = int(os.getenv("METRICS_MAX_BATCH", "50000")) # Points per ingestion request
+QUERY_CHUNK = 5000 # Ids per IN (...) list
+
+point_table = MetricPoint.__table__
+latest_table = MetricLatest.__table__
+post_table = CampaignPost.__table__
+ROLLUPS = {"hour": MetricHourly.__table__, "day": MetricDaily.__table__}
+DEFAULT_RANGE = {"hour": timedelta(days=7), "day": timedelta(days=90)}
+
+SeriesKey = Tuple[int, str, str] # (post_id, platform_slug, metric)
+
+def chunks(values: List, size: int = QUERY_CHUNK) -> Iterable[List]:
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+def naive_utc(value: datetime) -> datetime:
+    return (value - value.utcoffset()).replace(tzinfo=None) if value.tzinfo else value
+
+def truncate(ts: datetime, granularity: str) -> datetime:
+    if granularity == "day":
+        return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+def bucket_expr(column, granularity: str):
+    if IS_SQLITE:
+        # Same text form SQLAlchemy stores SQLite datetimes in, so buckets compare and collide correctly
+        return func.strftime("%Y-%m-%d 00:00:00.000000" if granularity == "day" else "%Y-%m-%d %H:00:00.000000", column)
+    return func.date_trunc(granularity, column)
+
+# --- MODELS ---
+class MetricPointIn(BaseModel):
+    post_id: int
+    platform: str = PydanticField(min_length=1)
+    metric: str = PydanticField(min_length=1)
+    value: float
+    ts: Optional[datetime] = None # Default: now (UTC)
+
+class MetricIngestRequest(BaseModel):
+    points: List[MetricPointIn]
+
+class MetricIngestResponse(BaseModel):
+    accepted: int # Stored in metricpoint
+    rolled_up: int # Accepted and newer than the series' latest observation
+    late: int # Accepted but older than the latest; picked up by a rebuild
+    rejected: int # Unknown post
+    posts: int # Posts whose performance_metrics snapshot changed
+
+class SeriesPoint(BaseModel):
+    bucket: datetime
+    delta: float
+    total: float # Running total at the end of the bucket
+    points: int
+
+class MetricSeries(BaseModel):
+    metric: str
+    granularity: str
+    start: datetime
+    end: datetime
+    campaign_id: Optional[int] = None
+    platform: Optional[str] = None
+    series: Dict[str, List[SeriesPoint]] # "all", or one entry per platform slug
+
+# --- SNAPSHOTS ---
+
+def snapshot(series: Dict[Tuple[str, str], Tuple[datetime, float]]) -> dict:
+    """performance_metrics for one post from its {(platform, metric): (ts, value)}."""
+    platforms: Dict[str, Dict[str, float]] = {}
+    totals: Dict[str, float] = defaultdict(float)
+    for (slug, metric), (_, value) in sorted(series.items()):
+        platforms.setdefault(slug, {})[metric] = value
+        totals[metric] += value
+    as_of = max((ts for ts, _ in series.values()), default=None)
+    return {"totals": dict(totals), "platforms": platforms, "as_of": as_of.isoformat() if as_of else None}
+
+def write_snapshots(session: Session, latest: Dict[SeriesKey, Tuple[datetime, float]], post_ids: Iterable[int]):
+    by_post: Dict[int, Dict[Tuple[str, str], Tuple[datetime, float]]] = {post_id: {} for post_id in post_ids}
+    for (post_id, slug, metric), observed in latest.items():
+        if post_id in by_post:
+            by_post[post_id][slug, metric] = observed
+    if by_post:
+        session.execute(
+            update(post_table).where(post_table.c.id == bindparam("b_id"))
+            .values(performance_metrics=bindparam("b_metrics", type_=post_table.c.performance_metrics.type)),
+            [{"b_id": post_id, "b_metrics": snapshot(series)} for post_id, series in by_post.items()],
+        )
+
+def load_latest(session: Session, post_ids: List[int], lock: bool = False) -> Dict[SeriesKey, Tuple[datetime, float]]:
+    latest = {}
+    for chunk in chunks(post_ids):
+        query = select(MetricLatest.post_id, MetricLatest.platform_slug, MetricLatest.metric, MetricLatest.ts, MetricLatest.value)
+        query = query.where(MetricLatest.post_id.in_(chunk))
+        if lock:
+            query = query.with_for_update() # Serializes concurrent ingestion into the same series (no-op on SQLite)
+        for post_id, slug, metric, ts, value in session.execute(query):
+            latest[post_id, slug, metric] = (ts, value)
+    return latest
+
+# --- INGESTION ---
+
+def upsert(session: Session, table, rows: List[dict], keys: List[str], set_):
+    if not rows:
+        return
+    stmt = (sqlite_insert if IS_SQLITE else pg_insert)(table)
+    session.execute(stmt.on_conflict_do_update(index_elements=keys, set_=set_(stmt)), rows)
+
+def write_points(session: Session, rows: List[dict]):
+    if IS_SQLITE:
+        session.execute(insert(point_table), rows)
+        return
+    # COPY, like the importer: several times faster than executemany for large batches
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([row["post_id"], row["platform_slug"], row["metric"], row["ts"].isoformat(), repr(row["value"]),
+                         row["received_at"].isoformat()])
+    buffer.seek(0)
+    with session.connection().connection.cursor() as cursor:
+        cursor.copy_expert("COPY metricpoint (post_id, platform_slug, metric, ts, value, received_at) FROM STDIN WITH (FORMAT csv)", buffer)
+
+def ingest_points(session: Session, points: List[MetricPointIn]) -> MetricIngestResponse:
+    """Append points, roll their deltas up and refresh the touched posts' snapshots. Does not commit."""
+    now = datetime.utcnow()
+    post_ids = sorted({p.post_id for p in points})
+    campaigns: Dict[int, int] = {}
+    for chunk in chunks(post_ids):
+        for post_id, campaign_id in session.execute(select(CampaignPost.id, CampaignPost.campaign_id).where(CampaignPost.id.in_(chunk))):
+            campaigns[post_id] = campaign_id or 0
+
+    rows = [
+        {"post_id": p.post_id, "platform_slug": p.platform, "metric": p.metric, "ts": naive_utc(p.ts) if p.ts else now, "value": p.value,
+         "received_at": now}
+        for p in points if p.post_id in campaigns
+    ]
+    known_posts = sorted({row["post_id"] for row in rows})
+    latest = load_latest(session, known_posts, lock=True)
+
+    deltas = {granularity: defaultdict(lambda: [0.0, 0]) for granularity in ROLLUPS}
+    changed = set()
+    late = 0
+    for row in sorted(rows, key=lambda r: r["ts"]):
+        key = (row["post_id"], row["platform_slug"], row["metric"])
+        previous = latest.get(key)
+        if previous is not None and row["ts"] <= previous[0]:
+            late += 1
+            continue
+        delta = row["value"] - (previous[1] if previous is not None else 0.0)
+        latest[key] = (row["ts"], row["value"])
+        changed.add(key)
+        for granularity, sums in deltas.items():
+            entry = sums[campaigns[key[0]], key[2], key[1], truncate(row["ts"], granularity)]
+            entry[0] += delta
+            entry[1] += 1
+
+    if rows:
+        write_points(session, rows)
+    upsert(session, latest_table, [
+        {"post_id": post_id, "platform_slug": slug, "metric": metric, "ts": latest[post_id, slug, metric][0],
+         "value": latest[post_id, slug, metric][1]}
+        for post_id, slug, metric in changed
+    ], ["post_id", "platform_slug", "metric"], lambda stmt: {"ts": stmt.excluded.ts, "value": stmt.excluded.value})
+    for granularity, sums in deltas.items():
+        table = ROLLUPS[granularity]
+        upsert(session, table, [
+            {"campaign_id": campaign_id, "metric": metric, "platform_slug": slug, "bucket": bucket, "delta": delta, "points": count}
+            for (campaign_id, metric, slug, bucket), (delta, count) in sums.items()
+        ], ["campaign_id", "metric", "platform_slug", "bucket"],
+            lambda stmt, table=table: {"delta": table.c.delta + stmt.excluded.delta, "points": table.c.points + stmt.excluded.points})
+    touched = {post_id for post_id, _, _ in changed}
+    write_snapshots(session, latest, touched)
+    return MetricIngestResponse(accepted=len(rows), rolled_up=len(rows) - late, late=late, rejected=len(points) - len(rows),
+                                posts=len(touched))
+
+# --- REBUILD ---
+
+def rebuild_rollups(session: Session, campaign_ids: Optional[List[int]] = None) -> Dict[str, int]:
+    """Recompute rollups, metriclatest and snapshots from metricpoint (all, or the posts of campaign_ids). Commits.
+
+    Points are attributed to their post's current campaign.
+    """
+    campaign = func.coalesce(post_table.c.campaign_id, 0)
+    scope = post_table.c.campaign_id.in_(campaign_ids) if campaign_ids is not None else None
+    partition = (point_table.c.post_id, point_table.c.platform_slug, point_table.c.metric)
+    ordered = (point_table.c.ts, point_table.c.id)
+
+    deltas = select(
+        campaign.label("campaign_id"), point_table.c.platform_slug, point_table.c.metric, point_table.c.ts,
+        (point_table.c.value - func.coalesce(func.lag(point_table.c.value).over(partition_by=partition, order_by=ordered), 0)).label("delta"),
+    ).join_from(point_table, post_table, post_table.c.id == point_table.c.post_id)
+    if scope is not None:
+        deltas = deltas.where(scope)
+    deltas = deltas.subquery()
+
+    counts = {}
+    for granularity, table in ROLLUPS.items():
+        clear = delete(table)
+        if campaign_ids is not None:
+            clear = clear.where(table.c.campaign_id.in_(campaign_ids))
+        session.execute(clear)
+        bucket = bucket_expr(deltas.c.ts, granularity)
+        rollup = select(deltas.c.campaign_id, deltas.c.metric, deltas.c.platform_slug, bucket, func.sum(deltas.c.delta), func.count()) \
+            .group_by(deltas.c.campaign_id, deltas.c.metric, deltas.c.platform_slug, bucket)
+        counts[granularity] = session.execute(
+            insert(table).from_select(["campaign_id", "metric", "platform_slug", "bucket", "delta", "points"], rollup)
+        ).rowcount
+
+    ranked = select(
+        point_table.c.post_id, point_table.c.platform_slug, point_table.c.metric, point_table.c.ts, point_table.c.value,
+        func.row_number().over(partition_by=partition, order_by=(point_table.c.ts.desc(), point_table.c.id.desc())).label("rank"),
+    ).join_from(point_table, post_table, post_table.c.id == point_table.c.post_id)
+    clear = delete(latest_table)
+    if scope is not None:
+        ranked = ranked.where(scope)
+        clear = clear.where(latest_table.c.post_id.in_(select(post_table.c.id).where(scope)))
+    ranked = ranked.subquery()
+    session.execute(clear)
+    counts["series"] = session.execute(insert(latest_table).from_select(
+        ["post_id", "platform_slug", "metric", "ts", "value"],
+        select(ranked.c.post_id, ranked.c.platform_slug, ranked.c.metric, ranked.c.ts, ranked.c.value).where(ranked.c.rank == 1),
+    )).rowcount
+
+    post_query = select(post_table.c.id).where(post_table.c.id.in_(select(latest_table.c.post_id)))
+    if scope is not None:
+        post_query = post_query.where(scope)
+    post_ids = list(session.execute(post_query).scalars())
+    for chunk in chunks(post_ids):
+        write_snapshots(session, load_latest(session, chunk), chunk)
+    counts["posts"] = len(post_ids)
+    session.commit()
+    return counts
+
+# --- QUERIES ---
+
+def read_series(session: Session, metric: str, granularity: str, start: Optional[datetime], end: Optional[datetime],
+                campaign_id: Optional[int] = None, platform: Optional[str] = None, by_platform: bool = False) -> MetricSeries:
+    """Bucketed deltas and running totals from the rollup tables."""
+    table = ROLLUPS[granularity]
+    end = naive_utc(end) if end else datetime.utcnow()
+    start = truncate(naive_utc(start) if start else end - DEFAULT_RANGE[granularity], granularity)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+
+    def scoped(query, rollup):
+        query = query.where(rollup.c.metric == metric)
+        if campaign_id is not None:
+            query = query.where(rollup.c.campaign_id == campaign_id)
+        if platform:
+            query = query.where(rollup.c.platform_slug == platform)
+        return query
+
+    def keyed(query, rollup, *columns):
+        # Sum per platform, or over all of them under the key "all"
+        keys = [rollup.c.platform_slug] if by_platform else []
+        return scoped(query.add_columns(*keys, *columns), rollup).group_by(*keys, *columns)
+
+    rows = session.execute(keyed(
+        select(func.sum(table.c.delta), func.sum(table.c.points)).where(table.c.bucket >= start, table.c.bucket < end),
+        table, table.c.bucket,
+    ).order_by(table.c.bucket)).all()
+
+    # Totals before the range: whole days from the daily table, the rest of the day from the hourly one
+    day = truncate(start, "day")
+    daily, hourly = ROLLUPS["day"], ROLLUPS["hour"]
+    baseline: Dict[str, float] = defaultdict(float)
+    queries = [keyed(select(func.sum(daily.c.delta)).where(daily.c.bucket < day), daily)]
+    if start > day:
+        queries.append(keyed(select(func.sum(hourly.c.delta)).where(hourly.c.bucket >= day, hourly.c.bucket < start), hourly))
+    for query in queries:
+        for total, *key in session.execute(query).all():
+            baseline[key[0] if key else "all"] += total or 0.0
+
+    series: Dict[str, List[SeriesPoint]] = {}
+    for delta, points, *key, bucket in rows:
+        key = key[0] if key else "all"
+        baseline[key] += delta
+        series.setdefault(key, []).append(SeriesPoint(bucket=bucket, delta=delta, total=baseline[key], points=points))
+    return MetricSeries(metric=metric, granularity=granularity, start=start, end=end, campaign_id=campaign_id,
+                        platform=platform, series=series)
+
+# --- ROUTER ---
+router = APIRouter()
+
+@router.post("/api/metrics/points", response_model=MetricIngestResponse)
+@async_db
+def ingest_metric_points(request: MetricIngestRequest, session: Session = Depends(get_session)):
+    """Bulk-append metric observations (running totals as reported by the platform)."""
+    if len(request.points) > METRICS_MAX_BATCH:
+        raise HTTPException(status_code=413, detail=f"At most {METRICS_MAX_BATCH} points per request")
+    result = ingest_points(session, request.points)
+    session.commit()
+    return result
+
+@router.get("/api/posts/{post_id}/metrics", response_model=List[MetricPoint])
+@async_db
+def read_post_metrics(
+    post_id: int,
+    metric: Optional[str] = None,
+    platform: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(1000, ge=1, le=10000),
+    session: Session = Depends(get_session),
+):
+    """Raw observations of one post, oldest first."""
+    query = select(MetricPoint).where(MetricPoint.post_id == post_id)
+    if metric:
+        query = query.where(MetricPoint.metric == metric)
+    if platform:
+        query = query.where(MetricPoint.platform_slug == platform)
+    if start:
+        query = query.where(MetricPoint.ts >= naive_utc(start))
+    if end:
+        query = query.where(MetricPoint.ts < naive_utc(end))
+    return session.exec(query.order_by(MetricPoint.ts, MetricPoint.id).limit(limit)).all()
+
+@router.get("/api/campaigns/{campaign_id}/metrics/series", response_model=MetricSeries)
+@async_db
+def read_campaign_series(
+    campaign_id: int,
+    metric: str,
+    granularity: str = Query("day", pattern="^(hour|day)$"),
+    platform: Optional[str] = None,
+    by_platform: bool = Query(False, description="One series per platform instead of their sum"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    session: Session = Depends(get_session),
+):
+    if not session.get(Campaign, campaign_id):
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    return read_series(session, metric, granularity, start, end, campaign_id=campaign_id, platform=platform, by_platform=by_platform)
+
+@router.get("/api/platforms/{slug}/metrics/series", response_model=MetricSeries)
+@async_db
+def read_platform_series(
+    slug: str,
+    metric: str,
+    granularity: str = Query("day", pattern="^(hour|day)$"),
+    campaign_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    session: Session = Depends(get_session),
+):
+    """One platform across every campaign (or one)."""
+    return read_series(session, metric, granularity, start, end, campaign_id=campaign_id, platform=slug)
+
+@router.post("/api/metrics/rebuild")
+@async_db
+def rebuild_metrics(campaign_id: Optional[int] = None, session: Session = Depends(get_session)):
+    return rebuild_rollups(session, [campaign_id] if campaign_id is not None else None)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Metric rollup maintenance.")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute rollups and snapshots from metricpoint")
+    parser.add_argument("--campaign", type=int, action="append", help="Only these campaigns (repeatable)")
+    args = parser.parse_args()
+    if args.rebuild:
+        from .database import create_db_and_tables
+        create_db_and_tables()
+        with Session(engine) as session:
+            print(f"✅ Rebuilt metric rollups {rebuild_rollups(session, args.campaign)}")
+    else:
+        parser.print_help()
@@ -1,9 +1,17 @@
 from typing import List, Optional, Dict, Any
-from sqlmodel import Field, SQLModel, JSON, Column, Relationship, String
+from sqlmodel import Field, SQLModel, JSON, Column, Relationship, String, Index, UniqueConstraint
 from datetime import datetime
-from .enums import PostStatus, CampaignStatus, ModeSlug
+from sqlalchemy import func
+from .enums import PostStatus, CampaignStatus, ModeSlug, PublishStatus
 
 class CampaignPost(SQLModel, table=True):
+    # Composite indexes backing the keyset-paginated /api/posts listing
+    # (filters on mode/campaign/status, ordered by id)
+    __table_args__ = (
+        Index("ix_campaignpost_mode_campaign_status_id", "mode", "campaign_id", "status", "id"),
+        Index("ix_campaignpost_campaign_status_id", "campaign_id", "status", "id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     title: str
     hook_text: str
@@ -34,6 +42,11 @@ class CampaignPost(SQLModel, table=True):
     image_prompt: Optional[str] = ""
     video_prompt: Optional[str] = ""
 
+    # Bumped on every UPDATE (onupdate) and defaulted by the database for bulk
+    # inserts; incremental exports select rows changed since a watermark
+    updated_at: Optional[datetime] = Field(default_factory=datetime.utcnow, index=True,
+                                           sa_column_kwargs={"onupdate": datetime.utcnow, "server_default": func.now()})
+
     # Relationships
     campaign_id: Optional[int] = Field(default=None, foreign_key="campaign.id")
     campaign: Optional["Campaign"] = Relationship(back_populates="posts")
@@ -43,6 +56,8 @@ class Campaign(SQLModel, table=True):
     name: str
     description: Optional[str] = ""
     status: CampaignStatus = Field(default=CampaignStatus.ACTIVE, sa_column=Column(String))
+    updated_at: Optional[datetime] = Field(default_factory=datetime.utcnow, index=True,
+                                           sa_column_kwargs={"onupdate": datetime.utcnow, "server_default": func.now()})
     
     # Relationship to Mode
     mode_id: Optional[int] = Field(default=None, foreign_key="mode.id")
@@ -68,6 +83,9 @@ class Platform(SQLModel, table=True):
     description: Optional[str] = "" # One-sentence summary of the platform
     content_recommendations: Optional[str] = "" # What content works best on this platform
 
+    updated_at: Optional[datetime] = Field(default_factory=datetime.utcnow, index=True,
+                                           sa_column_kwargs={"onupdate": datetime.utcnow, "server_default": func.now()})
+
 class WorkspaceSettings(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     default_overlay_text: str = Field(default="AppleSux")
@@ -105,3 +123,129 @@ class Mode(SQLModel, table=True):
 
     # Relationships
     campaigns: List["Campaign"] = Relationship(back_populates="mode")
+
+class IngestedUrl(SQLModel, table=True):
+    # Remembers which stored file a remote URL was ingested into, plus the
+    # validators needed to revalidate it without re-downloading
+    id: Optional[int] = Field(default=None, primary_key=True)
+    url_hash: str = Field(index=True, unique=True) # sha256 of source_url (URLs can exceed index limits)
+    source_url: str
+    storage_key: str
+    stored_url: str
+    content_type: Optional[str] = ""
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fetched_at: datetime = Field(default_factory=datetime.utcnow)
+
+class MediaVariant(SQLModel, table=True):
+    # Derived renditions (thumbnails, per-platform sizes) of a stored upload
+    __table_args__ = (UniqueConstraint("source_key", "name", "format", name="uq_mediavariant_source_name_format"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    source_key: str = Field(index=True) # Storage key of the original, e.g. "<sha256>.png"
+    name: str # "thumb", or the platform slug it was sized for
+    platform_slug: Optional[str] = None
+    format: str # "webp" or "jpeg"
+    width: int
+    height: int
+    size: int
+    storage_key: str
+    url: str
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class CampaignCounter(SQLModel, table=True):
+    # Materialized per-campaign post counts (see campaign_stats.py), one row per
+    # (campaign, dimension, value), e.g. (3, "platform", "x") -> 120
+    campaign_id: int = Field(foreign_key="campaign.id", primary_key=True)
+    dimension: str = Field(primary_key=True) # "total", "status", "platform" or "category"
+    value: str = Field(default="", primary_key=True)
+    count: int = 0
+
+class PostSignature(SQLModel, table=True):
+    # MinHash signature of a post's title + hook_text (see dedup.py)
+    post_id: int = Field(foreign_key="campaignpost.id", primary_key=True, ondelete="CASCADE")
+    content_hash: str # sha1 of the normalized text; unchanged text skips re-hashing
+    signature: str # NUM_PERM little-endian uint32 values, hex encoded
+
+class PostLshBucket(SQLModel, table=True):
+    # One row per (band, bucket) a post's signature falls into; posts sharing a
+    # row are near-duplicate candidates
+    band: int = Field(primary_key=True)
+    bucket: str = Field(primary_key=True)
+    post_id: int = Field(foreign_key="campaignpost.id", primary_key=True, index=True, ondelete="CASCADE")
+
+class RenderedPost(SQLModel, table=True):
+    # Memoized per-platform text of a post (see render.py), reused while both
+    # the post's and the platform's version hashes still match
+    post_id: int = Field(foreign_key="campaignpost.id", primary_key=True, ondelete="CASCADE")
+    platform_id: int = Field(foreign_key="platform.id", primary_key=True, index=True, ondelete="CASCADE")
+    post_version: str # sha1 of the post fields that are rendered
+    platform_version: str # sha1 of slug, char_limit, post_suffix and default_hashtags
+    text: str
+    length: int # In the platform's counting scheme (see platform_fit.py)
+    truncated: bool = False
+
+class PublishJob(SQLModel, table=True):
+    # One scheduled publish of a post to a platform (see publishing/scheduler.py).
+    # Workers claim due rows with FOR UPDATE SKIP LOCKED and hold them for a lease.
+    __table_args__ = (
+        UniqueConstraint("post_id", "platform_slug", name="uq_publishjob_post_platform"),
+        Index("ix_publishjob_status_scheduled_at", "status", "scheduled_at"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    post_id: int = Field(foreign_key="campaignpost.id", ondelete="CASCADE")
+    platform_slug: str
+    scheduled_at: datetime = Field(default_factory=datetime.utcnow) # UTC
+    status: PublishStatus = Field(default=PublishStatus.QUEUED, sa_column=Column(String, nullable=False))
+    attempts: int = 0
+    max_attempts: int = 5
+    locked_by: Optional[str] = None # Scheduler holding the job while Running
+    locked_until: Optional[datetime] = None # Lease expiry; an expired Running job is claimable again
+    last_error: Optional[str] = None
+    external_id: Optional[str] = None # Id of the published post on the platform
+    external_url: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+
+class MetricPoint(SQLModel, table=True):
+    # Append-only raw observations (see metrics.py): the value a platform
+    # reported for one metric of a post at ts
+    __table_args__ = (Index("ix_metricpoint_series_ts", "post_id", "platform_slug", "metric", "ts"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    post_id: int = Field(foreign_key="campaignpost.id", ondelete="CASCADE")
+    platform_slug: str
+    metric: str # e.g. "likes", "shares", "impressions"
+    ts: datetime # UTC
+    value: float
+    # Ingest time (UTC): the analytics export watermark. Ids come from the sequence before
+    # commit, so a slow batch can commit lower ids after a faster one's higher ids
+    received_at: Optional[datetime] = Field(default_factory=datetime.utcnow, index=True,
+                                            sa_column_kwargs={"server_default": func.now()})
+
+class MetricLatest(SQLModel, table=True):
+    # Newest observation per (post, platform, metric); ingestion turns each
+    # newer observation into a delta against it for the rollups
+    post_id: int = Field(foreign_key="campaignpost.id", primary_key=True, ondelete="CASCADE")
+    platform_slug: str = Field(primary_key=True)
+    metric: str = Field(primary_key=True)
+    ts: datetime
+    value: float
+
+class MetricRollup(SQLModel):
+    # Summed deltas of every post in a campaign per platform, metric and time
+    # bucket. campaign_id is the post's campaign at ingestion (0 = unlinked),
+    # kept without a foreign key so history outlives moves and deletes.
+    campaign_id: int = Field(primary_key=True)
+    metric: str = Field(primary_key=True)
+    platform_slug: str = Field(primary_key=True)
+    bucket: datetime = Field(primary_key=True) # Start of the hour/day, UTC
+    delta: float = 0 # Change of the summed metric within the bucket
+    points: int = 0 # Observations rolled into the bucket
+
+class MetricHourly(MetricRollup, table=True):
+    __table_args__ = (Index("ix_metrichourly_metric_platform_bucket", "metric", "platform_slug", "bucket"),)
+
+class MetricDaily(MetricRollup, table=True):
+    __table_args__ = (Index("ix_metricdaily_metric_platform_bucket", "metric", "platform_slug", "bucket"),)
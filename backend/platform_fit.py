@@ -0,0 +1,375 @@
+"""
+Platform-fit validation: does each post, as it would be published (body +
+post_suffix + default_hashtags), fit each platform's char_limit?
+
+Lengths are counted the way the platforms count them:
+    graphemes  user-perceived characters (emoji with skin tones, ZWJ
+               sequences and flags count once); most platforms
+    mastodon   graphemes, but every URL counts as 23
+    x          twitter-text weighting: every URL counts as 23, CJK and emoji
+               count 2, Latin and common punctuation 1 (limit 280)
+
+All post bodies are measured in one pass over a code point array (numpy
+masks for graphemes, URLs and character weights, summed per post), then the
+post × platform matrix is one broadcast: body length under the platform's
+scheme + that platform's suffix/hashtags length, compared with char_limit and
+masked by target_platforms. Truncation points are only worked out for the
+overflowing cells that are returned, in one array pass per counting scheme.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from sqlmodel import Session, select
+
+from .database import async_db, get_session
+from .models import Campaign, CampaignPost, Platform
+
+# --- LENGTH COUNTING ---
+# (url_length, weighted) per scheme; url_length None means URLs count like other text
+SCHEMES: Dict[str, Tuple[Optional[int], bool]] = {"graphemes": (None, False), "mastodon": (23, False), "x": (23, True)}
+PLATFORM_SCHEMES = {"x": "x", "mastodon": "mastodon"}
+SCHEME_NAMES = list(SCHEMES)
+ELLIPSIS = "…"
+SEPARATOR = "\n\n"
+
+# Code points that extend the previous character into one grapheme: combining marks,
+# variation selectors, skin tones and tag characters (plus ZWJ and the character it joins)
+EXTEND_RANGES = ((0x0300, 0x036F), (0x1AB0, 0x1AFF), (0x1DC0, 0x1DFF), (0x20D0, 0x20FF), (0xFE00, 0xFE0F),
+                 (0xFE20, 0xFE2F), (0x1F3FB, 0x1F3FF), (0xE0020, 0xE007F))
+# twitter-text v3 "weight 100" ranges; everything else weighs 200 (counts double)
+LIGHT_RANGES = ((0x0000, 0x10FF), (0x2000, 0x200D), (0x2010, 0x201F), (0x2032, 0x2037))
+REGIONAL_INDICATORS = ((0x1F1E6, 0x1F1FF),)
+# What str.isspace() treats as whitespace; a URL runs up to the next one
+SPACE_RANGES = ((0x09, 0x0D), (0x1C, 0x20), (0x85, 0x85), (0xA0, 0xA0), (0x1680, 0x1680), (0x2000, 0x200A),
+                (0x2028, 0x2029), (0x202F, 0x202F), (0x205F, 0x205F), (0x3000, 0x3000))
+URL_PREFIXES = ("https://", "http://", "www.")
+ZWJ = 0x200D
+
+EXTEND_FLAG, LIGHT_FLAG, SPACE_FLAG = 1, 2, 4
+
+def in_ranges(codepoints: np.ndarray, ranges) -> np.ndarray:
+    hit = np.zeros(codepoints.shape, dtype=bool)
+    for low, high in ranges:
+        hit |= (codepoints >= low) & (codepoints <= high)
+    return hit
+
+def build_bmp_table() -> np.ndarray:
+    """Property flags for every BMP code point, so the common case is one table lookup."""
+    table = np.zeros(0x10000, dtype=np.uint8)
+    for flag, ranges in ((EXTEND_FLAG, EXTEND_RANGES), (LIGHT_FLAG, LIGHT_RANGES), (SPACE_FLAG, SPACE_RANGES)):
+        for low, high in ranges:
+            if low <= 0xFFFF:
+                table[low:min(high, 0xFFFF) + 1] |= flag
+    return table
+
+BMP_TABLE = build_bmp_table()
+
+def code_point_flags(codepoints: np.ndarray, astral: np.ndarray) -> np.ndarray:
+    flags = BMP_TABLE[codepoints & 0xFFFF]
+    # Astral code points (emoji, tags) are rare: fix up just those
+    if len(astral):
+        values = codepoints[astral]
+        flags[astral] = np.where(in_ranges(values, EXTEND_RANGES), EXTEND_FLAG, 0).astype(np.uint8)
+    return flags
+
+def find_urls(codepoints: np.ndarray, flags: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(starts, ends) of URLs: a prefix from URL_PREFIXES (any case) up to the next whitespace."""
+    starts = [np.zeros(0, dtype=np.int64)]
+    for prefix in URL_PREFIXES:
+        # Check the few positions starting with the right letter, one prefix character at a time
+        hits = np.flatnonzero((codepoints[:len(codepoints) - len(prefix) + 1] | 0x20) == ord(prefix[0]))
+        for offset, char in enumerate(prefix[1:], 1):
+            following = codepoints[hits + offset]
+            hits = hits[((following | 0x20) if char.isalpha() else following) == ord(char)]
+        starts.append(hits)
+    starts = np.sort(np.concatenate(starts))
+    spaces = np.flatnonzero(flags & SPACE_FLAG)
+    ends = spaces[np.searchsorted(spaces, starts)]
+    # "https://www.…" also matches "www."; keep the outermost start per URL
+    ends, first = np.unique(ends, return_index=True)
+    return starts[first], ends
+
+def previous(positions: np.ndarray, limits: np.ndarray) -> np.ndarray:
+    """The last of the sorted positions below each limit, or -1."""
+    index = np.searchsorted(positions, limits) - 1
+    return np.where(index >= 0, positions[np.maximum(index, 0)] if len(positions) else -1, -1)
+
+class TextBatch:
+    """Many texts decoded into one code point array, with the masks every scheme shares.
+
+    Texts are joined with a newline after each, so URLs can't run into the
+    next text and no segment is empty; starts/ends are each text's offsets.
+    """
+
+    def __init__(self, texts: Sequence[str]):
+        joined = "\n".join(texts) + "\n"
+        sizes = np.fromiter((len(text) + 1 for text in texts), dtype=np.int64, count=len(texts))
+        self.ends = np.cumsum(sizes) - 1
+        self.starts = self.ends - sizes + 1
+        self.codepoints = codepoints = np.frombuffer(joined.encode("utf-32-le"), dtype=np.uint32)
+        astral = np.flatnonzero(codepoints > 0xFFFF)
+        self.flags = code_point_flags(codepoints, astral)
+
+        # Grapheme starts: everything but extenders and the character after a ZWJ
+        zwj = codepoints == ZWJ
+        extends = (self.flags & EXTEND_FLAG).astype(bool) | zwj
+        extends[1:] |= zwj[:-1]
+        # Regional indicators pair up into flags: every second one in a run extends
+        regional = astral[in_ranges(codepoints[astral], REGIONAL_INDICATORS)]
+        if len(regional):
+            order = np.arange(len(regional))
+            run_start = np.maximum.accumulate(np.where(np.diff(regional, prepend=-2) != 1, order, 0))
+            extends[regional[(order - run_start) % 2 == 1]] = True
+        # A text never shares a grapheme with its neighbours or the joining newline
+        extends[self.starts] = False
+        extends[self.ends] = False
+        self.graphemes = ~extends
+        self._urls = self._heavy = None
+
+    def urls(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(starts, ends, text index) of every URL."""
+        if self._urls is None:
+            url_starts, url_ends = find_urls(self.codepoints, self.flags)
+            self._urls = url_starts, url_ends, np.searchsorted(self.starts, url_starts, side="right") - 1
+        return self._urls
+
+    def heavy(self) -> np.ndarray:
+        """Grapheme starts that weigh 2 in the weighted scheme."""
+        if self._heavy is None:
+            self._heavy = self.graphemes & ~(self.flags & LIGHT_FLAG).astype(bool)
+        return self._heavy
+
+    def sums(self, mask: np.ndarray) -> np.ndarray:
+        return np.add.reduceat(mask, self.starts, dtype=np.int32).astype(np.int64)
+
+    def url_sums(self, mask: np.ndarray) -> np.ndarray:
+        url_starts, url_ends, url_texts = self.urls()
+        if not len(url_starts):
+            return np.zeros(len(self.starts), dtype=np.int64)
+        per_url = np.add.reduceat(mask, np.stack([url_starts, url_ends], axis=1).ravel(), dtype=np.int32)[::2]
+        return np.bincount(url_texts, weights=per_url, minlength=len(self.starts)).astype(np.int64)
+
+    def lengths(self, scheme: str) -> np.ndarray:
+        url_length, weighted = SCHEMES[scheme]
+        lengths = self.sums(self.graphemes) - 1 # Minus the joining newline
+        if weighted:
+            lengths += self.sums(self.heavy())
+        if url_length is not None:
+            # Swap the graphemes inside each URL for the fixed URL length
+            lengths += np.bincount(self.urls()[2], minlength=len(self.starts)) * url_length - self.url_sums(self.graphemes)
+            if weighted:
+                lengths -= self.url_sums(self.heavy())
+        return lengths
+
+    def cut_points(self, budgets: np.ndarray, scheme: str) -> np.ndarray:
+        """Per text, the index to cut at so text[:index] + "…" fits its budget, or -1.
+
+        Cuts fall on grapheme boundaries, never inside a URL, and back up to
+        the last word break unless that throws away most of the text.
+        """
+        url_length, weighted = SCHEMES[scheme]
+        weights = self.graphemes.astype(np.int32)
+        boundaries = self.graphemes.copy()
+        if weighted:
+            weights += self.heavy()
+        url_starts, url_ends, _ = self.urls()
+        marks = np.zeros(len(weights) + 1, dtype=np.int8)
+        marks[url_starts] += 1
+        marks[url_ends] -= 1
+        in_url = np.cumsum(marks[:-1], dtype=np.int8).astype(bool)
+        boundaries &= ~in_url
+        boundaries[url_starts] = True
+        if url_length is not None:
+            weights[in_url] = 0
+            weights[url_starts] = url_length
+        # before[i]: weight of everything ahead of code point i
+        before = np.concatenate(([0], np.cumsum(weights, dtype=np.int64)))
+        budgets = np.asarray(budgets, dtype=np.int64) - ELLIPSIS_LENGTHS[scheme]
+        fits = np.searchsorted(before, before[self.starts] + np.maximum(budgets, 0), side="right") - 1
+
+        valid = np.flatnonzero(boundaries)
+        ends = valid[np.searchsorted(valid, np.minimum(fits, self.ends), side="right") - 1]
+        # Whitespace graphemes, and the code points that aren't whitespace (for the rstrip)
+        spaces = np.flatnonzero((self.flags & SPACE_FLAG).astype(bool) & self.graphemes & np.append(self.graphemes[1:], True))
+        words = np.flatnonzero(~(self.flags & SPACE_FLAG).astype(bool))
+        last_space = previous(spaces, ends)
+        backed_up = previous(words, last_space) + 1
+        use_space = (last_space >= self.starts) & (last_space - self.starts >= (ends - self.starts) // 2)
+        cuts = np.where(use_space, np.maximum(backed_up, self.starts), ends) - self.starts
+        cuts = np.where(fits >= self.ends, self.ends - self.starts, cuts) # Everything fits
+        return np.where(budgets < 0, -1, cuts)
+
+def text_lengths(texts: Sequence[str], schemes: Sequence[str] = SCHEME_NAMES) -> Dict[str, np.ndarray]:
+    """Length of every text under each scheme, as {scheme: int64 array}.
+
+    The grapheme/URL/weight masks are computed for the whole batch at once
+    and summed back per text with np.add.reduceat.
+    """
+    if not texts:
+        return {scheme: np.zeros(0, dtype=np.int64) for scheme in schemes}
+    batch = TextBatch(texts)
+    return {scheme: batch.lengths(scheme) for scheme in schemes}
+
+def text_length(text: str, scheme: str = "graphemes") -> int:
+    return int(text_lengths([text], [scheme])[scheme][0]) if text else 0
+
+ELLIPSIS_LENGTHS = {scheme: text_length(ELLIPSIS, scheme) for scheme in SCHEMES}
+
+def truncation_points(texts: Sequence[str], budgets: Sequence[int], scheme: str = "graphemes") -> List[Optional[int]]:
+    """Per text, the index to cut at so text[:index] + "…" is at most its budget long; prefers a word boundary.
+
+    None where not even the ellipsis fits. URLs are never split.
+    """
+    if not texts:
+        return []
+    cuts = TextBatch(texts).cut_points(np.asarray(budgets), scheme)
+    return [cut if cut >= 0 else None for cut in cuts.tolist()]
+
+def truncation_point(text: str, budget: int, scheme: str = "graphemes") -> Optional[int]:
+    return truncation_points([text], [budget], scheme)[0]
+
+# --- RENDERED TEXT ---
+
+def post_body(hook_text: Optional[str], closing_hook: Optional[str]) -> str:
+    return SEPARATOR.join(part.strip() for part in (hook_text, closing_hook) if part and part.strip())
+
+def platform_tail(post_suffix: Optional[str], default_hashtags: Optional[str]) -> str:
+    return " ".join(part.strip() for part in (post_suffix, default_hashtags) if part and part.strip())
+
+def scheme_for(slug: str) -> str:
+    return PLATFORM_SCHEMES.get(slug, "graphemes")
+
+# --- FIT MATRIX ---
+
+class FitMatrix:
+    """Rendered lengths of n posts on p platforms, with limits and target mask."""
+
+    def __init__(self, bodies: Sequence[str], targets: Sequence[Optional[List[str]]], platforms: Sequence[Platform],
+                 all_platforms: bool = False):
+        self.bodies = bodies
+        self.platforms = list(platforms)
+        slugs = [p.slug for p in self.platforms]
+        schemes = [scheme_for(slug) for slug in slugs]
+        used_schemes = sorted(set(schemes), key=SCHEME_NAMES.index)
+
+        # (n, s): each body measured once per scheme in use
+        measured = text_lengths(bodies, used_schemes)
+        body_lengths = np.stack([measured[s] for s in used_schemes], axis=1) if used_schemes else np.zeros((len(bodies), 0), dtype=np.int64)
+        columns = np.array([used_schemes.index(s) for s in schemes], dtype=np.int64)
+        tails = [platform_tail(p.post_suffix, p.default_hashtags) for p in self.platforms]
+        tail_lengths = np.array([text_length(tail, s) for tail, s in zip(tails, schemes)], dtype=np.int64)
+        separator = np.where(tail_lengths > 0, len(SEPARATOR), 0)
+
+        # (n, p) by broadcasting; an empty body drops the separator too
+        lengths = body_lengths[:, columns]
+        self.body_lengths = lengths
+        self.tail_lengths = tail_lengths + separator
+        self.lengths = lengths + np.where(lengths > 0, self.tail_lengths, tail_lengths)
+        self.limits = np.array([p.char_limit for p in self.platforms], dtype=np.int64)
+
+        if all_platforms:
+            self.mask = np.ones(self.lengths.shape, dtype=bool)
+        else:
+            index = {slug: i for i, slug in enumerate(slugs)}
+            rows, cols = [], []
+            for row, post_targets in enumerate(targets):
+                for slug in post_targets or ():
+                    if slug in index:
+                        rows.append(row)
+                        cols.append(index[slug])
+            self.mask = np.zeros(self.lengths.shape, dtype=bool)
+            self.mask[rows, cols] = True
+        self.over = (self.lengths > self.limits) & self.mask
+
+    def overflows(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(post rows, platform columns) of overflowing cells, worst first."""
+        rows, cols = np.nonzero(self.over)
+        excess = self.lengths[rows, cols] - self.limits[cols]
+        order = np.lexsort((cols, rows, -excess))
+        return rows[order], cols[order]
+
+    def suggest_cuts(self, rows: Sequence[int], cols: Sequence[int]) -> List[Optional[int]]:
+        """Where to cut each (row, col) cell's body so body + "…" + suffix/hashtags fits; one pass per scheme."""
+        cuts: List[Optional[int]] = [None] * len(rows)
+        by_scheme: Dict[str, List[int]] = {}
+        for index, col in enumerate(cols):
+            by_scheme.setdefault(scheme_for(self.platforms[col].slug), []).append(index)
+        for scheme, indexes in by_scheme.items():
+            bodies = [self.bodies[rows[i]] for i in indexes]
+            budgets = [int(self.limits[cols[i]] - (self.tail_lengths[cols[i]] if self.body_lengths[rows[i], cols[i]] else 0))
+                       for i in indexes]
+            for index, cut in zip(indexes, truncation_points(bodies, budgets, scheme)):
+                cuts[index] = cut
+        return cuts
+
+# --- MODELS ---
+class PlatformFitSummary(BaseModel):
+    platform: str
+    char_limit: int
+    checked: int
+    overflowing: int
+    max_length: int
+
+class PlatformOverflow(BaseModel):
+    post_id: int
+    platform: str
+    length: int
+    limit: int
+    over_by: int
+    truncate_at: Optional[int] = None # Cut the post body here and append "…" to fit
+    truncated_body: Optional[str] = None
+
+class ValidationReport(BaseModel):
+    campaign_id: int
+    posts: int
+    platforms: List[PlatformFitSummary]
+    overflowing: int
+    overflows: List[PlatformOverflow]
+
+# --- ROUTER ---
+router = APIRouter()
+
+@router.get("/api/campaigns/{campaign_id}/validate", response_model=ValidationReport)
+@async_db
+def validate_campaign(
+    campaign_id: int,
+    platforms: Optional[str] = Query(None, description="Comma-separated platform slugs (default: all active)"),
+    all_platforms: bool = Query(False, description="Check every platform, not just each post's target_platforms"),
+    limit: int = Query(200, ge=0, le=5000, description="Max overflow entries returned, worst first"),
+    session: Session = Depends(get_session),
+):
+    if not session.get(Campaign, campaign_id):
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    query = select(Platform).where(Platform.is_active == True).order_by(Platform.id)
+    if platforms:
+        query = select(Platform).where(Platform.slug.in_([s.strip() for s in platforms.split(",") if s.strip()])).order_by(Platform.id)
+    platform_rows = session.exec(query).all()
+
+    rows = session.execute(
+        select(CampaignPost.id, CampaignPost.hook_text, CampaignPost.closing_hook, CampaignPost.target_platforms)
+        .where(CampaignPost.campaign_id == campaign_id).order_by(CampaignPost.id)
+    ).all()
+    ids = [row[0] for row in rows]
+    matrix = FitMatrix([post_body(row[1], row[2]) for row in rows], [row[3] for row in rows], platform_rows, all_platforms)
+
+    checked = matrix.mask.sum(axis=0)
+    overflowing = matrix.over.sum(axis=0)
+    longest = np.where(matrix.mask, matrix.lengths, 0).max(axis=0) if rows else np.zeros(len(platform_rows), dtype=np.int64)
+    summaries = [
+        PlatformFitSummary(platform=p.slug, char_limit=p.char_limit, checked=int(checked[i]),
+                           overflowing=int(overflowing[i]), max_length=int(longest[i]))
+        for i, p in enumerate(platform_rows)
+    ]
+
+    overflows = []
+    over_rows, over_cols = matrix.overflows()
+    rows_shown, cols_shown = over_rows[:limit].tolist(), over_cols[:limit].tolist()
+    for row, col, cut in zip(rows_shown, cols_shown, matrix.suggest_cuts(rows_shown, cols_shown)):
+        length, char_limit = int(matrix.lengths[row, col]), int(matrix.limits[col])
+        overflows.append(PlatformOverflow(
+            post_id=ids[row], platform=platform_rows[col].slug, length=length, limit=char_limit, over_by=length - char_limit,
+            truncate_at=cut, truncated_body=matrix.bodies[row][:cut].rstrip() + ELLIPSIS if cut is not None else None,
+        ))
+    return ValidationReport(campaign_id=campaign_id, posts=len(rows), platforms=summaries,
+                            overflowing=int(len(over_rows)), overflows=overflows)
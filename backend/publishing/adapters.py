@@ -0,0 +1,105 @@
+"""
+Pluggable publishing adapters: how a rendered post reaches a platform.
+
+PUBLISH_ADAPTER picks the adapter for every platform; PUBLISH_ADAPTERS
+overrides it per platform slug ("x=fake,linkedin=fake"). Available:
+    fake   local stand-in that sleeps, fails at a configurable rate and hands
+           out ids, so the scheduler can be load-tested offline (default)
+
+An adapter receives the job's idempotency key; the scheduler reuses it when a
+job is retried or its lease expires, so a real platform client can avoid
+publishing the same job twice.
+"""
+import asyncio
+import os
+import random
+import uuid
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+# --- CONFIG ---
+PUBLISH_ADAPTER = os.getenv("PUBLISH_ADAPTER", "fake")
+PUBLISH_ADAPTERS = os.getenv("PUBLISH_ADAPTERS", "") # Per-platform overrides, "slug=adapter,..."
+PUBLISH_FAKE_LATENCY = float(os.getenv("PUBLISH_FAKE_LATENCY", "0.05")) # Seconds per publish
+PUBLISH_FAKE_FAILURE_RATE = float(os.getenv("PUBLISH_FAKE_FAILURE_RATE", "0"))
+
+class PublishError(Exception):
+    """A failed publish; `retryable` marks transient failures, `retry_after` a platform-requested delay."""
+
+    def __init__(self, message: str, retryable: bool = False, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+@dataclass
+class PublishRequest:
+    job_id: int
+    post_id: int
+    platform: str
+    text: str
+    media_url: str = ""
+    idempotency_key: str = ""
+
+@dataclass
+class PublishResult:
+    external_id: str
+    url: str = ""
+
+class PublishAdapter:
+    name = "base"
+
+    async def publish(self, request: PublishRequest) -> PublishResult:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+class FakeAdapter(PublishAdapter):
+    """Pretends to publish: latency, random transient failures, idempotent per key."""
+
+    name = "fake"
+
+    def __init__(self, latency: float = PUBLISH_FAKE_LATENCY, failure_rate: float = PUBLISH_FAKE_FAILURE_RATE):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.published: Dict[str, PublishResult] = {} # idempotency key -> result
+        self.calls = 0
+        self.duplicates = 0 # Calls for a key that was already published
+
+    async def publish(self, request):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        if request.idempotency_key in self.published:
+            self.duplicates += 1
+            return self.published[request.idempotency_key]
+        if random.random() < self.failure_rate:
+            raise PublishError(f"Fake {request.platform} outage", retryable=True)
+        external_id = uuid.uuid4().hex[:16]
+        result = PublishResult(external_id=external_id, url=f"https://{request.platform}.example/posts/{external_id}")
+        self.published[request.idempotency_key] = result
+        return result
+
+ADAPTERS = {"fake": FakeAdapter}
+
+def adapter_from_name(name: str) -> PublishAdapter:
+    if name not in ADAPTERS:
+        raise ValueError(f"Unknown publish adapter {name!r} (expected one of: {', '.join(ADAPTERS)})")
+    return ADAPTERS[name]()
+
+class AdapterRegistry:
+    """One adapter instance per name, shared by the platforms that use it."""
+
+    def __init__(self, default: str = PUBLISH_ADAPTER, overrides: str = PUBLISH_ADAPTERS):
+        self.default = default
+        self.overrides = dict(item.split("=", 1) for item in overrides.split(",") if "=" in item)
+        self.instances: Dict[str, PublishAdapter] = {}
+
+    def for_platform(self, slug: str) -> PublishAdapter:
+        name = self.overrides.get(slug, self.default)
+        if name not in self.instances:
+            self.instances[name] = adapter_from_name(name)
+        return self.instances[name]
+
+    async def close(self):
+        for adapter in self.instances.values():
+            await adapter.close()
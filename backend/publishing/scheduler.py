@@ -0,0 +1,615 @@
+"""
+Publishing scheduler: a durable job queue in the publishjob table, drained by
+async workers through pluggable adapters (see adapters.py).
+
+Scheduling a post creates one job per target platform with a scheduled_at.
+A scheduler process polls for due jobs and claims a batch in one UPDATE ...
+WHERE id IN (SELECT ... FOR UPDATE SKIP LOCKED) RETURNING statement, so any
+number of schedulers can share the table without handing out a job twice
+(SQLite has no SKIP LOCKED, but serializes the single-statement claim, which
+is enough for one scheduler process). A claimed job is leased: if its
+scheduler dies, the job becomes claimable again when the lease runs out.
+
+Each platform has a token bucket (posts per minute and burst, from
+PLATFORM_RATES by slug or PUBLISH_RATES). Claims only take as many jobs per
+platform as its bucket can release within PUBLISH_HOLD seconds, so a backlog
+for one rate-limited platform doesn't occupy the workers of the others.
+Claimed jobs are rendered in one batch (render.py, memoized), published,
+and their outcomes written back in batches: successes add
+{platform, id, url, posted_at} to the post's platform_post_ids (and mark the
+post Posted once every target platform has one), transient failures are
+retried with exponential backoff up to max_attempts.
+
+Run it inside the API with PUBLISH_SCHEDULER=1, or as its own process:
+
+    python -m backend.publishing.scheduler run [--workers 16] [--drain]
+"""
+import argparse
+import asyncio
+import math
+import os
+import random
+import socket
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import anyio
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from sqlmodel import Session, select
+from sqlalchemy import and_, bindparam, case, func, or_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from .. import cache, campaign_stats, render
+from ..database import IS_SQLITE, async_db, engine, get_session
+from ..enums import PostStatus, PublishStatus
+from ..models import Campaign, CampaignPost, Platform, PublishJob
+from .adapters import AdapterRegistry, PublishError, PublishRequest, PublishResult
+
+# --- CONFIG ---
+PUBLISH_SCHEDULER = os.getenv("PUBLISH_SCHEDULER", "0").lower() in ("1", "true", "yes") # Run inside the API process
+PUBLISH_WORKERS = int(os.getenv("PUBLISH_WORKERS", "8"))
+PUBLISH_BATCH = int(os.getenv("PUBLISH_BATCH", "100")) # Max jobs claimed per poll
+PUBLISH_POLL_INTERVAL = float(os.getenv("PUBLISH_POLL_INTERVAL", "1"))
+PUBLISH_LEASE = float(os.getenv("PUBLISH_LEASE", "300")) # Seconds a claimed job stays with its scheduler
+PUBLISH_HOLD = float(os.getenv("PUBLISH_HOLD", "5")) # Claim only jobs a bucket can release this soon
+PUBLISH_TIMEOUT = float(os.getenv("PUBLISH_TIMEOUT", "60")) # Seconds per adapter call
+PUBLISH_MAX_ATTEMPTS = int(os.getenv("PUBLISH_MAX_ATTEMPTS", "5"))
+PUBLISH_RETRY_BASE_DELAY = float(os.getenv("PUBLISH_RETRY_BASE_DELAY", "30"))
+PUBLISH_RATES = os.getenv("PUBLISH_RATES", "") # Overrides, "slug=per_minute:burst,..."
+PUBLISH_DEFAULT_RATE = os.getenv("PUBLISH_DEFAULT_RATE", "30:5")
+FLUSH_SIZE = 200 # Outcomes written per transaction
+
+# Conservative posts-per-minute and burst per platform slug
+PLATFORM_RATES: Dict[str, Tuple[float, int]] = {
+    "x": (10, 3),
+    "linkedin": (5, 2),
+    "facebook": (20, 5),
+    "instagram": (5, 2),
+    "threads": (10, 3),
+    "bluesky": (30, 5),
+    "mastodon": (30, 5),
+    "tiktok": (2, 1),
+    "youtube": (2, 1),
+    "pinterest": (10, 3),
+    "reddit": (2, 1),
+    "telegram": (20, 5),
+    "discord": (30, 5),
+}
+
+job_table = PublishJob.__table__
+post_table = CampaignPost.__table__
+
+def parse_rate(value: str) -> Tuple[float, int]:
+    per_minute, _, burst = value.partition(":")
+    return float(per_minute), int(burst or 1)
+
+def rate_for(platform: Platform) -> Tuple[float, int]:
+    """(posts per minute, burst) for a platform."""
+    overrides = dict(item.split("=", 1) for item in PUBLISH_RATES.split(",") if "=" in item)
+    if platform.slug in overrides:
+        return parse_rate(overrides[platform.slug])
+    return PLATFORM_RATES.get(platform.slug) or parse_rate(PUBLISH_DEFAULT_RATE)
+
+class TokenBucket:
+    """Reservation-style bucket: reserve() returns how long to wait before using the token."""
+
+    def __init__(self, per_minute: float, burst: int):
+        self.rate = per_minute / 60
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self, within: float) -> int:
+        """Tokens that can be reserved without waiting longer than `within` seconds."""
+        self.refill()
+        return max(0, math.floor(self.tokens + within * self.rate))
+
+    def reserve(self) -> float:
+        self.refill()
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+# --- QUEUE ---
+
+@dataclass
+class ClaimedJob:
+    id: int
+    post_id: int
+    platform: str
+    attempts: int
+    max_attempts: int
+    text: str = ""
+    media_url: str = ""
+
+@dataclass
+class Outcome:
+    job: ClaimedJob
+    result: Optional[PublishResult] = None
+    error: Optional[PublishError] = None
+
+def due_clause(now: datetime):
+    # Queued and due, or Running with an expired lease (its scheduler died)
+    return or_(
+        and_(job_table.c.status == PublishStatus.QUEUED.value, job_table.c.scheduled_at <= now),
+        and_(job_table.c.status == PublishStatus.RUNNING.value, job_table.c.locked_until < now),
+    )
+
+def claim_statement(worker_id: str, limit: int, quotas: Dict[str, int], default_quota: int, now: datetime):
+    """UPDATE ... RETURNING that leases up to `limit` due jobs, at most quotas[slug] per platform."""
+    # Rank the earliest due jobs per platform (window functions can't be locked,
+    # so the outer select takes the row locks)
+    window = (
+        select(job_table.c.id, job_table.c.platform_slug, job_table.c.scheduled_at)
+        .where(due_clause(now)).order_by(job_table.c.scheduled_at, job_table.c.id).limit(limit * 20).subquery()
+    )
+    ranked = select(
+        window.c.id, window.c.platform_slug,
+        func.row_number().over(partition_by=window.c.platform_slug, order_by=(window.c.scheduled_at, window.c.id)).label("rank"),
+    ).subquery()
+    quota = case(quotas, value=ranked.c.platform_slug, else_=default_quota) if quotas else default_quota
+    picked = (
+        select(job_table.c.id)
+        .where(job_table.c.id.in_(select(ranked.c.id).where(ranked.c.rank <= quota)), due_clause(now))
+        .order_by(job_table.c.scheduled_at, job_table.c.id).limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    return (
+        update(job_table).where(job_table.c.id.in_(picked.scalar_subquery()))
+        .values(status=PublishStatus.RUNNING.value, locked_by=worker_id, attempts=job_table.c.attempts + 1,
+                locked_until=now + timedelta(seconds=PUBLISH_LEASE))
+        .returning(job_table.c.id, job_table.c.post_id, job_table.c.platform_slug, job_table.c.attempts, job_table.c.max_attempts)
+    )
+
+def claim_jobs(worker_id: str, limit: int, quotas: Dict[str, int], default_quota: int) -> List[ClaimedJob]:
+    """Lease due jobs (see claim_statement), rendered and ready to publish."""
+    now = datetime.utcnow()
+    with Session(engine) as session:
+        jobs = [ClaimedJob(*row) for row in session.execute(claim_statement(worker_id, limit, quotas, default_quota, now)).all()]
+        if jobs:
+            jobs = prepare_jobs(session, jobs, now)
+        session.commit()
+    return jobs
+
+def prepare_jobs(session: Session, jobs: List[ClaimedJob], now: datetime) -> List[ClaimedJob]:
+    """Render the claimed jobs' text in one batch; jobs that can't be published fail here."""
+    posts = {row[0]: row for row in session.execute(
+        select(CampaignPost.id, CampaignPost.hook_text, CampaignPost.closing_hook, CampaignPost.media_image_url,
+               CampaignPost.media_video_url).where(CampaignPost.id.in_({job.post_id for job in jobs}))
+    )}
+    platforms = {p.slug: p for p in session.exec(select(Platform).where(Platform.slug.in_({job.platform for job in jobs})))}
+    ready, failed = [], []
+    for job in jobs:
+        platform = platforms.get(job.platform)
+        if job.post_id not in posts or platform is None or not platform.is_active:
+            failed.append({"b_id": job.id, "b_error": "Post deleted" if job.post_id not in posts else f"Platform {job.platform!r} is unknown or inactive"})
+        else:
+            ready.append(job)
+    if failed:
+        session.execute(
+            update(job_table).where(job_table.c.id == bindparam("b_id"))
+            .values(status=PublishStatus.FAILED.value, last_error=bindparam("b_error"), finished_at=now, locked_by=None, locked_until=None),
+            failed,
+        )
+
+    post_rows = list({job.post_id: posts[job.post_id][:3] for job in ready}.values())
+    post_index = {row[0]: i for i, row in enumerate(post_rows)}
+    platform_rows = list({job.platform: platforms[job.platform] for job in ready}.values())
+    platform_index = {p.slug: j for j, p in enumerate(platform_rows)}
+    cells = [(post_index[job.post_id], platform_index[job.platform]) for job in ready]
+    results, _ = render.render_posts(session, post_rows, platform_rows, cells)
+    for job, (text, _, _, _) in zip(ready, results):
+        _, _, _, image, video = posts[job.post_id]
+        job.text, job.media_url = text, image or video or ""
+    return ready
+
+def record_outcomes(worker_id: str, outcomes: List[Outcome]):
+    """Write a batch of publish outcomes: job rows, post platform_post_ids/status, counters."""
+    now = datetime.utcnow()
+    published = [o for o in outcomes if o.result is not None]
+    retries, failures = [], []
+    for o in outcomes:
+        if o.error is None:
+            continue
+        params = {"b_id": o.job.id, "b_error": str(o.error)[:500]}
+        if o.error.retryable and o.job.attempts < o.job.max_attempts:
+            # Exponential backoff with jitter, unless the platform said when to come back
+            delay = o.error.retry_after or PUBLISH_RETRY_BASE_DELAY * 2 ** (o.job.attempts - 1) * random.uniform(0.5, 1)
+            retries.append({**params, "b_at": now + timedelta(seconds=delay)})
+        else:
+            failures.append(params)
+
+    with Session(engine) as session:
+        mine = and_(job_table.c.id == bindparam("b_id"), job_table.c.locked_by == worker_id)
+        if published:
+            # Recorded even if the lease ran out meanwhile: the post did go out
+            session.execute(
+                update(job_table).where(job_table.c.id == bindparam("b_id"))
+                .values(status=PublishStatus.PUBLISHED.value, external_id=bindparam("b_external_id"),
+                        external_url=bindparam("b_url"), finished_at=now, last_error=None, locked_by=None, locked_until=None),
+                [{"b_id": o.job.id, "b_external_id": o.result.external_id, "b_url": o.result.url} for o in published],
+            )
+            record_post_ids(session, published, now)
+        if retries:
+            session.execute(
+                update(job_table).where(mine).values(status=PublishStatus.QUEUED.value, scheduled_at=bindparam("b_at"),
+                                                     last_error=bindparam("b_error"), locked_by=None, locked_until=None),
+                retries,
+            )
+        if failures:
+            session.execute(
+                update(job_table).where(mine).values(status=PublishStatus.FAILED.value, last_error=bindparam("b_error"),
+                                                     finished_at=now, locked_by=None, locked_until=None),
+                failures,
+            )
+        session.commit()
+
+def record_post_ids(session: Session, published: List[Outcome], now: datetime):
+    by_post: Dict[int, List[Outcome]] = {}
+    for o in published:
+        by_post.setdefault(o.job.post_id, []).append(o)
+    # Row locks keep concurrent schedulers from overwriting each other's ids (no-op on SQLite)
+    posts = session.exec(select(CampaignPost).where(CampaignPost.id.in_(list(by_post))).with_for_update()).all()
+    for post in posts:
+        before = campaign_stats.counted_values(post)
+        slugs = {o.job.platform for o in by_post[post.id]}
+        entries = [entry for entry in post.platform_post_ids or [] if entry.get("platform") not in slugs]
+        entries += [{"platform": o.job.platform, "id": o.result.external_id, "url": o.result.url, "posted_at": now.isoformat()}
+                    for o in by_post[post.id]]
+        post.platform_post_ids = entries
+        if post.status != PostStatus.POSTED and set(post.target_platforms or []) <= {entry.get("platform") for entry in entries}:
+            post.status = PostStatus.POSTED
+            post.posted_date = now.isoformat()
+        session.add(post)
+        campaign_stats.apply_changes(session, before=[before], after=[post])
+
+def pending_jobs() -> int:
+    with Session(engine) as session:
+        return session.execute(select(func.count()).select_from(job_table).where(
+            job_table.c.status.in_([PublishStatus.QUEUED.value, PublishStatus.RUNNING.value])
+        )).scalar_one()
+
+def load_platforms() -> List[Platform]:
+    with Session(engine) as session:
+        return session.exec(select(Platform)).all()
+
+# --- SCHEDULER ---
+
+class Scheduler:
+    """Claims due jobs, paces them through per-platform buckets and publishes them on a worker pool."""
+
+    def __init__(self, workers: int = PUBLISH_WORKERS, batch: int = PUBLISH_BATCH, adapters: Optional[AdapterRegistry] = None,
+                 worker_id: Optional[str] = None):
+        self.workers = workers
+        self.batch = batch
+        self.adapters = adapters or AdapterRegistry()
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.platforms_generation: Optional[str] = None
+        self.stats: Counter = Counter()
+        self.published_by_platform: Counter = Counter()
+        self.outstanding = 0 # Claimed jobs without a recorded outcome yet
+        self.started_at: Optional[float] = None
+        self._ready: Optional[asyncio.Queue] = None
+        self._outcomes: Optional[asyncio.Queue] = None
+        self._freed: Optional[asyncio.Event] = None # Set when outcomes are recorded
+
+    async def refresh_buckets(self):
+        # Rebuilt after platform edits, like the prompt registry
+        def check():
+            # The generation read is a cache round trip too: both run off the event loop
+            generation = cache.generation("platforms")
+            return generation, (load_platforms() if generation != self.platforms_generation else None)
+
+        generation, platforms = await anyio.to_thread.run_sync(check)
+        if platforms is not None:
+            buckets = {}
+            for p in platforms:
+                # Keep the current fill across refreshes so an edit doesn't reset the pacing
+                bucket = buckets[p.slug] = self.buckets.get(p.slug) or TokenBucket(*rate_for(p))
+                per_minute, burst = rate_for(p)
+                bucket.rate, bucket.capacity = per_minute / 60, max(1, burst)
+            self.buckets = buckets
+            self.platforms_generation = generation
+
+    async def claim(self) -> Tuple[int, int]:
+        """Claim and dispatch due jobs; returns (claimed, room) where room is how many could have been."""
+        await self.refresh_buckets()
+        room = min(self.batch, self.workers * 4 - self.outstanding)
+        quotas = {slug: min(room, bucket.available(PUBLISH_HOLD)) for slug, bucket in self.buckets.items()}
+        if room <= 0 or not any(quotas.values()):
+            return 0, room
+        # Jobs for platforms with no Platform row are claimed (and failed) without a quota
+        jobs = await anyio.to_thread.run_sync(claim_jobs, self.worker_id, room, quotas, room)
+        loop = asyncio.get_running_loop()
+        for job in jobs:
+            self.outstanding += 1
+            self.stats["claimed"] += 1
+            delay = self.buckets[job.platform].reserve() if job.platform in self.buckets else 0.0
+            if delay > 0:
+                self.stats["rate_limited"] += 1
+                loop.call_later(delay, self._ready.put_nowait, job)
+            else:
+                self._ready.put_nowait(job)
+        return len(jobs), room
+
+    async def worker(self):
+        while True:
+            job = await self._ready.get()
+            request = PublishRequest(job_id=job.id, post_id=job.post_id, platform=job.platform, text=job.text,
+                                     media_url=job.media_url, idempotency_key=f"publishjob-{job.id}")
+            try:
+                result = await asyncio.wait_for(self.adapters.for_platform(job.platform).publish(request), PUBLISH_TIMEOUT)
+                outcome = Outcome(job, result=result)
+            except asyncio.TimeoutError:
+                outcome = Outcome(job, error=PublishError(f"Publish timed out after {PUBLISH_TIMEOUT:g}s", retryable=True))
+            except PublishError as e:
+                outcome = Outcome(job, error=e)
+            except Exception as e:
+                # A bug in an adapter shouldn't kill the worker; retry like a transient failure
+                outcome = Outcome(job, error=PublishError(f"Adapter error: {e!r}", retryable=True))
+            self._outcomes.put_nowait(outcome)
+            self._ready.task_done()
+
+    async def writer(self):
+        while True:
+            outcomes = [await self._outcomes.get()]
+            while len(outcomes) < FLUSH_SIZE and not self._outcomes.empty():
+                outcomes.append(self._outcomes.get_nowait())
+            try:
+                await anyio.to_thread.run_sync(record_outcomes, self.worker_id, outcomes)
+            except Exception as e:
+                # Unrecorded jobs stay Running and are retried when their lease expires
+                print(f"⚠️  Could not record {len(outcomes)} publish outcomes: {e!r}")
+            for o in outcomes:
+                self.outstanding -= 1
+                if o.result is not None:
+                    self.stats["published"] += 1
+                    self.published_by_platform[o.job.platform] += 1
+                elif o.error.retryable and o.job.attempts < o.job.max_attempts:
+                    self.stats["retried"] += 1
+                else:
+                    self.stats["failed"] += 1
+                self._outcomes.task_done()
+            self._freed.set()
+
+    async def sleep(self, stop: asyncio.Event, *wake: asyncio.Event):
+        """Wait up to a poll interval, or until stop or any `wake` event is set."""
+        waiters = [asyncio.create_task(event.wait()) for event in (stop, *wake)]
+        await asyncio.wait(waiters, timeout=PUBLISH_POLL_INTERVAL, return_when=asyncio.FIRST_COMPLETED)
+        for waiter in waiters:
+            waiter.cancel()
+
+    async def run(self, stop: Optional[asyncio.Event] = None, drain: bool = False):
+        """Poll and publish until `stop` is set (or, with drain, until no Queued/Running jobs remain)."""
+        stop = stop or asyncio.Event()
+        self._ready, self._outcomes, self._freed = asyncio.Queue(), asyncio.Queue(), asyncio.Event()
+        self.started_at = time.monotonic()
+        tasks = [asyncio.create_task(self.worker()) for _ in range(self.workers)] + [asyncio.create_task(self.writer())]
+        print(f"📬 Publishing scheduler {self.worker_id}: {self.workers} workers")
+        try:
+            while not stop.is_set():
+                self._freed.clear()
+                claimed, room = await self.claim()
+                if drain and not claimed and not self.outstanding and not await anyio.to_thread.run_sync(pending_jobs):
+                    break
+                if room <= 0:
+                    await self.sleep(stop, self._freed) # Workers are saturated: claim again as outcomes come in
+                elif claimed < room:
+                    await self.sleep(stop) # Caught up (or rate limited): poll
+            # Finish what was claimed; anything left keeps its lease and is picked up later
+            deadline = time.monotonic() + PUBLISH_TIMEOUT
+            while self.outstanding and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.adapters.close()
+
+    def metrics(self) -> dict:
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0
+        return {
+            "worker_id": self.worker_id,
+            "workers": self.workers,
+            **{key: self.stats[key] for key in ("claimed", "published", "retried", "failed", "rate_limited")},
+            "outstanding": self.outstanding,
+            "published_per_second": round(self.stats["published"] / elapsed, 2) if elapsed else 0.0,
+            "published_by_platform": dict(self.published_by_platform),
+        }
+
+_scheduler: Optional[Scheduler] = None
+_stop: Optional[asyncio.Event] = None
+_task: Optional[asyncio.Task] = None
+
+def start():
+    """Start the scheduler on the running loop if PUBLISH_SCHEDULER is set."""
+    global _scheduler, _stop, _task
+    if PUBLISH_SCHEDULER and _task is None:
+        _scheduler, _stop = Scheduler(), asyncio.Event()
+        _task = asyncio.create_task(_scheduler.run(_stop))
+
+async def stop():
+    global _task
+    if _task is not None:
+        _stop.set()
+        await _task
+        _task = None
+
+# --- SCHEDULING ---
+
+def schedule_jobs(session: Session, rows: List[dict]) -> int:
+    """Upsert jobs from dicts with post_id, platform_slug, scheduled_at, max_attempts. Does not commit.
+
+    Existing Queued, Failed or Cancelled jobs for the same post and platform
+    are rescheduled; Running and Published ones are left alone.
+    """
+    if not rows:
+        return 0
+    now = datetime.utcnow()
+    values = [{"status": PublishStatus.QUEUED.value, "attempts": 0, "created_at": now, **row} for row in rows]
+    stmt = (sqlite_insert if IS_SQLITE else pg_insert)(job_table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["post_id", "platform_slug"],
+        set_={"scheduled_at": stmt.excluded.scheduled_at, "max_attempts": stmt.excluded.max_attempts,
+              "status": PublishStatus.QUEUED.value, "attempts": 0, "last_error": None, "finished_at": None},
+        # Spelled out: expanding IN parameters can't be used with executemany
+        where=or_(*(job_table.c.status == status.value for status in (PublishStatus.QUEUED, PublishStatus.FAILED, PublishStatus.CANCELLED))),
+    )
+    return session.execute(stmt, values).rowcount
+
+# --- MODELS ---
+class ScheduleRequest(BaseModel):
+    scheduled_at: Optional[datetime] = None # UTC; default now
+    platforms: Optional[List[str]] = None # Default: the post's target_platforms
+    max_attempts: int = PUBLISH_MAX_ATTEMPTS
+
+class CampaignScheduleRequest(ScheduleRequest):
+    spread_seconds: float = 0 # Stagger the posts evenly over this window, in post id order
+    include_posted: bool = False
+
+class CampaignScheduleResponse(BaseModel):
+    campaign_id: int
+    posts: int
+    jobs: int
+
+# --- ROUTER ---
+router = APIRouter()
+
+def naive_utc(value: Optional[datetime]) -> datetime:
+    # Jobs are stored as naive UTC, like every other timestamp in the models
+    if value is None:
+        return datetime.utcnow()
+    return (value - value.utcoffset()).replace(tzinfo=None) if value.tzinfo else value
+
+@router.post("/api/posts/{post_id}/schedule", response_model=List[PublishJob])
+@async_db
+def schedule_post(post_id: int, request: ScheduleRequest, session: Session = Depends(get_session)):
+    """Queue the post for publishing on each platform at scheduled_at."""
+    post = session.get(CampaignPost, post_id)
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+    platforms = list(dict.fromkeys(request.platforms if request.platforms is not None else post.target_platforms or []))
+    if not platforms:
+        raise HTTPException(status_code=400, detail="Post has no target platforms")
+    at = naive_utc(request.scheduled_at)
+    schedule_jobs(session, [{"post_id": post_id, "platform_slug": slug, "scheduled_at": at, "max_attempts": request.max_attempts}
+                            for slug in platforms])
+    session.commit()
+    return session.exec(select(PublishJob).where(PublishJob.post_id == post_id, PublishJob.platform_slug.in_(platforms))
+                        .order_by(PublishJob.id)).all()
+
+@router.post("/api/campaigns/{campaign_id}/schedule", response_model=CampaignScheduleResponse)
+@async_db
+def schedule_campaign(campaign_id: int, request: CampaignScheduleRequest, session: Session = Depends(get_session)):
+    """Queue every post of a campaign, optionally staggered over spread_seconds."""
+    if not session.get(Campaign, campaign_id):
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    query = select(CampaignPost.id, CampaignPost.target_platforms).where(CampaignPost.campaign_id == campaign_id)
+    if not request.include_posted:
+        query = query.where(or_(CampaignPost.status.is_(None), CampaignPost.status != PostStatus.POSTED.value))
+    posts = session.execute(query.order_by(CampaignPost.id)).all()
+    start_at = naive_utc(request.scheduled_at)
+    step = request.spread_seconds / len(posts) if posts else 0
+    rows = [
+        {"post_id": post_id, "platform_slug": slug, "scheduled_at": start_at + timedelta(seconds=i * step),
+         "max_attempts": request.max_attempts}
+        for i, (post_id, targets) in enumerate(posts)
+        for slug in dict.fromkeys(request.platforms if request.platforms is not None else targets or [])
+    ]
+    schedule_jobs(session, rows)
+    session.commit()
+    return CampaignScheduleResponse(campaign_id=campaign_id, posts=len(posts), jobs=len(rows))
+
+@router.get("/api/publish/jobs", response_model=List[PublishJob])
+@async_db
+def list_jobs(
+    status: Optional[PublishStatus] = None,
+    post_id: Optional[int] = None,
+    platform: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    session: Session = Depends(get_session),
+):
+    query = select(PublishJob)
+    if status is not None:
+        query = query.where(PublishJob.status == status.value)
+    if post_id is not None:
+        query = query.where(PublishJob.post_id == post_id)
+    if platform:
+        query = query.where(PublishJob.platform_slug == platform)
+    return session.exec(query.order_by(PublishJob.scheduled_at, PublishJob.id).limit(limit)).all()
+
+def set_job_status(session: Session, job_id: int, allowed: List[PublishStatus], **values) -> PublishJob:
+    job = session.get(PublishJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    # Conditional update, so a scheduler claiming the job concurrently wins cleanly
+    changed = session.execute(update(job_table).where(
+        job_table.c.id == job_id, job_table.c.status.in_([s.value for s in allowed])
+    ).values(**values)).rowcount
+    if not changed:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    session.commit()
+    session.refresh(job)
+    return job
+
+@router.post("/api/publish/jobs/{job_id}/cancel", response_model=PublishJob)
+@async_db
+def cancel_job(job_id: int, session: Session = Depends(get_session)):
+    return set_job_status(session, job_id, [PublishStatus.QUEUED], status=PublishStatus.CANCELLED.value, finished_at=datetime.utcnow())
+
+@router.post("/api/publish/jobs/{job_id}/retry", response_model=PublishJob)
+@async_db
+def retry_job(job_id: int, session: Session = Depends(get_session)):
+    return set_job_status(session, job_id, [PublishStatus.FAILED, PublishStatus.CANCELLED], status=PublishStatus.QUEUED.value,
+                          scheduled_at=datetime.utcnow(), attempts=0, last_error=None, finished_at=None)
+
+@router.get("/api/publish/stats")
+@async_db
+def read_publish_stats(session: Session = Depends(get_session)):
+    """Jobs by status and platform, plus this process's scheduler metrics when it runs one."""
+    rows = session.execute(
+        select(job_table.c.platform_slug, job_table.c.status, func.count()).group_by(job_table.c.platform_slug, job_table.c.status)
+    ).all()
+    by_status: Counter = Counter()
+    by_platform: Dict[str, Dict[str, int]] = {}
+    for slug, status, count in rows:
+        by_status[status] += count
+        by_platform.setdefault(slug, {})[status] = count
+    next_due = session.execute(select(func.min(job_table.c.scheduled_at)).where(job_table.c.status == PublishStatus.QUEUED.value)).scalar()
+    return {
+        "jobs": dict(by_status),
+        "platforms": by_platform,
+        "next_due": next_due,
+        "scheduler": _scheduler.metrics() if _scheduler is not None else None,
+    }
+
+# --- CLI ---
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the publishing scheduler.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run", help="Poll and publish due jobs")
+    run.add_argument("--workers", type=int, default=PUBLISH_WORKERS)
+    run.add_argument("--batch", type=int, default=PUBLISH_BATCH)
+    run.add_argument("--drain", action="store_true", help="Exit once no Queued or Running jobs remain")
+    args = parser.parse_args()
+
+    scheduler = Scheduler(workers=args.workers, batch=args.batch)
+    try:
+        asyncio.run(scheduler.run(drain=args.drain))
+    except KeyboardInterrupt:
+        pass
+    print(f"✅ {scheduler.metrics()}")
+
+if __name__ == "__main__":
+    main()
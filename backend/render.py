@@ -0,0 +1,217 @@
+"""
+Server-side rendering of posts into the final text for each platform.
+
+A post renders as hook_text + closing_hook + the platform's post_suffix and
+default_hashtags (see platform_fit.post_body/platform_tail), counted in the
+platform's length scheme and truncated with "…" to its char_limit. When the
+text is too long the body is cut (at a word boundary, never inside a URL) and
+the suffix/hashtags are kept; only if those alone don't fit is the whole text
+cut.
+
+Rendered text is memoized in renderedpost, keyed on a post version (hash of
+the rendered post fields) and a platform version (hash of slug, char_limit,
+suffix and hashtags). A render reuses every cell whose versions still match,
+so after one platform's suffix changes, re-rendering a campaign recomputes
+that platform's column only; after a post edit, only that post's row. Stale
+cells are measured together in one FitMatrix and written back with an upsert.
+"""
+import hashlib
+from typing import Dict, List, Optional, Sequence, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from sqlmodel import Session, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from .database import IS_SQLITE, async_db, get_session
+from .models import Campaign, CampaignPost, Platform, RenderedPost
+from .responses import FAST_JSON, FastJSONResponse
+from .platform_fit import ELLIPSIS, SEPARATOR, FitMatrix, platform_tail, post_body, scheme_for, text_lengths, truncation_points
+
+RENDER_VERSION = "1" # Bump when the rendering rules change, to retire every memoized cell
+
+# --- VERSIONS ---
+
+def version_hash(*parts) -> str:
+    return hashlib.sha1("\0".join([RENDER_VERSION, *map(str, parts)]).encode("utf-8")).hexdigest()
+
+def post_version(hook_text: Optional[str], closing_hook: Optional[str]) -> str:
+    return version_hash(hook_text or "", closing_hook or "")
+
+def platform_version(platform: Platform) -> str:
+    return version_hash(platform.slug, platform.char_limit, platform.post_suffix or "", platform.default_hashtags or "")
+
+# --- RENDERING ---
+
+def compose(body: str, tail: str) -> str:
+    return SEPARATOR.join(part for part in (body, tail) if part)
+
+def render_cells(bodies: Sequence[str], platforms: Sequence[Platform], cells: Sequence[Tuple[int, int]]) -> List[Tuple[str, int, bool]]:
+    """(text, length, truncated) for each (body index, platform index) cell."""
+    if not cells:
+        return []
+    rows = sorted({row for row, _ in cells})
+    cols = sorted({col for _, col in cells})
+    row_at = {row: i for i, row in enumerate(rows)}
+    col_at = {col: j for j, col in enumerate(cols)}
+    # Only the bodies and platforms that have a stale cell are measured
+    matrix = FitMatrix([bodies[row] for row in rows], [None] * len(rows), [platforms[col] for col in cols], all_platforms=True)
+    tails = [platform_tail(platforms[col].post_suffix, platforms[col].default_hashtags) for col in cols]
+
+    results: List[Optional[Tuple[str, int, bool]]] = [None] * len(cells)
+    over = [] # (cell index, matrix row, matrix col) of the cells that need cutting
+    for index, (row, col) in enumerate(cells):
+        i, j = row_at[row], col_at[col]
+        if matrix.over[i, j]:
+            over.append((index, i, j))
+        else:
+            results[index] = (compose(bodies[row], tails[j]), int(matrix.lengths[i, j]), False)
+
+    cut_texts: Dict[str, List[Tuple[int, str]]] = {} # scheme -> [(cell index, truncated text)]
+    fallback: Dict[str, List[Tuple[int, str, int]]] = {} # scheme -> [(cell index, full text, limit)]
+    cuts = matrix.suggest_cuts([i for _, i, _ in over], [j for _, _, j in over])
+    for (index, i, j), cut in zip(over, cuts):
+        body, tail = matrix.bodies[i], tails[j]
+        scheme = scheme_for(matrix.platforms[j].slug)
+        if body and cut is not None:
+            cut_texts.setdefault(scheme, []).append((index, compose(body[:cut].rstrip() + ELLIPSIS, tail)))
+        else:
+            # The suffix and hashtags alone are over the limit: cut the whole text
+            fallback.setdefault(scheme, []).append((index, compose(body, tail), int(matrix.limits[j])))
+    for scheme, entries in fallback.items():
+        points = truncation_points([text for _, text, _ in entries], [limit for _, _, limit in entries], scheme)
+        for (index, text, _), cut in zip(entries, points):
+            cut_texts.setdefault(scheme, []).append((index, text[:cut].rstrip() + ELLIPSIS if cut is not None else ""))
+
+    # Truncated texts are re-measured in one pass per scheme
+    for scheme, entries in cut_texts.items():
+        lengths = text_lengths([text for _, text in entries], [scheme])[scheme]
+        for (index, text), length in zip(entries, lengths.tolist()):
+            results[index] = (text, length, True)
+    return results
+
+def render_posts(session: Session, posts: Sequence[Tuple[int, Optional[str], Optional[str]]], platforms: Sequence[Platform],
+                 cells: Sequence[Tuple[int, int]]) -> Tuple[List[Tuple[str, int, bool, bool]], int]:
+    """Render (post index, platform index) cells of (id, hook_text, closing_hook) posts through the memo table.
+
+    Returns ((text, length, truncated, reused) per cell, cells rendered) and
+    upserts the newly rendered cells. Does not commit.
+    """
+    post_versions = [post_version(hook, closing) for _, hook, closing in posts]
+    platform_versions = [platform_version(p) for p in platforms]
+    platform_ids = [p.id for p in platforms]
+    memo: Dict[Tuple[int, int], tuple] = {}
+    post_ids = sorted({posts[row][0] for row, _ in cells})
+    if post_ids:
+        # Plain column tuples: a campaign render can read tens of thousands of memo rows
+        for post_id, platform_id, *memoized in session.execute(select(
+            RenderedPost.post_id, RenderedPost.platform_id, RenderedPost.post_version, RenderedPost.platform_version,
+            RenderedPost.text, RenderedPost.length, RenderedPost.truncated,
+        ).where(RenderedPost.post_id.in_(post_ids), RenderedPost.platform_id.in_(sorted({platform_ids[col] for _, col in cells})))):
+            memo[post_id, platform_id] = memoized
+
+    results: List[Optional[Tuple[str, int, bool, bool]]] = [None] * len(cells)
+    stale = []
+    for index, (row, col) in enumerate(cells):
+        hit = memo.get((posts[row][0], platform_ids[col]))
+        if hit is not None and hit[0] == post_versions[row] and hit[1] == platform_versions[col]:
+            results[index] = (hit[2], hit[3], hit[4], True)
+        else:
+            stale.append(index)
+
+    if stale:
+        bodies = [post_body(hook, closing) for _, hook, closing in posts]
+        rendered = render_cells(bodies, platforms, [cells[index] for index in stale])
+        values = []
+        for index, (text, length, truncated) in zip(stale, rendered):
+            row, col = cells[index]
+            results[index] = (text, length, truncated, False)
+            values.append({"post_id": posts[row][0], "platform_id": platform_ids[col], "post_version": post_versions[row],
+                           "platform_version": platform_versions[col], "text": text, "length": length, "truncated": truncated})
+        table = RenderedPost.__table__
+        stmt = (sqlite_insert if IS_SQLITE else pg_insert)(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["post_id", "platform_id"],
+            set_={column: stmt.excluded[column] for column in ("post_version", "platform_version", "text", "length", "truncated")},
+        )
+        session.execute(stmt, values)
+    return results, len(stale)
+
+# --- MODELS ---
+class RenderedText(BaseModel):
+    post_id: int
+    platform: str
+    text: str
+    length: int
+    limit: int
+    truncated: bool
+    cached: bool
+
+class CampaignRender(BaseModel):
+    campaign_id: int
+    posts: int
+    rendered: int # Cells rendered by this request; the rest came from the memo table
+    reused: int
+    renders: List[RenderedText]
+
+# --- ROUTER ---
+router = APIRouter()
+
+@router.get("/api/posts/{post_id}/render", response_model=RenderedText)
+@async_db
+def render_post(post_id: int, platform: str, session: Session = Depends(get_session)):
+    """The post exactly as it would be published on one platform."""
+    post = session.get(CampaignPost, post_id)
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+    platform_row = session.exec(select(Platform).where(Platform.slug == platform)).first()
+    if not platform_row:
+        raise HTTPException(status_code=404, detail="Platform not found")
+
+    slug, char_limit = platform_row.slug, platform_row.char_limit
+    results, rendered = render_posts(session, [(post_id, post.hook_text, post.closing_hook)], [platform_row], [(0, 0)])
+    if rendered:
+        session.commit()
+    text, length, truncated, reused = results[0]
+    return RenderedText(post_id=post_id, platform=slug, text=text, length=length, limit=char_limit,
+                        truncated=truncated, cached=reused)
+
+@router.get("/api/campaigns/{campaign_id}/render", response_model=CampaignRender)
+@async_db
+def render_campaign(
+    campaign_id: int,
+    platforms: Optional[str] = Query(None, description="Comma-separated platform slugs (default: all active)"),
+    all_platforms: bool = Query(False, description="Render every platform, not just each post's target_platforms"),
+    session: Session = Depends(get_session),
+):
+    """Every post of a campaign rendered for its platforms, ordered by post id then platform."""
+    if not session.get(Campaign, campaign_id):
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    query = select(Platform).where(Platform.is_active == True).order_by(Platform.id)
+    if platforms:
+        query = select(Platform).where(Platform.slug.in_([s.strip() for s in platforms.split(",") if s.strip()])).order_by(Platform.id)
+    platform_rows = session.exec(query).all()
+    column = {p.slug: col for col, p in enumerate(platform_rows)}
+
+    rows = session.execute(
+        select(CampaignPost.id, CampaignPost.hook_text, CampaignPost.closing_hook, CampaignPost.target_platforms)
+        .where(CampaignPost.campaign_id == campaign_id).order_by(CampaignPost.id)
+    ).all()
+    cells = []
+    for row, (_, _, _, targets) in enumerate(rows):
+        if all_platforms:
+            cells.extend((row, col) for col in range(len(platform_rows)))
+        else:
+            cells.extend(sorted((row, column[slug]) for slug in set(targets or ()) if slug in column))
+
+    slugs, limits = [p.slug for p in platform_rows], [p.char_limit for p in platform_rows] # Read before commit expires them
+    results, rendered = render_posts(session, [tuple(row[:3]) for row in rows], platform_rows, cells)
+    if rendered:
+        session.commit()
+    renders = [
+        {"post_id": rows[row][0], "platform": slugs[col], "text": text, "length": length, "limit": limits[col],
+         "truncated": truncated, "cached": reused}
+        for (row, col), (text, length, truncated, reused) in zip(cells, results)
+    ]
+    report = {"campaign_id": campaign_id, "posts": len(rows), "rendered": rendered, "reused": len(cells) - rendered, "renders": renders}
+    return FastJSONResponse(report) if FAST_JSON else report
@@ -0,0 +1,196 @@
+"""
+Full-text search over posts (title, hook_text, closing_hook, meme_detail_expl).
+
+Postgres: a stored generated tsvector column with a GIN index; the database
+recomputes it on every INSERT/UPDATE/COPY, so ORM writes, bulk endpoints and
+the importer need no extra code. SQLite: an external-content FTS5 table kept
+in sync by triggers. Both are created idempotently on startup by
+ensure_search_index(). If FTS5 is unavailable, search degrades to LIKE.
+
+Query syntax: words are ANDed, the last one is prefix-matched ("spring camp"
+finds "spring campaign"), "quoted phrases" must appear in order.
+
+Ranking cost grows with the number of matches, so very broad queries rank
+only the newest SEARCH_RANK_WINDOW matching posts (cheap to find via the
+index) instead of every match.
+"""
+import os
+import re
+from typing import List, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlmodel import Session, select
+from sqlalchemy import text
+
+from .database import IS_SQLITE, async_db, engine, get_session
+from .models import CampaignPost
+
+SEARCH_LANGUAGE = os.getenv("SEARCH_LANGUAGE", "english") # Postgres text search config
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 200
+MAX_QUERY_TERMS = 16
+SEARCH_RANK_WINDOW = int(os.getenv("SEARCH_RANK_WINDOW", "10000"))
+
+SEARCH_COLUMNS = ("title", "hook_text", "closing_hook", "meme_detail_expl")
+# Relative weights: a hit in the title outranks one in the body
+WEIGHTS = {"title": ("A", 10.0), "hook_text": ("B", 5.0), "closing_hook": ("C", 2.0), "meme_detail_expl": ("D", 1.0)}
+
+_fts_available = True # Flipped off if this SQLite build lacks FTS5
+
+# --- INDEX DDL ---
+
+def postgres_ddl() -> List[str]:
+    vector = " || ".join(
+        f"setweight(to_tsvector('{SEARCH_LANGUAGE}', coalesce({column}, '')), '{WEIGHTS[column][0]}')"
+        for column in SEARCH_COLUMNS
+    )
+    return [
+        f"ALTER TABLE campaignpost ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ({vector}) STORED",
+        "CREATE INDEX IF NOT EXISTS ix_campaignpost_search_vector ON campaignpost USING GIN (search_vector)",
+    ]
+
+def sqlite_ddl() -> List[str]:
+    columns = ", ".join(SEARCH_COLUMNS)
+    new_values = ", ".join(f"new.{c}" for c in SEARCH_COLUMNS)
+    old_values = ", ".join(f"old.{c}" for c in SEARCH_COLUMNS)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS campaignpost_fts USING fts5({columns}, content='campaignpost', "
+        "content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"""CREATE TRIGGER IF NOT EXISTS campaignpost_fts_ai AFTER INSERT ON campaignpost BEGIN
+            INSERT INTO campaignpost_fts(rowid, {columns}) VALUES (new.id, {new_values});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS campaignpost_fts_ad AFTER DELETE ON campaignpost BEGIN
+            INSERT INTO campaignpost_fts(campaignpost_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS campaignpost_fts_au AFTER UPDATE OF {columns} ON campaignpost BEGIN
+            INSERT INTO campaignpost_fts(campaignpost_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+            INSERT INTO campaignpost_fts(rowid, {columns}) VALUES (new.id, {new_values});
+        END""",
+    ]
+
+def ensure_search_index():
+    global _fts_available
+    with engine.begin() as conn:
+        if not IS_SQLITE:
+            for statement in postgres_ddl():
+                conn.execute(text(statement))
+            return
+        created = conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'campaignpost_fts'")).first() is None
+        try:
+            for statement in sqlite_ddl():
+                conn.execute(text(statement))
+        except Exception as e:
+            _fts_available = False
+            print(f"⚠️  FTS5 unavailable, /api/posts/search will use LIKE: {e}")
+            return
+        if created:
+            # Index posts that existed before the triggers
+            conn.execute(text("INSERT INTO campaignpost_fts(campaignpost_fts) VALUES ('rebuild')"))
+            print("✅ Post search index built")
+
+# --- QUERY PARSING ---
+
+def parse_query(q: str) -> Tuple[List[str], List[List[str]]]:
+    """Split into prefix terms and quoted phrases, keeping only word characters."""
+    phrases = [re.findall(r"\w+", phrase) for phrase in re.findall(r'"([^"]*)"', q)]
+    terms = re.findall(r"\w+", re.sub(r'"[^"]*"', " ", q))
+    phrases = [p for p in phrases if p]
+    if len(terms) + sum(len(p) for p in phrases) > MAX_QUERY_TERMS:
+        raise HTTPException(status_code=400, detail=f"Search queries are limited to {MAX_QUERY_TERMS} words")
+    return terms, phrases
+
+# Only the last word is a prefix (the one still being typed); exact earlier words keep matches narrow
+
+def tsquery(terms: List[str], phrases: List[List[str]]) -> str:
+    parts = terms[:-1] + [f"{term}:*" for term in terms[-1:]] + [" <-> ".join(phrase) for phrase in phrases]
+    return " & ".join(parts)
+
+def fts5_query(terms: List[str], phrases: List[List[str]]) -> str:
+    parts = [f'"{term}"' for term in terms[:-1]] + [f'"{term}"*' for term in terms[-1:]]
+    parts += ['"' + " ".join(phrase) + '"' for phrase in phrases]
+    return " AND ".join(parts)
+
+# --- SEARCH ---
+
+def filter_sql(mode: Optional[str], campaign_id: Optional[int], status: Optional[str]) -> Tuple[str, dict]:
+    clauses, params = [], {}
+    if mode:
+        clauses.append("p.mode = :mode")
+        params["mode"] = mode
+    if campaign_id is not None:
+        clauses.append("p.campaign_id = :campaign_id")
+        params["campaign_id"] = campaign_id
+    if status:
+        clauses.append("p.status = :status")
+        params["status"] = status
+    return "".join(f" AND {clause}" for clause in clauses), params
+
+def search_ids(session: Session, q: str, mode: Optional[str] = None, campaign_id: Optional[int] = None,
+               status: Optional[str] = None, limit: int = SEARCH_PAGE_SIZE, offset: int = 0) -> List[int]:
+    """Post ids matching q, best match first."""
+    terms, phrases = parse_query(q)
+    if not terms and not phrases:
+        return []
+    filters, params = filter_sql(mode, campaign_id, status)
+    params.update(limit=limit, offset=offset, window=SEARCH_RANK_WINDOW)
+
+    if not IS_SQLITE:
+        params["query"] = tsquery(terms, phrases)
+        sql = f"""
+            SELECT id FROM (
+                SELECT p.id, ts_rank_cd(p.search_vector, query) AS score
+                FROM campaignpost p, to_tsquery('{SEARCH_LANGUAGE}', :query) AS query
+                WHERE p.search_vector @@ query{filters}
+                ORDER BY p.id DESC LIMIT :window
+            ) matches
+            ORDER BY score DESC, id LIMIT :limit OFFSET :offset"""
+    elif _fts_available:
+        params["query"] = fts5_query(terms, phrases)
+        weights = ", ".join(str(WEIGHTS[c][1]) for c in SEARCH_COLUMNS)
+        join = " JOIN campaignpost p ON p.id = campaignpost_fts.rowid" if filters else "" # Only filters need post columns
+        sql = f"""
+            SELECT id FROM (
+                SELECT campaignpost_fts.rowid AS id, bm25(campaignpost_fts, {weights}) AS score
+                FROM campaignpost_fts{join}
+                WHERE campaignpost_fts MATCH :query{filters}
+                ORDER BY campaignpost_fts.rowid DESC LIMIT :window -- Walk the FTS index, not the post table
+            ) matches
+            ORDER BY score, id LIMIT :limit OFFSET :offset"""
+    else:
+        # Unranked fallback: every word (or phrase) must appear in some column
+        needles = terms + [" ".join(phrase) for phrase in phrases]
+        matches = []
+        for i, needle in enumerate(needles):
+            params[f"needle{i}"] = f"%{needle}%"
+            matches.append("(" + " OR ".join(f"p.{c} LIKE :needle{i}" for c in SEARCH_COLUMNS) + ")")
+        sql = f"""
+            SELECT p.id FROM campaignpost p
+            WHERE {" AND ".join(matches)}{filters}
+            ORDER BY p.id LIMIT :limit OFFSET :offset"""
+
+    return [row[0] for row in session.execute(text(sql), params).all()]
+
+# --- ROUTER ---
+router = APIRouter()
+
+@router.get("/api/posts/search", response_model=List[CampaignPost])
+@async_db
+def search_posts(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    mode: Optional[str] = None,
+    campaign_id: Optional[int] = None,
+    status: Optional[str] = None,
+    cursor: Optional[int] = Query(None, ge=0),
+    limit: int = Query(SEARCH_PAGE_SIZE, ge=1, le=SEARCH_MAX_PAGE_SIZE),
+    session: Session = Depends(get_session),
+):
+    # Ranked results page by offset; clients pass X-Next-Cursor back as ?cursor= like /api/posts
+    offset = cursor or 0
+    ids = search_ids(session, q, mode, campaign_id, status, limit=limit + 1, offset=offset)
+    if len(ids) > limit:
+        ids = ids[:limit]
+        response.headers["X-Next-Cursor"] = str(offset + limit)
+    if not ids:
+        return []
+    posts = {post.id: post for post in session.exec(select(CampaignPost).where(CampaignPost.id.in_(ids))).all()}
+    return [posts[post_id] for post_id in ids if post_id in posts]
@@ -0,0 +1,91 @@
+"""
+StaticFiles for media: long-lived caching, strong ETags and precompressed sidecars.
+
+Uploads are immutable (content-hash or UUID filenames), so they are served with
+`Cache-Control: immutable` and an ETag derived from the name. Byte ranges are
+handled by Starlette's FileResponse, which hands the file to the server for
+sendfile when it supports `http.response.pathsend`. Behind nginx, set
+MEDIA_ACCEL_REDIRECT_PREFIX to let nginx serve the bytes (sendfile + ranges)
+via X-Accel-Redirect.
+"""
+import mimetypes
+import os
+import re
+from typing import Optional, Tuple
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+IMMUTABLE_MAX_AGE = 31536000 # One year
+DEFAULT_MAX_AGE = int(os.getenv("MEDIA_DEFAULT_MAX_AGE", "3600"))
+ACCEL_REDIRECT_PREFIX = os.getenv("MEDIA_ACCEL_REDIRECT_PREFIX", "") # e.g. "/_protected_static/"
+
+# <sha256>.<ext>, <sha256>-<variant>.<ext> or <uuid4>.<ext>
+IMMUTABLE_NAME = re.compile(r"^(?P<stem>[0-9a-f]{64}(-[a-z0-9_]+)?|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})\.[a-z0-9]+$")
+
+# Sidecar suffix per content-coding, in server preference order
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+class MediaFileResponse(FileResponse):
+    chunk_size = 256 * 1024 # Larger reads for video scrubbing
+
+def accepted_encodings(request_headers: Headers) -> set:
+    encodings = set()
+    for part in request_headers.get("accept-encoding", "").split(","):
+        name, *params = [p.strip() for p in part.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if name and quality > 0:
+            encodings.add(name.lower())
+    return encodings
+
+class MediaFiles(StaticFiles):
+    def precompressed(self, full_path: str, request_headers: Headers) -> Tuple[Optional[str], str, Optional[os.stat_result]]:
+        accepted = accepted_encodings(request_headers)
+        for encoding, suffix in PRECOMPRESSED:
+            if encoding in accepted:
+                try:
+                    return encoding, full_path + suffix, os.stat(full_path + suffix)
+                except FileNotFoundError:
+                    continue
+        return None, full_path, None
+
+    def cache_headers(self, full_path: str, encoding: Optional[str]) -> dict:
+        match = IMMUTABLE_NAME.match(os.path.basename(full_path))
+        headers = {"vary": "Accept-Encoding"}
+        if match:
+            headers["cache-control"] = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+            # The name never points at different bytes, so it is a strong validator
+            stem = match.group("stem")
+            headers["etag"] = f'"{stem}-{encoding}"' if encoding else f'"{stem}"'
+        else:
+            headers["cache-control"] = f"public, max-age={DEFAULT_MAX_AGE}"
+        return headers
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        full_path = str(full_path)
+        encoding, served_path, served_stat = self.precompressed(full_path, request_headers)
+        media_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+
+        response = MediaFileResponse(served_path, status_code=status_code, stat_result=served_stat or stat_result, media_type=media_type)
+        for key, value in self.cache_headers(full_path, encoding).items():
+            response.headers[key] = value
+        if encoding:
+            response.headers["content-encoding"] = encoding
+
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+
+        if ACCEL_REDIRECT_PREFIX and self.directory:
+            # nginx serves the bytes itself (sendfile, ranges); we only supply headers
+            relative = os.path.relpath(served_path, self.directory).replace(os.sep, "/")
+            headers = {k: v for k, v in response.headers.items() if k not in ("content-length", "accept-ranges")}
+            headers["x-accel-redirect"] = ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + relative
+            return Response(status_code=status_code, headers=headers)
+        return response
@@ -0,0 +1,231 @@
+"""
+Media storage: streaming, size-bounded, content-addressed uploads.
+
+Files are stored under the SHA-256 of their bytes, so uploading the same image
+twice stores it once. The backend is chosen with STORAGE_BACKEND:
+    local    backend/static/uploads, served by the /static mount (default)
+    s3       S3-compatible object store (needs boto3; STORAGE_BUCKET, STORAGE_PUBLIC_URL)
+    fake-s3  local stand-in for the object store (STORAGE_FAKE_DIR)
+
+UploadLimitMiddleware rejects oversized upload requests before their body is
+parsed, so a too-large upload never gets spooled in full.
+"""
+import hashlib
+import os
+import re
+import shutil
+import uuid
+from typing import AsyncIterator, Optional, Tuple
+import anyio
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# Ensure directory exists
+UPLOAD_DIR = "backend/static/uploads"
+TMP_DIR = os.path.join(UPLOAD_DIR, ".tmp") # Same filesystem as UPLOAD_DIR, so moves are atomic renames
+os.makedirs(TMP_DIR, exist_ok=True)
+
+CHUNK_SIZE = 1024 * 1024
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+MULTIPART_OVERHEAD = 64 * 1024 # Boundaries and part headers around the file in a multipart body
+
+# Helper to get base URL
+def get_base_url():
+    # In production, this should be set to the backend URL (e.g. https://api.campaignstudio.com)
+    # If not set, it falls back to localhost for development
+    return os.getenv("API_BASE_URL", "http://localhost:8001")
+
+def clean_extension(ext: Optional[str], default: str = "bin") -> str:
+    ext = (ext or "").lower().lstrip(".")
+    return ext if re.fullmatch(r"[a-z0-9]{1,8}", ext) else default
+
+def is_storage_key(key: str) -> bool:
+    # Keys this app writes: <sha256>.<ext> (see store_stream)
+    return re.fullmatch(r"[0-9a-f]{64}\.[a-z0-9]{1,8}", key) is not None
+
+# --- BACKENDS ---
+
+class StorageBackend:
+    """Where content-addressed media lives. Methods are blocking; callers run them in a thread."""
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def put_file(self, path: str, key: str):
+        """Store the finished temp file at `path` under `key` (the temp file may be consumed)."""
+        raise NotImplementedError
+
+    def url_for(self, key: str) -> str:
+        raise NotImplementedError
+
+    def local_copy(self, key: str) -> Tuple[str, bool]:
+        """Return (path, is_temp) for a local file holding key's bytes; delete it afterwards if is_temp."""
+        raise NotImplementedError
+
+class LocalStorage(StorageBackend):
+    def __init__(self, root: str = UPLOAD_DIR):
+        self.root = root
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def exists(self, key):
+        return os.path.exists(self.path_for(key))
+
+    def put_file(self, path, key):
+        os.replace(path, self.path_for(key))
+
+    def url_for(self, key):
+        return f"{get_base_url()}/static/uploads/{key}"
+
+    def local_copy(self, key):
+        return self.path_for(key), False
+
+class ObjectStorage(StorageBackend):
+    """S3-compatible store; `client` needs boto3's head_object, upload_file and download_file."""
+
+    def __init__(self, client, bucket: str, public_base_url: str, prefix: str = "uploads/"):
+        self.client = client
+        self.bucket = bucket
+        self.public_base_url = public_base_url.rstrip("/")
+        self.prefix = prefix
+
+    def exists(self, key):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.prefix + key)
+            return True
+        except Exception:
+            return False
+
+    def put_file(self, path, key):
+        self.client.upload_file(Filename=path, Bucket=self.bucket, Key=self.prefix + key)
+        os.remove(path)
+
+    def url_for(self, key):
+        return f"{self.public_base_url}/{self.prefix}{key}"
+
+    def local_copy(self, key):
+        path = os.path.join(TMP_DIR, f"{uuid.uuid4()}.part")
+        self.client.download_file(Bucket=self.bucket, Key=self.prefix + key, Filename=path)
+        return path, True
+
+class LocalObjectStore:
+    """Directory-backed stand-in for the boto3 client calls ObjectStorage makes."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, bucket: str, key: str) -> str:
+        return os.path.join(self.root, bucket, key)
+
+    def head_object(self, Bucket, Key):
+        path = self._path(Bucket, Key)
+        if not os.path.exists(path):
+            raise FileNotFoundError(Key)
+        return {"ContentLength": os.path.getsize(path)}
+
+    def upload_file(self, Filename, Bucket, Key):
+        path = self._path(Bucket, Key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        shutil.copyfile(Filename, path)
+
+    def download_file(self, Bucket, Key, Filename):
+        shutil.copyfile(self._path(Bucket, Key), Filename)
+
+def backend_from_env() -> StorageBackend:
+    kind = os.getenv("STORAGE_BACKEND", "local")
+    if kind == "s3":
+        import boto3 # Optional dependency, only needed for a real object store
+        client = boto3.client("s3", endpoint_url=os.getenv("STORAGE_ENDPOINT_URL") or None)
+        return ObjectStorage(client, os.environ["STORAGE_BUCKET"], os.environ["STORAGE_PUBLIC_URL"])
+    if kind == "fake-s3":
+        root = os.getenv("STORAGE_FAKE_DIR", "backend/static/object-store")
+        return ObjectStorage(LocalObjectStore(root), os.getenv("STORAGE_BUCKET", "media"),
+                             os.getenv("STORAGE_PUBLIC_URL", f"{get_base_url()}/static/object-store/media"))
+    return LocalStorage()
+
+storage: StorageBackend = backend_from_env()
+
+# --- STREAMING STORE ---
+
+async def store_stream(chunks: AsyncIterator[bytes], ext: str, max_bytes: int = MAX_UPLOAD_BYTES) -> dict:
+    """Hash and spool chunks to a temp file off the event loop, then store them content-addressed.
+
+    Raises 413 as soon as the stream exceeds max_bytes. If the content already
+    exists the temp file is dropped and the existing URL is returned.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    tmp_path = os.path.join(TMP_DIR, f"{uuid.uuid4()}.part")
+    try:
+        async with await anyio.open_file(tmp_path, "wb") as out:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"File exceeds the {max_bytes} byte limit")
+                digest.update(chunk)
+                await out.write(chunk)
+
+        sha256 = digest.hexdigest()
+        key = f"{sha256}.{ext}"
+        deduplicated = await anyio.to_thread.run_sync(storage.exists, key)
+        if not deduplicated:
+            await anyio.to_thread.run_sync(storage.put_file, tmp_path, key)
+        return {"url": storage.url_for(key), "key": key, "sha256": sha256, "size": size, "deduplicated": deduplicated}
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+async def iter_upload(file, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+    # UploadFile.read runs in the threadpool, so the event loop never blocks on disk
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+# --- REQUEST SIZE LIMIT ---
+
+def too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Request body exceeds the {max_bytes} byte limit")
+
+class UploadLimitMiddleware:
+    """Caps request bodies on upload routes before the multipart parser spools them.
+
+    store_stream's limit applies only once the form is parsed, i.e. after
+    Starlette has already written the whole body to memory or disk. This
+    answers 413 straight away when Content-Length is too big, and otherwise
+    stops reading as soon as the received bytes pass the limit.
+    """
+
+    def __init__(self, app: ASGIApp, paths: Tuple[str, ...] = ("/api/upload",),
+                 max_bytes: int = MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD) -> None:
+        self.app = app
+        self.paths = paths
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        length = Headers(scope=scope).get("content-length", "")
+        if length.isdigit() and int(length) > self.max_bytes:
+            error = too_large(self.max_bytes)
+            await JSONResponse({"detail": error.detail}, status_code=error.status_code)(scope, receive, send)
+            return
+
+        received = 0
+        async def limited_receive():
+            # Chunked bodies have no Content-Length; count what actually arrives
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise too_large(self.max_bytes) # Raised inside form parsing, rendered as a 413 by FastAPI
+            return message
+
+        await self.app(scope, limited_receive, send)
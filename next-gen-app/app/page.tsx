@@ -98,13 +98,21 @@ export default function CampaignDashboard() {
         }
 
         // 2. Fetch All Posts for this Mode (we will filter client-side for now for speed)
-        const res = await fetch(`${API_BASE_URL}/api/posts?mode=${currentMode}`);
-        if (res.ok) {
-          const data = await res.json();
-          setPosts(data);
-        } else {
-          setPosts([]);
-        }
+        // The listing is keyset-paginated: follow X-Next-Cursor until exhausted
+        let allPosts: CampaignPost[] = [];
+        let cursor: string | null = null;
+        let ok = true;
+        do {
+          const cursorParam: string = cursor ? `&cursor=${cursor}` : "";
+          const res = await fetch(`${API_BASE_URL}/api/posts?mode=${currentMode}${cursorParam}`);
+          if (!res.ok) {
+            ok = false;
+            break;
+          }
+          allPosts = allPosts.concat(await res.json());
+          cursor = res.headers.get("X-Next-Cursor");
+        } while (cursor);
+        setPosts(ok ? allPosts : []);
 
         setCurrentIndex(0);
         setPostsLoading(false);
@@ -0,0 +1,90 @@
+"""
+AI batch optimization benchmark against the offline mock LLM.
+
+Starts backend.ai.mock_llm and the API (AI_BACKEND=llm) on throwaway ports,
+then sends the same batch twice: the cold run shows bounded-concurrency
+throughput and retry behaviour, the warm run should be served from cache.
+
+    python tools/bench_ai_batch.py --posts 20 --platforms x,linkedin,facebook --latency 0.5 --failure-rate 0.1
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def start(app: str, port: int, env: dict) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env={**os.environ, **env},
+    )
+
+def wait_ready(url: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=2)
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not become ready")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /api/ai/optimize/batch against the mock LLM.")
+    parser.add_argument("--posts", type=int, default=20)
+    parser.add_argument("--platforms", default="x,linkedin,facebook")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.5, help="Mock LLM seconds per completion")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--api-port", type=int, default=8012)
+    parser.add_argument("--llm-port", type=int, default=8090)
+    args = parser.parse_args()
+
+    llm = start("backend.ai.mock_llm:app", args.llm_port, {
+        "MOCK_LLM_LATENCY": str(args.latency), "MOCK_LLM_FAILURE_RATE": str(args.failure_rate),
+    })
+    api = start("backend.main:app", args.api_port, {
+        "DATABASE_URL": "sqlite:////tmp/bench_ai_batch.db", "SQL_ECHO": "0", "AI_BACKEND": "llm",
+        "AI_LLM_URL": f"http://127.0.0.1:{args.llm_port}", "AI_MAX_CONCURRENCY": str(args.concurrency),
+        "AI_RETRY_BASE_DELAY": "0.1", "CACHE_MAX_ENTRIES": "100000",
+    })
+    base_url = f"http://127.0.0.1:{args.api_port}"
+    try:
+        wait_ready(f"http://127.0.0.1:{args.llm_port}/stats")
+        wait_ready(f"{base_url}/health")
+        platforms = args.platforms.split(",")
+        batch = {
+            "posts": [{"text": f"Post {i}: every great campaign starts with a single post.", "mode": "ebeg"} for i in range(args.posts)],
+            "platforms": platforms,
+            "optimization_type": "professional",
+            "concurrency": args.concurrency,
+        }
+        calls = args.posts * len(platforms)
+        serial = calls * args.latency
+        print(f"🚀 {calls} optimizations, mock latency {args.latency}s (serial would take ~{serial:.1f}s)")
+        print(f"{'run':<8}{'seconds':>10}{'ok':>6}{'failed':>8}{'cached':>8}{'p50 ms':>10}{'p95 ms':>10}")
+        for label in ("cold", "warm"):
+            started = time.perf_counter()
+            results = httpx.post(f"{base_url}/api/ai/optimize/batch", json=batch, timeout=600).json()
+            elapsed = time.perf_counter() - started
+            latencies = sorted(r["latency_ms"] for r in results)
+            ok = sum(r["ok"] for r in results)
+            cached = sum(r["cached"] for r in results)
+            p95 = latencies[int(0.95 * (len(latencies) - 1))]
+            print(f"{label:<8}{elapsed:>10.2f}{ok:>6}{len(results) - ok:>8}{cached:>8}{statistics.median(latencies):>10.1f}{p95:>10.1f}")
+        metrics = httpx.get(f"{base_url}/api/ai/metrics").json()
+        print(f"📦 Engine: {metrics['backend_calls']} backend calls, {metrics['retries']} retries, "
+              f"{metrics['timeouts']} timeouts, hit rate {metrics['cache_hit_rate']:.0%}")
+    finally:
+        for process in (api, llm):
+            process.terminate()
+            process.wait()
+    print("✅ Done")
+
+if __name__ == "__main__":
+    main()
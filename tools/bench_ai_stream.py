@@ -0,0 +1,99 @@
+"""
+Time to first byte for /api/ai/optimize: one-shot JSON vs SSE streaming.
+
+Starts backend.ai.mock_llm and the API (AI_BACKEND=llm) on throwaway ports,
+then for each run sends a fresh (uncached) request both ways and records
+time to first byte and to the complete answer. Finally opens a stream, drops
+it after the first event and checks the mock saw the upstream call cancelled.
+
+    python tools/bench_ai_stream.py --runs 5 --latency 0.3 --token-delay 0.02
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEXT = ("Every great campaign starts with a single post that people actually want to share, "
+        "and ours starts today with your help and a clear reason to care about what comes next.")
+
+def start(app: str, port: int, env: dict) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env={**os.environ, **env},
+    )
+
+def wait_ready(url: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=2)
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not become ready")
+
+def timed(client: httpx.Client, body: dict, stream: bool):
+    """(seconds to first body byte, seconds to end of body)."""
+    headers = {"Accept": "text/event-stream"} if stream else {}
+    started = time.perf_counter()
+    first = None
+    with client.stream("POST", "/api/ai/optimize", json=body, headers=headers) as response:
+        response.raise_for_status()
+        for _ in response.iter_raw():
+            if first is None:
+                first = time.perf_counter() - started
+    return first, time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare TTFB of one-shot and streamed AI optimization.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.3, help="Mock LLM seconds to first token")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="Mock LLM seconds per further token")
+    parser.add_argument("--api-port", type=int, default=8013)
+    parser.add_argument("--llm-port", type=int, default=8091)
+    args = parser.parse_args()
+
+    llm = start("backend.ai.mock_llm:app", args.llm_port, {
+        "MOCK_LLM_LATENCY": str(args.latency), "MOCK_LLM_TOKEN_DELAY": str(args.token_delay),
+    })
+    api = start("backend.main:app", args.api_port, {
+        "DATABASE_URL": "sqlite:////tmp/bench_ai_stream.db", "SQL_ECHO": "0", "AI_BACKEND": "llm",
+        "AI_LLM_URL": f"http://127.0.0.1:{args.llm_port}",
+    })
+    try:
+        wait_ready(f"http://127.0.0.1:{args.llm_port}/stats")
+        wait_ready(f"http://127.0.0.1:{args.api_port}/health")
+        results = {"one-shot": [], "stream": []}
+        with httpx.Client(base_url=f"http://127.0.0.1:{args.api_port}", timeout=60) as client:
+            for run in range(args.runs):
+                for label in results:
+                    # A distinct text per request so neither path is served from the cache
+                    body = {"text": f"{TEXT} ({label} {run} {time.time()})", "mode": "ebeg", "platform": "x",
+                            "optimization_type": "professional"}
+                    results[label].append(timed(client, body, stream=label == "stream"))
+
+            print(f"{'':<12}{'TTFB p50 ms':>14}{'total p50 ms':>14}")
+            for label, timings in results.items():
+                print(f"{label:<12}{statistics.median(t[0] for t in timings) * 1000:>14.1f}"
+                      f"{statistics.median(t[1] for t in timings) * 1000:>14.1f}")
+
+            body = {"text": f"{TEXT} (cancel {time.time()})", "mode": "ebeg", "platform": "x", "optimization_type": "professional"}
+            with client.stream("POST", "/api/ai/optimize/stream", json=body) as response:
+                next(response.iter_raw())
+            time.sleep(1)
+            mock = httpx.get(f"http://127.0.0.1:{args.llm_port}/stats").json()
+            engine = client.get("/api/ai/metrics").json()
+        print(f"🔌 Disconnect mid-stream: upstream cancelled {mock['streams_cancelled']}, engine cancelled {engine['streams_cancelled']}")
+    finally:
+        for process in (api, llm):
+            process.terminate()
+            process.wait()
+    print("✅ Done")
+
+if __name__ == "__main__":
+    main()
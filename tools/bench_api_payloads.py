@@ -0,0 +1,111 @@
+"""
+Benchmark API payload size and latency: stdlib vs fast JSON, with and without compression.
+
+Seeds a throwaway SQLite database with --posts posts (default 50k) and times
+the list endpoints in-process with TestClient, so numbers reflect
+serialization + compression cost rather than network transfer.
+
+    python tools/bench_api_payloads.py --posts 50000 --repeat 5
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_DB = "bench_payloads.db"
+
+def seed(count: int):
+    from sqlalchemy import func, insert
+    from sqlmodel import Session, select
+    from backend.database import engine
+    from backend.models import Campaign, CampaignPost
+
+    with Session(engine) as session:
+        existing = session.exec(select(func.count()).select_from(CampaignPost)).one()
+        if existing >= count:
+            print(f"📦 Reusing {existing} seeded posts")
+            return
+        campaign = Campaign(name="Benchmark", mode_id=1)
+        session.add(campaign)
+        session.commit()
+        rows = [{
+            "title": f"Benchmark post {i}",
+            "hook_text": "Every great campaign starts with a single post. " * 3,
+            "category_primary": ["News", "Promo", "Story", "Update"][i % 4],
+            "category_secondary": "", "category_tertiary": "", "status": "Pending", "mode": "ebeg", "posted_date": "",
+            "meme_detail_expl": "", "source_url": f"https://example.com/posts/{i}",
+            "media_image_url": f"http://localhost:8001/static/uploads/{i:064x}.png", "media_video_url": "",
+            "closing_hook": "Share if you agree!", "kc_approval": "",
+            "target_platforms": ["x", "linkedin", "facebook"][: 1 + i % 3],
+            "platform_post_ids": [], "performance_metrics": {"likes": i % 97, "shares": i % 13},
+            "image_prompt": "A hopeful sunrise over a city skyline", "video_prompt": "",
+            "campaign_id": campaign.id,
+        } for i in range(count - existing)]
+        for start in range(0, len(rows), 5000):
+            session.execute(insert(CampaignPost.__table__), rows[start:start + 5000])
+        session.commit()
+        print(f"🌱 Seeded {len(rows)} posts")
+
+def fetch_all(client, encoding: str):
+    """Page through every post; returns (wire bytes, seconds)."""
+    total = 0
+    cursor = None
+    started = time.perf_counter()
+    while True:
+        url = "/api/posts?limit=5000" + (f"&cursor={cursor}" if cursor else "")
+        response = client.get(url, headers={"Accept-Encoding": encoding})
+        response.raise_for_status()
+        total += int(response.headers["content-length"])
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            return total, time.perf_counter() - started
+
+def bench(client, path: str, encoding: str, repeat: int):
+    sizes, timings = [], []
+    for _ in range(repeat):
+        if path == "all-posts":
+            size, elapsed = fetch_all(client, encoding)
+        else:
+            started = time.perf_counter()
+            response = client.get(path, headers={"Accept-Encoding": encoding})
+            elapsed = time.perf_counter() - started
+            response.raise_for_status()
+            size = int(response.headers["content-length"])
+        sizes.append(size)
+        timings.append(elapsed)
+    return sizes[-1], statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark API payload size and latency.")
+    parser.add_argument("--posts", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--db", default=DEFAULT_DB, help="SQLite file to seed (reused between runs)")
+    args = parser.parse_args()
+
+    # Must be set before backend.database is imported
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{args.db}")
+    os.environ.setdefault("SQL_ECHO", "0")
+
+    from fastapi.testclient import TestClient
+    from backend import compression, main as api, responses
+
+    with TestClient(api.app) as client:
+        seed(args.posts)
+        encodings = ["identity", "gzip"] + (["br"] if compression.brotli is not None else [])
+        print(f"🚀 orjson: {'yes' if responses.orjson else 'no'}, brotli: {'yes' if compression.brotli else 'no'}")
+        print(f"{'endpoint':<28}{'json':<8}{'encoding':<10}{'bytes':>14}{'median ms':>12}")
+        for path in ["/api/posts?limit=5000", "all-posts", "/api/platforms"]:
+            for fast in (False, True):
+                api.FAST_JSON = fast
+                for encoding in encodings:
+                    size, elapsed = bench(client, path, encoding, args.repeat)
+                    label = "fast" if fast else "stdlib"
+                    print(f"{path:<28}{label:<8}{encoding:<10}{size:>14,}{elapsed * 1000:>12.1f}")
+        api.FAST_JSON = responses.FAST_JSON
+    print("✅ Done")
+
+if __name__ == "__main__":
+    main()
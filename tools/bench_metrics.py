@@ -0,0 +1,95 @@
+"""
+Benchmark metric ingestion and rollup queries (backend/metrics.py).
+
+Creates a throwaway SQLite database with one campaign of --posts posts, then
+posts --points metric observations (running totals for a few metrics on a
+few platforms, spread over --days days) to POST /api/metrics/points in
+batches, and times the campaign and platform series endpoints, which read
+the rollup tables instead of the raw points.
+
+    python tools/bench_metrics.py --posts 2000 --points 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DB_PATH = "/tmp/bench_metrics.db"
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+os.environ.setdefault("SQL_ECHO", "0")
+
+PLATFORMS = ["x", "linkedin", "bluesky"]
+METRICS = ["likes", "shares", "impressions"]
+
+def main():
+    parser = argparse.ArgumentParser(description="Time metric ingestion and series queries.")
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--points", type=int, default=1000000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--batch", type=int, default=20000)
+    args = parser.parse_args()
+    if os.path.exists(DB_PATH):
+        os.remove(DB_PATH)
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import insert
+    from sqlmodel import Session
+    from backend.database import engine
+    from backend.main import app
+    from backend.models import Campaign, CampaignPost
+
+    rng = random.Random(7)
+    with TestClient(app) as client:
+        with Session(engine) as session:
+            campaign = Campaign(name="Metrics bench")
+            session.add(campaign)
+            session.commit()
+            campaign_id = campaign.id
+            session.execute(insert(CampaignPost), [
+                {"title": f"Post {i}", "category_primary": "General", "hook_text": "Every dollar counts.", "campaign_id": campaign_id}
+                for i in range(args.posts)
+            ])
+            session.commit()
+
+        # Observations arrive in time order, each series' running total only growing
+        series = [(post_id, slug, metric) for post_id in range(1, args.posts + 1) for slug in PLATFORMS for metric in METRICS]
+        totals = dict.fromkeys(series, 0)
+        start = datetime(2026, 1, 1)
+        step = timedelta(days=args.days) / args.points
+        ingest_seconds = 0.0
+        for offset in range(0, args.points, args.batch):
+            points = []
+            for i in range(offset, min(offset + args.batch, args.points)):
+                key = rng.choice(series)
+                totals[key] += rng.randint(0, 20)
+                points.append({"post_id": key[0], "platform": key[1], "metric": key[2], "value": totals[key],
+                               "ts": (start + step * i).isoformat()})
+            started = time.perf_counter()
+            body = client.post("/api/metrics/points", json={"points": points}).json()
+            ingest_seconds += time.perf_counter() - started
+            assert body["late"] == 0 and body["rejected"] == 0, body
+        print(f"🚀 Ingested {args.points} points in {ingest_seconds:.1f}s ({args.points / ingest_seconds:,.0f} points/s)")
+
+        def timed(label: str, url: str, **params):
+            started = time.perf_counter()
+            body = client.get(url, params=params).json()
+            elapsed = (time.perf_counter() - started) * 1000
+            buckets = sum(len(points) for points in body["series"].values())
+            print(f"🚀 {label:<32} {elapsed:>7.1f} ms  {buckets:>5} buckets")
+            return body
+
+        end = (start + timedelta(days=args.days)).isoformat()
+        body = timed("campaign likes, daily", f"/api/campaigns/{campaign_id}/metrics/series", metric="likes", start=start.isoformat(), end=end)
+        expected = sum(total for (_, _, metric), total in totals.items() if metric == "likes")
+        assert body["series"]["all"][-1]["total"] == expected, "running total matches the latest values"
+        timed("campaign likes, hourly by platform", f"/api/campaigns/{campaign_id}/metrics/series", metric="likes", granularity="hour",
+              by_platform=True, start=(start + timedelta(days=args.days - 7)).isoformat(), end=end)
+        timed("x impressions, hourly", "/api/platforms/x/metrics/series", metric="impressions", granularity="hour",
+              start=(start + timedelta(days=args.days - 7)).isoformat(), end=end)
+    print("✅ Done")
+
+if __name__ == "__main__":
+    main()
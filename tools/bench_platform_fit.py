@@ -0,0 +1,56 @@
+"""
+Benchmark the platform-fit matrix (backend/platform_fit.py) in memory.
+
+Builds --posts synthetic post bodies (mixed Latin, emoji, CJK and URLs) and
+--platforms platforms (the seeded ones, padded with copies), then times the
+length computation and overflow scan separately from the DB.
+
+    python tools/bench_platform_fit.py --posts 50000 --platforms 25
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite:///bench_platform_fit.db")
+os.environ.setdefault("SQL_ECHO", "0")
+
+WORDS = ["campaign", "donate", "today", "community", "garden", "👍🏽", "🇺🇸", "日本語", "https://example.com/p/123",
+         "share", "👨‍👩‍👧", "support", "café", "local", "heroes", "#tbt", "every", "dollar", "counts"]
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the post × platform fit matrix.")
+    parser.add_argument("--posts", type=int, default=50000)
+    parser.add_argument("--platforms", type=int, default=25)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    from backend.main import INITIAL_PLATFORMS
+    from backend.models import Platform
+    from backend.platform_fit import FitMatrix
+
+    rng = random.Random(7)
+    platforms = [Platform(**INITIAL_PLATFORMS[i % len(INITIAL_PLATFORMS)], post_suffix="Link in bio 👇", default_hashtags="#news #today")
+                 for i in range(args.platforms)]
+    for i, platform in enumerate(platforms):
+        platform.slug = platform.slug if i < len(INITIAL_PLATFORMS) else f"{platform.slug}-{i}"
+    slugs = [p.slug for p in platforms]
+    bodies = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 80))) for _ in range(args.posts)]
+    targets = [rng.sample(slugs, rng.randint(1, 4)) for _ in range(args.posts)]
+
+    for all_platforms in (False, True):
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            matrix = FitMatrix(bodies, targets, platforms, all_platforms=all_platforms)
+            rows, _ = matrix.overflows()
+            timings.append(time.perf_counter() - started)
+        label = "every platform" if all_platforms else "target platforms"
+        print(f"🚀 {args.posts} posts × {args.platforms} platforms ({label}): "
+              f"{min(timings) * 1000:.0f} ms, {int(matrix.mask.sum())} cells checked, {len(rows)} overflowing")
+    print("✅ Done")
+
+if __name__ == "__main__":
+    main()
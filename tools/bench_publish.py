@@ -0,0 +1,91 @@
+"""
+Load-test the publishing scheduler (backend/publishing) offline with the fake adapter.
+
+Creates a throwaway SQLite database with one campaign of --posts synthetic
+posts, schedules all of them through POST /api/campaigns/{id}/schedule, then
+runs a Scheduler in-process until the queue is drained. Reports throughput
+per platform and checks that every job was published exactly once and
+written back into its post's platform_post_ids.
+
+Rate limits are raised well above the real defaults so the run measures the
+queue, not the buckets; pass --rate 10:3 to watch pacing instead.
+
+    python tools/bench_publish.py --posts 2000 --workers 32 --failure-rate 0.05
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DB_PATH = "/tmp/bench_publish.db"
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+os.environ.setdefault("SQL_ECHO", "0")
+
+TARGETS = ["x", "linkedin", "facebook", "instagram", "bluesky", "threads", "mastodon"]
+
+def main():
+    parser = argparse.ArgumentParser(description="Drain a scheduled campaign through the fake publish adapter.")
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.02, help="Fake adapter seconds per publish")
+    parser.add_argument("--failure-rate", type=float, default=0.05, help="Fake adapter transient failure rate")
+    parser.add_argument("--rate", default="100000:1000", help="posts_per_minute:burst for every platform")
+    args = parser.parse_args()
+    if os.path.exists(DB_PATH):
+        os.remove(DB_PATH)
+    os.environ["PUBLISH_RATES"] = ",".join(f"{slug}={args.rate}" for slug in TARGETS)
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import func, insert
+    from sqlmodel import Session, select
+    from backend.database import engine
+    from backend.main import app
+    from backend.models import Campaign, CampaignPost, PublishJob
+    from backend.publishing import scheduler as publish_scheduler
+    from backend.publishing.adapters import AdapterRegistry, FakeAdapter
+
+    publish_scheduler.PUBLISH_RATES = os.environ["PUBLISH_RATES"]
+    publish_scheduler.PUBLISH_RETRY_BASE_DELAY = 0.05 # Retries come back within the run
+    rng = random.Random(7)
+    with TestClient(app) as client:
+        with Session(engine) as session:
+            campaign = Campaign(name="Publish bench")
+            session.add(campaign)
+            session.commit()
+            campaign_id = campaign.id
+            session.execute(insert(CampaignPost), [{
+                "title": f"Post {i}", "category_primary": "General", "campaign_id": campaign_id,
+                "hook_text": f"Post {i}: every dollar counts https://example.com/p/{i}",
+                "target_platforms": rng.sample(TARGETS, 3),
+            } for i in range(args.posts)])
+            session.commit()
+        scheduled = client.post(f"/api/campaigns/{campaign_id}/schedule", json={}).json()
+    print(f"🌱 Scheduled {scheduled['jobs']} jobs for {scheduled['posts']} posts")
+
+    adapters = AdapterRegistry()
+    adapters.instances["fake"] = fake = FakeAdapter(latency=args.latency, failure_rate=args.failure_rate)
+    scheduler = publish_scheduler.Scheduler(workers=args.workers, adapters=adapters)
+    started = time.perf_counter()
+    asyncio.run(scheduler.run(drain=True))
+    elapsed = time.perf_counter() - started
+
+    metrics = scheduler.metrics()
+    print(f"🚀 {metrics['published']} published in {elapsed:.1f}s ({metrics['published'] / elapsed:.0f}/s), "
+          f"{metrics['retried']} retried, {metrics['failed']} failed, {fake.duplicates} duplicate calls")
+    for slug, count in sorted(metrics["published_by_platform"].items()):
+        print(f"   {slug:<10} {count:>6}  {count / elapsed:>7.1f}/s")
+
+    with Session(engine) as session:
+        by_status = dict(session.execute(select(PublishJob.status, func.count()).group_by(PublishJob.status)).all())
+        posts = session.exec(select(CampaignPost).where(CampaignPost.campaign_id == campaign_id)).all()
+    written = sum(len(post.platform_post_ids or []) for post in posts)
+    posted = sum(post.status == "Posted" for post in posts)
+    print(f"📊 Jobs by status {by_status}; {written} platform_post_ids on {posted}/{len(posts)} Posted posts")
+    assert len(fake.published) == by_status.get("Published", 0) == written, "every published job is recorded exactly once"
+    print("✅ Done")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark campaign rendering (backend/render.py) and its memo table.
+
+Creates a throwaway SQLite database with one campaign of --posts synthetic
+posts, then times GET /api/campaigns/{id}/render cold (everything rendered),
+warm (everything reused), after changing one platform's post_suffix (only
+that column re-rendered) and after editing one post (only that row).
+
+    python tools/bench_render.py --posts 10000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DB_PATH = "/tmp/bench_render.db"
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+os.environ.setdefault("SQL_ECHO", "0")
+
+WORDS = ["campaign", "donate", "today", "community", "garden", "👍🏽", "🇺🇸", "日本語", "https://example.com/p/123",
+         "share", "support", "café", "local", "heroes", "every", "dollar", "counts"]
+TARGETS = ["x", "linkedin", "facebook", "instagram", "bluesky", "threads", "mastodon"]
+
+def main():
+    parser = argparse.ArgumentParser(description="Time campaign rendering cold, warm and after edits.")
+    parser.add_argument("--posts", type=int, default=10000)
+    args = parser.parse_args()
+    if os.path.exists(DB_PATH):
+        os.remove(DB_PATH)
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import insert
+    from sqlmodel import Session
+    from backend.database import engine
+    from backend.main import app
+    from backend.models import Campaign, CampaignPost
+
+    rng = random.Random(7)
+    with TestClient(app) as client:
+        with Session(engine) as session:
+            campaign = Campaign(name="Render bench")
+            session.add(campaign)
+            session.commit()
+            campaign_id = campaign.id
+            session.execute(insert(CampaignPost), [{
+                "title": f"Post {i}", "category_primary": "General", "campaign_id": campaign_id,
+                "hook_text": " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 80))),
+                "closing_hook": "Every dollar counts.", "target_platforms": rng.sample(TARGETS, 3),
+            } for i in range(args.posts)])
+            session.commit()
+
+        def timed(label: str):
+            started = time.perf_counter()
+            body = client.get(f"/api/campaigns/{campaign_id}/render").json()
+            elapsed = (time.perf_counter() - started) * 1000
+            print(f"🚀 {label:<22} {elapsed:>8.0f} ms  rendered {body['rendered']:>6}  reused {body['reused']:>6}")
+            return body
+
+        body = timed("cold")
+        timed("warm")
+        x = next(p for p in client.get("/api/platforms").json() if p["slug"] == "x")
+        client.put(f"/api/platforms/{x['id']}", json={**x, "post_suffix": "Retweet if you agree 🔁"})
+        timed("x suffix changed")
+        post_id = body["renders"][0]["post_id"]
+        post = client.get(f"/api/posts/{post_id}").json()
+        client.put(f"/api/posts/{post_id}", json={**post, "hook_text": post["hook_text"] + " (edited)"})
+        timed("one post edited")
+    print("✅ Done")
+
+if __name__ == "__main__":
+    main()
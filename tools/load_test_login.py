@@ -0,0 +1,132 @@
+"""
+Login burst load test: login latency percentiles and /api/posts latency under the burst.
+
+Starts a uvicorn server on a throwaway SQLite database (or targets --url),
+registers --users accounts, then fires --logins concurrent logins while a
+background probe polls /api/posts. Compare the "idle" and "during burst"
+probe numbers: with hashing off the event loop they should stay close.
+
+    python tools/load_test_login.py --logins 200 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def percentile(values, pct):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+def report(label, timings):
+    ms = [t * 1000 for t in timings]
+    print(f"{label:<28}{len(ms):>7}{percentile(ms, 50):>10.1f}{percentile(ms, 95):>10.1f}{percentile(ms, 99):>10.1f}{max(ms, default=0):>10.1f}")
+
+def start_server(port: int, db_path: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{db_path}",
+        "SQL_ECHO": "0",
+        # The burst comes from one IP; keep the limiter out of the measurement
+        "LOGIN_MAX_PER_IP": "1000000",
+        "LOGIN_MAX_PER_ACCOUNT": "1000000",
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("Server did not become ready")
+
+async def probe(client: httpx.AsyncClient, stop: asyncio.Event, interval: float):
+    timings = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.get("/api/posts?limit=50")
+        response.raise_for_status()
+        timings.append(time.perf_counter() - started)
+        await asyncio.sleep(interval)
+    return timings
+
+async def run(args):
+    server = None
+    base_url = args.url
+    if not base_url:
+        server = start_server(args.port, args.db)
+        base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+            await wait_ready(client)
+            accounts = [f"loadtest{i}@example.com" for i in range(args.users)]
+            for email in accounts:
+                await client.post("/register", json={"email": email, "password": args.password})
+            print(f"📦 {len(accounts)} accounts ready at {base_url}")
+
+            stop = asyncio.Event()
+            idle_task = asyncio.create_task(probe(client, stop, args.probe_interval))
+            await asyncio.sleep(args.idle_seconds)
+            stop.set()
+            idle = await idle_task
+
+            semaphore = asyncio.Semaphore(args.concurrency)
+            login_timings, statuses = [], {}
+
+            async def login(i: int):
+                async with semaphore:
+                    started = time.perf_counter()
+                    response = await client.post("/token", data={"username": accounts[i % len(accounts)], "password": args.password})
+                    login_timings.append(time.perf_counter() - started)
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+            stop = asyncio.Event()
+            busy_task = asyncio.create_task(probe(client, stop, args.probe_interval))
+            started = time.perf_counter()
+            await asyncio.gather(*(login(i) for i in range(args.logins)))
+            elapsed = time.perf_counter() - started
+            stop.set()
+            busy = await busy_task
+
+        print(f"🚀 {args.logins} logins in {elapsed:.2f}s ({args.logins / elapsed:.1f}/s), status codes: {statuses}")
+        print(f"{'':<28}{'n':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        report("POST /token", login_timings)
+        report("GET /api/posts (idle)", idle)
+        report("GET /api/posts (burst)", busy)
+        if idle and busy:
+            print(f"✨ Probe p50 slowdown during burst: {statistics.median(busy) / statistics.median(idle):.1f}x")
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure login latency and API latency during a login burst.")
+    parser.add_argument("--url", help="Target an already running server instead of starting one")
+    parser.add_argument("--port", type=int, default=8011)
+    parser.add_argument("--db", default="/tmp/load_test_login.db")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--password", default="load-test-password")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--idle-seconds", type=float, default=3)
+    parser.add_argument("--probe-interval", type=float, default=0.05)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()